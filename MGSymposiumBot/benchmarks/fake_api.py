@@ -0,0 +1,74 @@
+"""Локальная замена Telegram Bot API для нагрузочных тестов."""
+import asyncio
+import time
+from itertools import count
+from typing import Dict
+
+from aiohttp import web
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+
+_MESSAGE_METHODS = {
+    'sendmessage', 'sendphoto', 'senddocument',
+    'editmessagetext', 'editmessagemedia', 'editmessagecaption', 'editmessagereplymarkup',
+}
+
+
+class FakeTelegramAPI:
+    """
+    Отвечает на запросы бота правдоподобными результатами, не отправляя их в Telegram.
+    latency добавляет искусственную задержку к каждому ответу.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self._message_ids = count(1)
+        self._file_ids = count(1)
+
+    def _message(self, params) -> dict:
+        message = {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': int(params.get('chat_id', 1)), 'type': 'private'},
+            'from': BOT_USER,
+        }
+        if 'photo' in params or 'media' in params:
+            file_id = f"photo-{next(self._file_ids)}"
+            message['photo'] = [{'file_id': file_id, 'file_unique_id': file_id, 'width': 1, 'height': 1}]
+            message['caption'] = params.get('caption', '')
+        elif 'document' in params:
+            file_id = f"document-{next(self._file_ids)}"
+            message['document'] = {'file_id': file_id, 'file_unique_id': file_id}
+        else:
+            message['text'] = params.get('text', '')
+        return message
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method'].lower()
+        self.calls[method] = self.calls.get(method, 0) + 1
+        params = await request.post()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == 'getme':
+            result = BOT_USER
+        elif method in _MESSAGE_METHODS:
+            result = self._message(params)
+        else:
+            result = True
+        return web.json_response({'ok': True, 'result': result})
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Запускает сервер и возвращает его базовый URL."""
+        app = web.Application(client_max_size=50 * 1024 * 1024)
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        await self._runner.cleanup()
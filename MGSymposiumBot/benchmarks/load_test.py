@@ -0,0 +1,156 @@
+"""
+Нагрузочный тест обработчиков с локальной заменой Telegram Bot API.
+
+Обновления /start и нажатия на кнопки мероприятий и событий подаются прямо в
+dispatcher.feed_update с заданной параллельностью. Ответы бота уходят на локальный
+фейковый сервер, поэтому Telegram не участвует.
+
+Запуск (из каталога MGSymposiumBot, база должна быть отдельной - таблицы очищаются при --seed):
+    BENCH_DATABASE_URL=sqlite+aiosqlite:///bench.db python -m benchmarks.load_test --seed
+"""
+import argparse
+import asyncio
+import logging
+import math
+import os
+import random
+import time
+from collections import defaultdict
+
+os.environ['DATABASE_URL'] = os.environ['BENCH_DATABASE_URL']
+os.environ.setdefault('BOT_TOKEN', '123456:BENCHMARK')
+os.environ.setdefault('THROTTLE_RATE', '0')
+
+from aiogram import Bot  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+from aiogram.types import Update  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+import main  # noqa: E402
+from models import Event, EventSeries, engine, init_db  # noqa: E402
+from benchmarks.fake_api import BOT_USER, FakeTelegramAPI  # noqa: E402
+from callbacks import EventCallback, SeriesCallback  # noqa: E402
+from benchmarks.seed import seed  # noqa: E402
+
+SCENARIOS = ('start', 'series', 'event')
+HANDLERS = {'start': 'cmd_start', 'series': 'show_events', 'event': 'show_event_details'}
+
+
+def parse_mix(raw: str):
+    weights = {}
+    for part in raw.split(','):
+        name, weight = part.split('=')
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Неизвестный сценарий: {name}")
+        weights[name] = float(weight)
+    return weights
+
+
+def make_update(update_id: int, scenario: str, user_id: int, series_ids, event_ids, rnd) -> dict:
+    user = {'id': user_id, 'is_bot': False, 'first_name': f"User {user_id}"}
+    chat = {'id': user_id, 'type': 'private'}
+    if scenario == 'start':
+        return {'update_id': update_id, 'message': {
+            'message_id': update_id, 'date': int(time.time()), 'chat': chat, 'from': user, 'text': '/start',
+        }}
+
+    if scenario == 'series':
+        data = SeriesCallback(id=rnd.choice(series_ids)).pack()
+    else:
+        data = EventCallback(id=rnd.choice(event_ids)).pack()
+    return {'update_id': update_id, 'callback_query': {
+        'id': str(update_id), 'from': user, 'chat_instance': str(user_id), 'data': data,
+        'message': {
+            'message_id': update_id, 'date': int(time.time()), 'chat': chat, 'from': BOT_USER,
+            'text': "Список мероприятий: ",
+        },
+    }}
+
+
+def percentile(values, p: float) -> float:
+    return values[max(0, math.ceil(p * len(values)) - 1)]
+
+
+def report(latencies, errors, elapsed: float):
+    total = sum(len(values) for values in latencies.values())
+    print(f"\nОбновлений: {total}, ошибок: {sum(errors.values())}, время: {elapsed:.2f} с, "
+          f"пропускная способность: {total / elapsed:.1f} обн/с")
+    print(f"{'обработчик':<20} {'кол-во':>8} {'p50, мс':>10} {'p95, мс':>10} {'p99, мс':>10} {'ошибки':>8}")
+    for scenario in SCENARIOS:
+        values = sorted(latencies.get(scenario, []))
+        if not values:
+            continue
+        print(f"{HANDLERS[scenario]:<20} {len(values):>8} "
+              f"{percentile(values, 0.5) * 1000:>10.2f} {percentile(values, 0.95) * 1000:>10.2f} "
+              f"{percentile(values, 0.99) * 1000:>10.2f} {errors.get(scenario, 0):>8}")
+
+
+async def run(args):
+    logging.getLogger('aiogram.event').setLevel(logging.WARNING)
+    api = FakeTelegramAPI(latency=args.api_latency)
+    bot = Bot(main.bot.token, session=AiohttpSession(api=TelegramAPIServer.from_base(await api.start())))
+
+    await init_db()
+    if args.seed:
+        async with engine.begin() as conn:
+            await seed(conn, args.series, args.events_per_series)
+    main.register_handlers()
+
+    async with engine.connect() as conn:
+        series_ids = (await conn.execute(select(EventSeries.id).limit(10000))).scalars().all()
+        event_ids = (await conn.execute(select(Event.id).limit(10000))).scalars().all()
+    if not series_ids or not event_ids:
+        raise SystemExit("В базе нет мероприятий или событий, запустите с --seed")
+
+    rnd = random.Random(args.random_seed)
+    mix = args.mix
+    scenarios = rnd.choices(list(mix), weights=list(mix.values()), k=args.updates)
+    queue: asyncio.Queue = asyncio.Queue()
+    for update_id, scenario in enumerate(scenarios, start=1):
+        raw = make_update(update_id, scenario, rnd.randrange(1, args.users + 1), series_ids, event_ids, rnd)
+        queue.put_nowait((scenario, Update.model_validate(raw, context={'bot': bot})))
+
+    latencies, errors = defaultdict(list), defaultdict(int)
+
+    async def worker():
+        while not queue.empty():
+            scenario, update = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                await main.dispatcher.feed_update(bot, update)
+            except Exception as e:
+                errors[scenario] += 1
+                if errors[scenario] == 1:
+                    print(f"Ошибка в сценарии {scenario}: {e!r}")
+            latencies[scenario].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    report(latencies, errors, elapsed)
+    print(f"Запросы к Bot API: {dict(sorted(api.calls.items()))}")
+    await bot.session.close()
+    await api.stop()
+    await engine.dispose()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', type=int, default=2000, help="сколько обновлений подать")
+    parser.add_argument('--concurrency', type=int, default=50, help="одновременно обрабатываемых обновлений")
+    parser.add_argument('--users', type=int, default=500, help="число разных пользователей")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('start=1,series=3,event=6'),
+                        help="доли сценариев, например start=1,series=3,event=6")
+    parser.add_argument('--api-latency', type=float, default=0.0,
+                        help="искусственная задержка ответа фейкового Bot API, с")
+    parser.add_argument('--seed', action='store_true', help="очистить базу и заполнить её тестовыми данными")
+    parser.add_argument('--series', type=int, default=50)
+    parser.add_argument('--events-per-series', type=int, default=40)
+    parser.add_argument('--random-seed', type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,123 @@
+"""
+Проверка планов запросов просмотра на растущих объёмах данных.
+
+Запуск (из каталога MGSymposiumBot, база должна быть отдельной - таблицы очищаются):
+    BENCH_DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.query_plans
+    BENCH_DATABASE_URL=... python -m benchmarks.query_plans --sizes 3000 --show-plan search
+
+--show-plan печатает полный EXPLAIN ANALYZE выбранного запроса. Поиск на PostgreSQL 16,
+10000 серий, 299581 событие, запрос 'подземное строительство смирнов':
+
+    Incremental Sort (actual rows=9 loops=1)
+      ->  Nested Loop (actual rows=9 loops=1)
+            ->  Limit (actual rows=9 loops=1)
+                  ->  Sort (actual rows=9 loops=1)
+                        Sort Method: top-N heapsort  Memory: 26kB
+                        ->  Append (actual rows=1000 loops=1)
+                              ->  Limit (actual rows=1000 loops=1)
+                                    ->  Bitmap Heap Scan on events events_1 (actual rows=1000 loops=1)
+                                          ->  Bitmap Index Scan on ix_events_search_vector (actual rows=6865 loops=1)
+                              ->  Nested Loop (actual rows=0 loops=1)
+                                    ->  Limit (actual rows=0 loops=1)
+                                          ->  Bitmap Heap Scan on event_series (actual rows=0 loops=1)
+                                                ->  Bitmap Index Scan on ix_event_series_name_search (actual rows=0 loops=1)
+                                    ->  Limit (never executed)
+                                          ->  Index Scan using ix_events_series_id_date_start_time_id on events events_2
+            ->  Index Scan using ix_events_id on events (actual rows=1 loops=9)
+    Execution Time: 26.126 ms
+
+Прежние варианты ранжировали все совпадения и соединяли их с event_series: 'подземное строительство
+смирнов' - 286 ms, 'смирнов' - 961 ms, 'симпозиум' (совпадает с названием каждого мероприятия) -
+3459 ms. Теперь ранжируется не больше SEARCH_CANDIDATES совпадений на ветвь: 14, 20 и 19 ms (лучшее из трёх).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import date, time
+
+os.environ['DATABASE_URL'] = os.environ['BENCH_DATABASE_URL']
+
+from migrations import run_migrations  # noqa: E402
+from models import Base, create_missing_indexes, engine  # noqa: E402
+from repository import series_page_query, series_with_events_query  # noqa: E402
+from search import search_query  # noqa: E402
+from benchmarks.seed import seed  # noqa: E402
+
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+async def explain(conn, query):
+    compiled = query.compile(dialect=conn.dialect)
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", params)
+    raw = result.scalar()
+    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]['Plan']
+    return [(node['Node Type'], node.get('Relation Name'), node.get('Index Name'))
+            for node in plan_nodes(plan) if node.get('Relation Name')]
+
+
+async def explain_analyze(conn, query) -> str:
+    compiled = query.compile(dialect=conn.dialect)
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    result = await conn.exec_driver_sql(f"EXPLAIN (ANALYZE, COSTS OFF, TIMING OFF) {compiled.string}", params)
+    return "\n".join(result.scalars())
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='100,1000,10000',
+                        help="количество серий на каждом шаге, через запятую")
+    parser.add_argument('--events-per-series', type=int, default=30)
+    parser.add_argument('--show-plan', action='append', default=[], metavar='NAME',
+                        help="напечатать полный EXPLAIN ANALYZE запроса (можно повторять)")
+    args = parser.parse_args()
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(run_migrations)
+        await conn.run_sync(create_missing_indexes)
+
+    queries = {
+        'series page': lambda n: series_page_query(),
+        'series page (seek)': lambda n: series_page_query(after=(date(2025, 1, 1), n // 2)),
+        'series view': lambda n: series_with_events_query(n // 2),
+        'series view (seek)': lambda n: series_with_events_query(
+            n // 2, after=(date(2025, 1, 1), time(12, 0), 0)),
+        'search': lambda n: search_query('подземное строительство смирнов'),
+        'search (series name)': lambda n: search_query(f'симпозиум №{n // 2}'),
+    }
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    seq_scans = 0
+    for size in sizes:
+        async with engine.begin() as conn:
+            series_total, events_total = await seed(conn, size, args.events_per_series)
+            print(f"\n== {series_total} серий, {events_total} событий ==")
+            for name, build in queries.items():
+                nodes = await explain(conn, build(size))
+                for node_type, relation, index in nodes:
+                    print(f"{name:<22} {relation:<14} {node_type:<18} {index or ''}")
+                    if node_type == 'Seq Scan' and size == sizes[-1]:
+                        seq_scans += 1
+            for name in args.show_plan:
+                print(f"\n-- {name}\n{await explain_analyze(conn, queries[name](size))}")
+
+    if seq_scans:
+        print(f"\nНа максимальном объёме найдено последовательных сканирований: {seq_scans}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
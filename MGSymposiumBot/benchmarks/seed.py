@@ -0,0 +1,153 @@
+"""
+Генератор синтетических данных симпозиума для нагрузочных тестов и проверки планов запросов.
+
+Данные детерминированы: одинаковые параметры и --random-seed дают одинаковую базу.
+На PostgreSQL строки загружаются через COPY, на остальных базах - пакетными INSERT.
+
+Запуск (из каталога MGSymposiumBot, база должна быть отдельной - таблицы очищаются):
+    BENCH_DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.seed --series 5000 --events-per-series 100
+"""
+import argparse
+import asyncio
+import os
+import random
+import time as timer
+from datetime import date, time, timedelta
+
+os.environ['DATABASE_URL'] = os.environ['BENCH_DATABASE_URL']
+
+from sqlalchemy import delete, insert, select, text  # noqa: E402
+
+from models import Base, Event, EventSeries, create_missing_indexes, engine  # noqa: E402
+
+BATCH_SIZE = 5000
+
+TOPICS = (
+    "Геотехника", "Подземное строительство", "Маркшейдерия", "Обогащение руд", "Горная экология",
+    "Буровзрывные работы", "Геомеханика", "Цифровой рудник", "Промышленная безопасность",
+    "Разработка месторождений", "Горные машины", "Экономика недропользования",
+)
+FORMATS = ("Пленарная сессия", "Секция", "Круглый стол", "Мастер-класс", "Доклад", "Панельная дискуссия")
+SURNAMES = (
+    "Иванов", "Петров", "Смирнов", "Кузнецов", "Попов", "Соколов", "Лебедев", "Козлов", "Новиков",
+    "Морозов", "Волков", "Алексеев", "Егоров", "Павлов", "Семёнов", "Голубев", "Виноградов",
+    "Богданов", "Воробьёв", "Фёдоров", "Михайлов", "Беляев", "Тарасов", "Белов", "Комаров",
+)
+INITIALS = "АБВГДЕИКЛМНОПРСТФЮЯ"
+BUILDINGS = 12
+ROOMS_PER_BUILDING = 40
+
+
+def speakers_line(rnd: random.Random) -> str:
+    count = rnd.choice((1, 1, 2, 3, 5, 8, 12, 20))
+    return ", ".join(f"{rnd.choice(SURNAMES)} {rnd.choice(INITIALS)}.{rnd.choice(INITIALS)}."
+                     for _ in range(count))
+
+
+def series_rows(rnd: random.Random, series_count: int):
+    first_day = date(2024, 1, 1)
+    for i in range(series_count):
+        start = first_day + timedelta(days=rnd.randrange(1095))
+        topic = rnd.choice(TOPICS)
+        yield {
+            'name': f"{topic}-{2024 + i % 3}: симпозиум №{i + 1}",
+            'start_date': start,
+            'end_date': start + timedelta(days=rnd.randrange(0, 5)),
+            'description': f"Международный симпозиум по направлению «{topic}». " * rnd.randrange(1, 6),
+            'image_url': None,
+        }
+
+
+def event_rows(rnd: random.Random, series, events_per_series: int):
+    for series_id, start_date, end_date in series:
+        days = (end_date - start_date).days + 1
+        for j in range(rnd.randint(events_per_series // 2, events_per_series * 3 // 2)):
+            start = rnd.randrange(8 * 60, 19 * 60, 15)
+            end = min(start + rnd.choice((30, 45, 60, 90, 120)), 23 * 60 + 59)
+            yield {
+                'series_id': series_id,
+                'date': start_date + timedelta(days=rnd.randrange(days)),
+                'start_time': time(start // 60, start % 60),
+                'end_time': time(end // 60, end % 60),
+                'event': f"{rnd.choice(FORMATS)}: {rnd.choice(TOPICS)} ({j + 1})",
+                'room': f"Корпус {rnd.randrange(1, BUILDINGS + 1)}, "
+                        f"ауд. {rnd.randrange(1, 6)}{rnd.randrange(1, ROOMS_PER_BUILDING):02d}",
+                'speakers': speakers_line(rnd),
+                'description': rnd.choice((None, "-", f"Обсуждение темы «{rnd.choice(TOPICS)}».")),
+                'image_url': None,
+            }
+
+
+def batches(rows, size: int = BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def bulk_insert(conn, model, rows) -> int:
+    """Загружает строки пачками: через COPY на PostgreSQL, иначе многострочными INSERT."""
+    total = 0
+    if conn.dialect.name == 'postgresql':
+        raw = (await conn.get_raw_connection()).driver_connection
+        for batch in batches(rows):
+            columns = list(batch[0])
+            await raw.copy_records_to_table(model.__tablename__, columns=columns,
+                                            records=[tuple(row[c] for c in columns) for row in batch])
+            total += len(batch)
+    else:
+        for batch in batches(rows):
+            await conn.execute(insert(model), batch)
+            total += len(batch)
+    return total
+
+
+async def clear(conn):
+    """Удаляет все мероприятия и события из тестовой базы."""
+    if conn.dialect.name == 'postgresql':
+        await conn.execute(text("TRUNCATE events, event_series RESTART IDENTITY CASCADE"))
+    else:
+        await conn.execute(delete(Event))
+        await conn.execute(delete(EventSeries))
+
+
+async def seed(conn, series_count: int, events_per_series: int, random_seed: int = 0):
+    """Очищает базу и заполняет её мероприятиями и событиями, возвращает количество тех и других."""
+    await clear(conn)
+    rnd = random.Random(random_seed)
+
+    series_total = await bulk_insert(conn, EventSeries, series_rows(rnd, series_count))
+    series = (await conn.execute(
+        select(EventSeries.id, EventSeries.start_date, EventSeries.end_date).order_by(EventSeries.id))).all()
+    events_total = await bulk_insert(conn, Event, event_rows(rnd, series, events_per_series))
+
+    if conn.dialect.name == 'postgresql':
+        await conn.execute(text("ANALYZE events"))
+        await conn.execute(text("ANALYZE event_series"))
+    return series_total, events_total
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--series', type=int, default=2000, help="количество мероприятий")
+    parser.add_argument('--events-per-series', type=int, default=100,
+                        help="среднее количество событий в мероприятии")
+    parser.add_argument('--random-seed', type=int, default=0)
+    args = parser.parse_args()
+
+    started = timer.perf_counter()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_missing_indexes)
+        series_total, events_total = await seed(conn, args.series, args.events_per_series, args.random_seed)
+    await engine.dispose()
+    print(f"Загружено мероприятий: {series_total}, событий: {events_total} "
+          f"за {timer.perf_counter() - started:.1f} с")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
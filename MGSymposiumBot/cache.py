@@ -0,0 +1,115 @@
+import os
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MENU_CACHE_SIZE = int(os.getenv('MENU_CACHE_SIZE', 2048))
+RENDER_CACHE_SIZE = int(os.getenv('RENDER_CACHE_SIZE', 2048))
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Словарь ограниченного размера, вытесняющий давно не использованные записи."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return default
+        return self._data[key]
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]):
+        for key in [k for k, v in self._data.items() if predicate(k, v)]:
+            del self._data[key]
+
+    def clear(self):
+        self._data.clear()
+
+
+menu_cache = LRUCache(MENU_CACHE_SIZE)
+render_cache = LRUCache(RENDER_CACHE_SIZE)
+
+_versions: Dict[Hashable, int] = {}
+_writes = 0
+
+
+def version(*key: Hashable) -> int:
+    """Текущая версия сущности; растёт при каждом её изменении."""
+    return _versions.get(key, 0)
+
+
+def writes() -> int:
+    """Число сбросов кэша с запуска: запоминается перед чтением из БД для store()."""
+    return _writes
+
+
+def _bump(*key: Hashable):
+    global _writes
+    _versions[key] = _versions.get(key, 0) + 1
+    _writes += 1
+
+
+def store(cache: LRUCache, key: Hashable, value: Any, since: int):
+    """
+    Кладёт в кэш значение, прочитанное после writes() == since. Если за время чтения кэш сбрасывался,
+    значение могло быть прочитано до изменения и сохранилось бы уже после сброса, поэтому не кладётся.
+    """
+    if _writes == since:
+        cache.set(key, value)
+
+
+async def cached(key: Hashable, loader: Callable[[], Awaitable[Any]], cache: LRUCache = menu_cache) -> Any:
+    """Возвращает значение из кэша, при промахе загружает его через loader."""
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        since = _writes
+        value = await loader()
+        store(cache, key, value, since)
+    return value
+
+
+def invalidate_series(series_id: int):
+    """Сбрасывает кэш списка мероприятий, самого мероприятия и всех его событий."""
+    def affected(key, value):
+        if key[0] == 'series_list':
+            return True
+        if key[0] in ('series', 'events'):
+            return key[1] == series_id
+        if key[0] == 'event':
+            return value is not None and value.series_id == series_id
+        return False
+
+    menu_cache.invalidate_where(affected)
+    _bump('series_list')
+    _bump('series', series_id)
+    _bump('events_written')
+
+
+def invalidate_event(event_id: int, series_id: int):
+    """Сбрасывает кэш события и списка событий его мероприятия."""
+    menu_cache.pop(('event', event_id))
+    menu_cache.invalidate_where(
+        lambda key, value: key[0] == 'events' and key[1] == series_id)
+    _bump('event', event_id)
+    _bump('series', series_id)
+    _bump('events_written')
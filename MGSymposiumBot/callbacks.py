@@ -0,0 +1,143 @@
+from typing import Dict, Tuple, Type, Union
+
+from aiogram import Dispatcher
+from aiogram.dispatcher.event.handler import CallbackType, HandlerObject
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery
+
+SEPARATOR = ':'
+
+
+class SeriesCallback(CallbackData, prefix='sr'):
+    id: int
+
+
+class EventCallback(CallbackData, prefix='ev'):
+    id: int
+
+
+class SeriesListCallback(CallbackData, prefix='sl'):
+    pass
+
+
+class PageCallback(CallbackData, prefix='pg'):
+    ctx: str
+    direction: str
+    series_id: int
+    cursor: str
+
+
+class CreateEventSeriesCallback(CallbackData, prefix='ces'):
+    id: int
+
+
+class UpdateSeriesCallback(CallbackData, prefix='us'):
+    id: int
+
+
+class UpdateEventSeriesCallback(CallbackData, prefix='ues'):
+    id: int
+
+
+class UpdateEventCallback(CallbackData, prefix='ue'):
+    id: int
+
+
+class DeleteSeriesCallback(CallbackData, prefix='ds'):
+    id: int
+
+
+class ConfirmDeleteSeriesCallback(CallbackData, prefix='dsy'):
+    pass
+
+
+class CancelDeleteSeriesCallback(CallbackData, prefix='dsn'):
+    pass
+
+
+class DeleteEventSeriesCallback(CallbackData, prefix='des'):
+    id: int
+
+
+class DeleteEventCallback(CallbackData, prefix='de'):
+    id: int
+
+
+class ConfirmDeleteEventCallback(CallbackData, prefix='dey'):
+    pass
+
+
+class CancelDeleteEventCallback(CallbackData, prefix='den'):
+    pass
+
+
+class ImportSeriesCallback(CallbackData, prefix='is'):
+    id: int
+
+
+class ExportSeriesCallback(CallbackData, prefix='xs'):
+    id: int
+
+
+class ExportFileCallback(CallbackData, prefix='xf'):
+    series_id: int
+    fmt: str
+
+
+class ConfirmBroadcastCallback(CallbackData, prefix='bcy'):
+    pass
+
+
+class CancelBroadcastCallback(CallbackData, prefix='bcn'):
+    pass
+
+
+class RemindEventCallback(CallbackData, prefix='rm'):
+    id: int
+
+
+class SearchPageCallback(CallbackData, prefix='sp'):
+    offset: int
+
+
+class CallbackRouter:
+    """
+    Выбирает обработчик нажатия по префиксу callback_data одним поиском в словаре
+    и один раз разбирает данные кнопки в типизированный объект callback_data.
+    """
+
+    def __init__(self):
+        self._routes: Dict[str, Tuple[Type[CallbackData], HandlerObject]] = {}
+
+    def register(self, factory: Type[CallbackData], callback: CallbackType):
+        prefix = factory.__prefix__
+        if prefix in self._routes:
+            raise ValueError(f"Префикс callback_data '{prefix}' уже зарегистрирован")
+        self._routes[prefix] = (factory, HandlerObject(callback=callback))
+
+    def resolve(self, callback: CallbackQuery) -> Union[bool, dict]:
+        data = callback.data or ''
+        route = self._routes.get(data.split(SEPARATOR, 1)[0])
+        if route is None:
+            return False
+        factory, handler = route
+        try:
+            callback_data = factory.unpack(data)
+        except (TypeError, ValueError):
+            return False
+        return {'callback_data': callback_data, 'route': handler}
+
+    async def dispatch(self, callback: CallbackQuery, route: HandlerObject, **kwargs):
+        return await route.call(callback, **kwargs)
+
+
+callback_router = CallbackRouter()
+
+
+async def stale_callback(callback: CallbackQuery):
+    await callback.answer("Кнопка устарела. Отправьте /start.")
+
+
+def register_callbacks(dp: Dispatcher):
+    dp.callback_query.register(callback_router.dispatch, callback_router.resolve)
+    dp.callback_query.register(stale_callback)
@@ -0,0 +1,112 @@
+from datetime import datetime, timezone
+
+from aiogram import Dispatcher, types
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
+from sqlalchemy import insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Broadcast, OutboxMessage, Subscriber
+from utils import admin_only
+from states import BroadcastMessage
+from subscribers import count_subscribers
+from outbound import Outbox
+from callbacks import CancelBroadcastCallback, ConfirmBroadcastCallback, callback_router
+
+BROADCAST_MAX_LENGTH = 3500
+
+
+def register_broadcast_cmd(dp: Dispatcher):
+    dp.message.register(cmd_broadcast, Command(commands=["broadcast"]))
+    dp.message.register(cmd_broadcast_status, Command(commands=["broadcast_status"]))
+    dp.message.register(broadcast_text, BroadcastMessage.waiting_for_text)
+    callback_router.register(ConfirmBroadcastCallback, confirm_broadcast)
+    callback_router.register(CancelBroadcastCallback, cancel_broadcast)
+
+
+@admin_only
+async def cmd_broadcast(message: types.Message, state: FSMContext):
+    await message.answer("Введите текст объявления для всех подписчиков (или stop для отмены):")
+    await state.set_state(BroadcastMessage.waiting_for_text)
+
+
+async def broadcast_text(message: types.Message, state: FSMContext, db: AsyncSession):
+    if not message.text:
+        await message.answer("Объявление должно быть текстом.")
+        return
+    if message.text.lower() == "stop":
+        await state.clear()
+        await message.answer("Рассылка отменена.")
+        return
+
+    if len(message.text) > BROADCAST_MAX_LENGTH:
+        await message.answer(f"Объявление слишком длинное, максимум {BROADCAST_MAX_LENGTH} символов.")
+        return
+
+    await state.update_data(text=message.text)
+    count = await count_subscribers(db)
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="Отправить", callback_data=ConfirmBroadcastCallback().pack())],
+        [InlineKeyboardButton(text="Отмена", callback_data=CancelBroadcastCallback().pack())]
+    ])
+    await message.answer(f"Отправить объявление {count} подписчикам?\n\n{message.text}", reply_markup=keyboard)
+
+
+async def start_broadcast(db: AsyncSession, text: str, author_chat_id: int) -> Broadcast:
+    """
+    Ставит объявление в outbox для всех подписчиков одним INSERT ... SELECT.
+    Текст хранится один раз в broadcasts, строки outbox ссылаются на него по broadcast_id.
+    """
+    broadcast = Broadcast(text=text, author_chat_id=author_chat_id, status='running',
+                          created_at=datetime.now(timezone.utc))
+    db.add(broadcast)
+    await db.flush()
+    result = await db.execute(insert(OutboxMessage).from_select(
+        ['chat_id', 'broadcast_id'],
+        select(Subscriber.chat_id, literal(broadcast.id)).where(Subscriber.blocked.is_(False))
+    ))
+    broadcast.total = result.rowcount
+    if not broadcast.total:
+        broadcast.status = 'done'
+    await db.commit()
+    return broadcast
+
+
+async def confirm_broadcast(callback: CallbackQuery, state: FSMContext, db: AsyncSession, outbox: Outbox):
+    data = await state.get_data()
+    text = data.get('text')
+    await state.clear()
+    if not text:
+        await callback.answer("Объявление уже отправлено или отменено.")
+        return
+
+    await callback.answer()
+    broadcast = await start_broadcast(db, text, callback.message.chat.id)
+    outbox.wake()
+    await callback.message.edit_reply_markup(reply_markup=None)
+    await callback.message.answer(f"Рассылка №{broadcast.id} запущена: {broadcast.total} получателей.")
+
+
+async def cancel_broadcast(callback: CallbackQuery, state: FSMContext):
+    await state.clear()
+    await callback.answer()
+    await callback.message.edit_reply_markup(reply_markup=None)
+    await callback.message.answer("Рассылка отменена.")
+
+
+@admin_only
+async def cmd_broadcast_status(message: types.Message, db: AsyncSession):
+    result = await db.execute(select(Broadcast).order_by(Broadcast.id.desc()).limit(5))
+    broadcasts = result.scalars().all()
+    if not broadcasts:
+        await message.answer("Рассылок ещё не было.")
+        return
+
+    lines = [
+        f"№{b.id} от {b.created_at.strftime('%d.%m.%Y %H:%M')}: "
+        f"{'завершена' if b.status == 'done' else 'идёт'}, доставлено {b.sent} из {b.total}, "
+        f"не доставлено {b.failed}"
+        for b in broadcasts
+    ]
+    await message.answer("\n".join(lines))
@@ -1,19 +1,21 @@
 # create.py
-from datetime import datetime, time
 
-from sqlalchemy.future import select
 from aiogram import Dispatcher, types
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram.types import CallbackQuery
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from models import Event, EventSeries, get_db
-from utils import admin_only, format_date, check_optional_field
+from models import Event, EventSeries
+from utils import admin_only, check_optional_field, parse_date, parse_time_range
 from states import CreateEvent, CreateEventSeries
+from cache import invalidate_event, invalidate_series
+from pagination import register_series_picker, series_picker
+from callbacks import CreateEventSeriesCallback, callback_router
 
 
 def register_create_cmd(dp: Dispatcher):
+    register_series_picker('create', CreateEventSeriesCallback)
     dp.message.register(cmd_create, Command(commands=["create"]))
     dp.message.register(cmd_create_event, Command(commands=["create_event"]))
     dp.message.register(event_series_name, CreateEventSeries.waiting_for_name)
@@ -25,8 +27,7 @@ def register_create_cmd(dp: Dispatcher):
                         CreateEventSeries.waiting_for_description)
     dp.message.register(event_series_image_url,
                         CreateEventSeries.waiting_for_image_url)
-    dp.callback_query.register(
-        select_series, lambda c: c.data.startswith("select_series_"))
+    callback_router.register(CreateEventSeriesCallback, select_series)
     dp.message.register(event_name, CreateEvent.waiting_for_event_name)
     dp.message.register(event_date, CreateEvent.waiting_for_date)
     dp.message.register(event_time, CreateEvent.waiting_for_time)
@@ -65,7 +66,7 @@ async def event_series_start_date(message: types.Message, state: FSMContext):
         return
 
     try:
-        start_date = datetime.strptime(message.text, "%d.%m.%Y").date()
+        start_date = parse_date(message.text)
         await state.update_data(start_date=start_date)
         await message.answer("Введите дату окончания мероприятия (в формате ДД.ММ.ГГГГ):")
         await state.set_state(CreateEventSeries.waiting_for_end_date)
@@ -83,7 +84,7 @@ async def event_series_end_date(message: types.Message, state: FSMContext):
         data = await state.get_data()
         start_date = data['start_date']
 
-        end_date = datetime.strptime(message.text, "%d.%m.%Y").date()
+        end_date = parse_date(message.text)
 
         if end_date < start_date:
             await message.answer("Дата окончания не может быть раньше даты начала.")
@@ -108,7 +109,7 @@ async def event_series_description(message: types.Message, state: FSMContext):
     await state.set_state(CreateEventSeries.waiting_for_image_url)
 
 
-async def event_series_image_url(message: types.Message, state: FSMContext):
+async def event_series_image_url(message: types.Message, state: FSMContext, db: AsyncSession):
     if text := message.text:
         if text.lower() == "stop":
             await state.clear()
@@ -117,55 +118,39 @@ async def event_series_image_url(message: types.Message, state: FSMContext):
 
     data = await state.get_data()
 
-    async for db in get_db():
-        new_series = EventSeries(
-            name=data['name'],
-            start_date=data['start_date'],
-            end_date=data['end_date'],
-            description=data['description'],
-            image_url=message.photo[-1].file_id if message.photo else None,
-        )
+    new_series = EventSeries(
+        name=data['name'],
+        start_date=data['start_date'],
+        end_date=data['end_date'],
+        description=data['description'],
+        image_url=message.photo[-1].file_id if message.photo else None,
+    )
 
-        db.add(new_series)
-        await db.commit()
-        await db.close()
+    db.add(new_series)
+    await db.commit()
+    invalidate_series(new_series.id)
 
     await message.answer(f"Мероприятие '{data['name']}' создано.")
     await state.clear()
 
 
 @admin_only
-async def cmd_create_event(message: types.Message, state: FSMContext):
+async def cmd_create_event(message: types.Message, state: FSMContext, db: AsyncSession):
     if message.text.lower() == "stop":
         await state.clear()
         await message.answer("Создание события прервано.")
         return
 
-    db: AsyncSession = await get_db().__anext__()
-    event_series = await get_event_series(db)
-    if event_series:
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(
-                text=f"{series.name}: {format_date(series.start_date, series.end_date)}",
-                callback_data=f"select_series_{series.id}")]
-            for series in event_series
-        ])
+    keyboard = await series_picker(db, 'create')
+    if keyboard:
         await message.answer("Выберите мероприятие для добавления события:", reply_markup=keyboard)
         await state.set_state(CreateEvent.waiting_for_series)
     else:
         await message.answer("Нет доступных мероприятий для добавления событий.")
-    await db.close()
 
 
-async def get_event_series(db: AsyncSession):
-    result = await db.execute(select(EventSeries))
-    event_series = result.scalars().all()
-    return event_series
-
-
-async def select_series(callback: CallbackQuery, state: FSMContext):
-    series_id = int(callback.data.split("_")[2])
-    await state.update_data(series_id=series_id)
+async def select_series(callback: CallbackQuery, callback_data: CreateEventSeriesCallback, state: FSMContext):
+    await state.update_data(series_id=callback_data.id)
     await callback.message.answer("Введите название события:")
     await state.set_state(CreateEvent.waiting_for_event_name)
 
@@ -186,7 +171,7 @@ async def event_date(message: types.Message, state: FSMContext):
         await message.answer("Создание события прервано.")
         return
     try:
-        date = datetime.strptime(message.text, "%d.%m.%Y").date()
+        date = parse_date(message.text)
         await state.update_data(date=date)
         await message.answer("Введите время события (в формате ЧЧ:ММ - ЧЧ:ММ):")
         await state.set_state(CreateEvent.waiting_for_time)
@@ -200,24 +185,14 @@ async def event_time(message: types.Message, state: FSMContext):
         await message.answer("Создание события прервано.")
         return
 
-    time_input = message.text.strip()
-
     try:
-        start_time, end_time = time_input.split('-')
-        start_time = start_time.strip()
-        end_time = end_time.strip()
-
-        start_hour, start_minute = map(int, start_time.split(':'))
-        end_hour, end_minute = map(int, end_time.split(':'))
-
-        start_time_obj = time(start_hour, start_minute)
-        end_time_obj = time(end_hour, end_minute)
+        start_time, end_time = parse_time_range(message.text)
 
-        if start_time_obj >= end_time_obj:
+        if start_time >= end_time:
             await message.answer("Время начала не может быть позже или равно времени окончания. Попробуйте снова.")
             return
 
-        await state.update_data(time=f"{start_time_obj.strftime('%H:%M')} - {end_time_obj.strftime('%H:%M')}")
+        await state.update_data(start_time=start_time, end_time=end_time)
 
         await message.answer("Введите место проведения события:")
         await state.set_state(CreateEvent.waiting_for_room)
@@ -260,7 +235,7 @@ async def event_description(message: types.Message, state: FSMContext):
     await state.set_state(CreateEvent.waiting_for_image_url)
 
 
-async def event_image_url(message: types.Message, state: FSMContext):
+async def event_image_url(message: types.Message, state: FSMContext, db: AsyncSession):
     if text := message.text:
         if text.lower() == "stop":
             await state.clear()
@@ -268,20 +243,20 @@ async def event_image_url(message: types.Message, state: FSMContext):
             return
 
     data = await state.get_data()
-    async for db in get_db():
-        new_event = Event(
-            event=data['event_name'],
-            date=data['date'],
-            time=data['time'],
-            room=data['room'],
-            speakers=data.get('speakers'),
-            description=data.get('description'),
-            image_url=message.photo[-1].file_id if message.photo else None,
-            series_id=data['series_id'])
-
-        db.add(new_event)
-        await db.commit()
+    new_event = Event(
+        event=data['event_name'],
+        date=data['date'],
+        start_time=data['start_time'],
+        end_time=data['end_time'],
+        room=data['room'],
+        speakers=data.get('speakers'),
+        description=data.get('description'),
+        image_url=message.photo[-1].file_id if message.photo else None,
+        series_id=data['series_id'])
+
+    db.add(new_event)
+    await db.commit()
+    invalidate_event(new_event.id, new_event.series_id)
 
     await message.answer(f"Событие '{data['event_name']}' создано.")
     await state.clear()
-    await db.close()
@@ -8,81 +8,77 @@ from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMar
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from models import Event, EventSeries, get_db
-from utils import admin_only
+from models import Event, EventSeries, Reminder
+from utils import admin_only, format_time_range
+from cache import invalidate_event, invalidate_series
+from pagination import events_picker, register_event_picker, register_series_picker, series_picker
+from callbacks import (CancelDeleteEventCallback, CancelDeleteSeriesCallback, ConfirmDeleteEventCallback,
+                       ConfirmDeleteSeriesCallback, DeleteEventCallback, DeleteEventSeriesCallback,
+                       DeleteSeriesCallback, callback_router)
+
+
+def delete_series_label(series) -> str:
+    return f"{series.name} ({series.start_date} - {series.end_date})"
+
+
+def delete_event_label(event) -> str:
+    return f"{event.event} ({event.date} {format_time_range(event.start_time, event.end_time)})"
 
 
 def register_delete_cmd(dp: Dispatcher):
+    register_series_picker('delete', DeleteSeriesCallback, delete_series_label)
+    register_series_picker('delete_ev', DeleteEventSeriesCallback, delete_series_label)
+    register_event_picker('delete_ev', DeleteEventCallback, delete_event_label)
     dp.message.register(cmd_delete_event_series, Command(commands=["delete"]))
-    dp.callback_query.register(
-        delete_series, lambda c: c.data.startswith("delete_series_"))
-    dp.callback_query.register(
-        confirm_delete_series, lambda c: c.data == "confirm_delete_series")
-    dp.callback_query.register(
-        cancel_delete, lambda c: c.data == "cancel_delete")
+    callback_router.register(DeleteSeriesCallback, delete_series)
+    callback_router.register(ConfirmDeleteSeriesCallback, confirm_delete_series)
+    callback_router.register(CancelDeleteSeriesCallback, cancel_delete)
 
     dp.message.register(cmd_delete_event, Command(commands=["delete_event"]))
-    dp.callback_query.register(select_event_series_to_delete_event,
-                               lambda c: c.data.startswith("delete_event_series_"))
-    dp.callback_query.register(
-        delete_selected_event, lambda c: c.data.startswith("delete_selected_event_"))
-    dp.callback_query.register(
-        confirm_delete_event, lambda c: c.data == "confirm_delete_event")
-    dp.callback_query.register(
-        cancel_delete_event, lambda c: c.data == "cancel_delete_event")
+    callback_router.register(DeleteEventSeriesCallback, select_event_series_to_delete_event)
+    callback_router.register(DeleteEventCallback, delete_selected_event)
+    callback_router.register(ConfirmDeleteEventCallback, confirm_delete_event)
+    callback_router.register(CancelDeleteEventCallback, cancel_delete_event)
 
 
 @admin_only
-async def cmd_delete_event_series(message: types.Message, state: FSMContext):
-    async for db in get_db():
-        try:
-            result = await db.execute(select(EventSeries))
-            event_series = result.scalars().all()
-
-            if event_series:
-                keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(
-                        text=f"{series.name} ({series.start_date} - {series.end_date})",
-                        callback_data=f"delete_series_{series.id}")]
-                    for series in event_series
-                ])
-                await message.answer("Выберите мероприятие для удаления:", reply_markup=keyboard)
-            else:
-                await message.answer("Нет мероприятий для удаления.")
-        finally:
-            await db.close()
-
-
-async def delete_series(callback: CallbackQuery, state: FSMContext):
-    series_id = int(callback.data.split("_")[2])
-    await state.update_data(series_id=series_id)
+async def cmd_delete_event_series(message: types.Message, state: FSMContext, db: AsyncSession):
+    keyboard = await series_picker(db, 'delete')
+
+    if keyboard:
+        await message.answer("Выберите мероприятие для удаления:", reply_markup=keyboard)
+    else:
+        await message.answer("Нет мероприятий для удаления.")
+
+
+async def delete_series(callback: CallbackQuery, callback_data: DeleteSeriesCallback, state: FSMContext):
+    await state.update_data(series_id=callback_data.id)
 
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(
-            text="Да", callback_data="confirm_delete_series")],
-        [InlineKeyboardButton(text="Нет", callback_data="cancel_delete")]
+            text="Да", callback_data=ConfirmDeleteSeriesCallback().pack())],
+        [InlineKeyboardButton(text="Нет", callback_data=CancelDeleteSeriesCallback().pack())]
     ])
     await callback.message.answer("Удалить мероприятие и все связанные события?", reply_markup=keyboard)
 
 
-async def confirm_delete_series(callback: CallbackQuery, state: FSMContext):
+async def confirm_delete_series(callback: CallbackQuery, state: FSMContext, db: AsyncSession):
     data = await state.get_data()
     series_id = data['series_id']
 
-    async for db in get_db():
-        try:
-            result = await db.execute(select(EventSeries).filter(EventSeries.id == series_id))
-            series = result.scalar_one_or_none()
-
-            if series:
-                await db.execute(delete(Event).where(Event.series_id == series_id))
-                await db.execute(delete(EventSeries).where(EventSeries.id == series_id))
-                await db.commit()
-                await callback.message.answer(f"Мероприятие '{series.name}' и все его события удалены.")
-            else:
-                await callback.message.answer("Мероприятие не найдено.")
-        finally:
-            await db.close()
+    result = await db.execute(select(EventSeries).filter(EventSeries.id == series_id))
+    series = result.scalar_one_or_none()
+
+    if series:
+        await db.execute(delete(Reminder).where(
+            Reminder.event_id.in_(select(Event.id).where(Event.series_id == series_id))))
+        await db.execute(delete(Event).where(Event.series_id == series_id))
+        await db.execute(delete(EventSeries).where(EventSeries.id == series_id))
+        await db.commit()
+        invalidate_series(series_id)
+        await callback.message.answer(f"Мероприятие '{series.name}' и все его события удалены.")
+    else:
+        await callback.message.answer("Мероприятие не найдено.")
     await state.clear()
 
 
@@ -92,77 +88,53 @@ async def cancel_delete(callback: CallbackQuery, state: FSMContext):
 
 
 @admin_only
-async def cmd_delete_event(message: types.Message, state: FSMContext):
-    async for db in get_db():
-        try:
-            result = await db.execute(select(EventSeries))
-            event_series = result.scalars().all()
-
-            if event_series:
-                keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(
-                        text=f"{series.name} ({series.start_date} - {series.end_date})",
-                        callback_data=f"delete_event_series_{series.id}")]
-                    for series in event_series
-                ])
-                await message.answer("Выберите мероприятие, чтобы удалить событие:", reply_markup=keyboard)
-            else:
-                await message.answer("Нет мероприятий для удаления событий.")
-        finally:
-            await db.close()
-
-
-async def select_event_series_to_delete_event(callback: CallbackQuery, state: FSMContext):
-    series_id = int(callback.data.split("_")[3])
+async def cmd_delete_event(message: types.Message, state: FSMContext, db: AsyncSession):
+    keyboard = await series_picker(db, 'delete_ev')
+
+    if keyboard:
+        await message.answer("Выберите мероприятие, чтобы удалить событие:", reply_markup=keyboard)
+    else:
+        await message.answer("Нет мероприятий для удаления событий.")
+
+
+async def select_event_series_to_delete_event(callback: CallbackQuery, callback_data: DeleteEventSeriesCallback,
+                                              state: FSMContext, db: AsyncSession):
+    series_id = callback_data.id
     await state.update_data(series_id=series_id)
 
-    async for db in get_db():
-        try:
-            result = await db.execute(select(Event).filter(Event.series_id == series_id))
-            events = result.scalars().all()
-
-            if events:
-                keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(
-                        text=f"{event.event} ({event.date} {event.time})",
-                        callback_data=f"delete_selected_event_{event.id}")]
-                    for event in events
-                ])
-                await callback.message.answer("Выберите событие для удаления:", reply_markup=keyboard)
-            else:
-                await callback.message.answer("В этом мероприятии нет событий для удаления.")
-        finally:
-            await db.close()
-
-
-async def delete_selected_event(callback: CallbackQuery, state: FSMContext):
-    event_id = int(callback.data.split("_")[3])
-    await state.update_data(event_id=event_id)
+    keyboard = await events_picker(db, 'delete_ev', series_id)
+
+    if keyboard:
+        await callback.message.answer("Выберите событие для удаления:", reply_markup=keyboard)
+    else:
+        await callback.message.answer("В этом мероприятии нет событий для удаления.")
+
+
+async def delete_selected_event(callback: CallbackQuery, callback_data: DeleteEventCallback, state: FSMContext):
+    await state.update_data(event_id=callback_data.id)
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(
-            text="Да", callback_data="confirm_delete_event")],
-        [InlineKeyboardButton(text="Нет", callback_data="cancel_delete_event")]
+            text="Да", callback_data=ConfirmDeleteEventCallback().pack())],
+        [InlineKeyboardButton(text="Нет", callback_data=CancelDeleteEventCallback().pack())]
     ])
     await callback.message.answer("Вы уверены, что хотите удалить это событие?", reply_markup=keyboard)
 
 
-async def confirm_delete_event(callback: CallbackQuery, state: FSMContext):
+async def confirm_delete_event(callback: CallbackQuery, state: FSMContext, db: AsyncSession):
     data = await state.get_data()
     event_id = data['event_id']
 
-    async for db in get_db():
-        try:
-            result = await db.execute(select(Event).filter(Event.id == event_id))
-            event = result.scalar_one_or_none()
-
-            if event:
-                await db.execute(delete(Event).where(Event.id == event_id))
-                await db.commit()
-                await callback.message.answer(f"Событие '{event.event}' успешно удалено.")
-            else:
-                await callback.message.answer("Событие не найдено.")
-        finally:
-            await db.close()
+    result = await db.execute(select(Event).filter(Event.id == event_id))
+    event = result.scalar_one_or_none()
+
+    if event:
+        await db.execute(delete(Reminder).where(Reminder.event_id == event_id))
+        await db.execute(delete(Event).where(Event.id == event_id))
+        await db.commit()
+        invalidate_event(event_id, event.series_id)
+        await callback.message.answer(f"Событие '{event.event}' успешно удалено.")
+    else:
+        await callback.message.answer("Событие не найдено.")
     await state.clear()
 
 
@@ -0,0 +1,103 @@
+import csv
+import os
+import tempfile
+from datetime import datetime, timezone
+
+from aiogram import Dispatcher, types
+from aiogram.filters import Command
+from aiogram.types import CallbackQuery, FSInputFile, InlineKeyboardButton, InlineKeyboardMarkup
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Event, EventSeries
+from cache import render_cache, version
+from pagination import register_series_picker, series_picker
+from programme import CSV_HEADER, ICS_FOOTER, csv_row, ics_event, ics_header
+from callbacks import ExportFileCallback, ExportSeriesCallback, callback_router
+
+EXPORT_YIELD_PER = int(os.getenv('EXPORT_YIELD_PER', 500))
+FORMATS = {'csv': "CSV (Excel)", 'ics': "iCalendar (.ics)"}
+
+
+def register_export_cmd(dp: Dispatcher):
+    register_series_picker('export', ExportSeriesCallback)
+    dp.message.register(cmd_export, Command(commands=["export"]))
+    callback_router.register(ExportSeriesCallback, select_export_series)
+    callback_router.register(ExportFileCallback, send_export)
+
+
+async def cmd_export(message: types.Message, db: AsyncSession):
+    keyboard = await series_picker(db, 'export')
+    if keyboard:
+        await message.answer("Выберите мероприятие для выгрузки программы:", reply_markup=keyboard)
+    else:
+        await message.answer("Нет запланированных мероприятий.")
+
+
+async def select_export_series(callback: CallbackQuery, callback_data: ExportSeriesCallback):
+    await callback.answer()
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=label, callback_data=ExportFileCallback(series_id=callback_data.id,
+                                                                            fmt=fmt).pack())]
+        for fmt, label in FORMATS.items()
+    ])
+    await callback.message.answer("Выберите формат файла:", reply_markup=keyboard)
+
+
+async def write_programme(db: AsyncSession, series, fmt: str, path: str) -> int:
+    """Построчно пишет события мероприятия в файл, читая их серверным курсором; возвращает число событий."""
+    query = (select(Event)
+             .where(Event.series_id == series.id)
+             .order_by(Event.date, Event.start_time, Event.id)
+             .execution_options(yield_per=EXPORT_YIELD_PER))
+    count = 0
+    if fmt == 'csv':
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(CSV_HEADER)
+            async for event in await db.stream_scalars(query):
+                writer.writerow(csv_row(event))
+                count += 1
+    else:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(ics_header(series))
+            async for event in await db.stream_scalars(query):
+                f.write(ics_event(event, stamp))
+                count += 1
+            f.write(ICS_FOOTER)
+    return count
+
+
+async def send_export(callback: CallbackQuery, callback_data: ExportFileCallback, db: AsyncSession):
+    await callback.answer()
+    series_id, fmt = callback_data.series_id, callback_data.fmt
+    if fmt not in FORMATS:
+        return
+    key = ('export', series_id, fmt, version('series', series_id))
+    cached_file = render_cache.get(key)
+    if cached_file:
+        file_id, caption = cached_file
+        await callback.message.answer_document(file_id, caption=caption)
+        return
+
+    series = await db.get(EventSeries, series_id)
+    if series is None:
+        await callback.message.answer("Мероприятие не найдено.")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, f"programme_{series_id}.{fmt}")
+        try:
+            count = await write_programme(db, series, fmt, path)
+        except Exception as e:
+            await callback.message.answer("Ошибка при выгрузке программы.")
+            print(f"Ошибка при выгрузке программы: {e}")
+            return
+        if not count:
+            await callback.message.answer("Нет событий в этом мероприятии.")
+            return
+
+        caption = f"Программа: {series.name}"
+        sent = await callback.message.answer_document(FSInputFile(path), caption=caption)
+    render_cache.set(key, (sent.document.file_id, caption))
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import tempfile
+
+from aiogram import Bot, Dispatcher, types
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Event
+from utils import admin_only
+from states import ImportEvents
+from cache import invalidate_series
+from pagination import register_series_picker, series_picker
+from programme import import_report, read_batches
+from callbacks import ImportSeriesCallback, callback_router
+
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 500))
+
+
+def register_import_cmd(dp: Dispatcher):
+    register_series_picker('import', ImportSeriesCallback)
+    dp.message.register(cmd_import, Command(commands=["import"]))
+    callback_router.register(ImportSeriesCallback, select_import_series)
+    dp.message.register(import_file, ImportEvents.waiting_for_file)
+
+
+@admin_only
+async def cmd_import(message: types.Message, state: FSMContext, db: AsyncSession):
+    keyboard = await series_picker(db, 'import')
+    if keyboard:
+        await message.answer("Выберите мероприятие, в которое нужно загрузить программу:", reply_markup=keyboard)
+        await state.set_state(ImportEvents.waiting_for_series)
+    else:
+        await message.answer("Нет мероприятий для загрузки программы.")
+
+
+async def select_import_series(callback: CallbackQuery, callback_data: ImportSeriesCallback, state: FSMContext):
+    await callback.answer()
+    await state.update_data(series_id=callback_data.id)
+    await callback.message.answer(
+        "Отправьте файл CSV или XLSX со столбцами: дата, время, название, место, спикеры, описание.\n"
+        "Дата - ДД.ММ.ГГГГ, время - ЧЧ:ММ - ЧЧ:ММ. Для отмены введите stop.")
+    await state.set_state(ImportEvents.waiting_for_file)
+
+
+async def import_events(db: AsyncSession, path: str, file_name: str, series_id: int):
+    """
+    Загружает события из файла пачками в одной транзакции, возвращает число событий и ошибки строк.
+    Разбор и проверка строк идут в отдельном потоке, чтобы большой файл не задерживал другие обновления.
+    """
+    imported = 0
+    errors = []
+    batches = read_batches(path, file_name, series_id, IMPORT_BATCH_SIZE)
+    try:
+        while (chunk := await asyncio.to_thread(next, batches, None)) is not None:
+            batch, batch_errors = chunk
+            errors.extend(batch_errors)
+            if batch:
+                await db.execute(insert(Event), batch)
+                imported += len(batch)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    finally:
+        batches.close()
+    return imported, errors
+
+
+async def import_file(message: types.Message, state: FSMContext, db: AsyncSession, bot: Bot):
+    if text := message.text:
+        if text.lower() == "stop":
+            await state.clear()
+            await message.answer("Загрузка программы прервана.")
+            return
+
+    document = message.document
+    if document is None or not (document.file_name or '').lower().endswith(('.csv', '.xlsx')):
+        await message.answer("Отправьте файл в формате CSV или XLSX.")
+        return
+
+    data = await state.get_data()
+    series_id = data['series_id']
+    suffix = os.path.splitext(document.file_name)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+        await bot.download(document, destination=tmp.name)
+        try:
+            imported, errors = await import_events(db, tmp.name, document.file_name, series_id)
+        except ValueError as e:
+            await message.answer(f"Не удалось загрузить программу: {e}")
+            return
+        except Exception as e:
+            await message.answer("Ошибка при загрузке программы.")
+            print(f"Ошибка при импорте программы: {e}")
+            await state.clear()
+            return
+
+    if imported:
+        invalidate_series(series_id)
+    await message.answer(import_report(imported, errors))
+    await state.clear()
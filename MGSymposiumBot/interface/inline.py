@@ -0,0 +1,83 @@
+import os
+from typing import Dict
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import (InlineKeyboardButton, InlineKeyboardMarkup, InlineQuery, InlineQueryResultArticle,
+                           InlineQueryResultsButton, InputTextMessageContent)
+from aiogram.utils.deep_linking import create_start_link
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cache import LRUCache, cached, version
+from models import Event
+from render import render_event
+from search import find_events
+from utils import format_time_range
+
+load_dotenv()
+
+INLINE_CACHE_TIME = int(os.getenv('INLINE_CACHE_TIME', 60))
+INLINE_SERIES_CACHE_SIZE = int(os.getenv('INLINE_SERIES_CACHE_SIZE', 256))
+INLINE_RESULTS = 50
+
+series_results = LRUCache(INLINE_SERIES_CACHE_SIZE)
+
+
+def register_inline_cmd(dp: Dispatcher):
+    dp.inline_query.register(inline_events)
+
+
+def event_result(event, link: str) -> InlineQueryResultArticle:
+    """
+    Карточка события для inline-режима. Текст берётся из render_event, а кнопки заменены
+    ссылкой на бота: в чужом чате нажатия на кнопки карточки не дойдут до обработчиков.
+    """
+    rendered = render_event(event)
+    return InlineQueryResultArticle(
+        id=str(event.id),
+        title=event.event,
+        description=(f"{event.date.strftime('%d.%m.%Y')} "
+                     f"{format_time_range(event.start_time, event.end_time)}, {event.room}"),
+        input_message_content=InputTextMessageContent(message_text=rendered.text,
+                                                      parse_mode=rendered.parse_mode),
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="Открыть в боте", url=link)]
+        ]),
+        thumbnail_url=event.image_url if event.image_url and event.image_url.startswith('http') else None,
+    )
+
+
+async def series_result_set(db: AsyncSession, bot: Bot, series_id: int) -> Dict[int, InlineQueryResultArticle]:
+    """Готовые inline-результаты всех событий мероприятия; пересобираются после его изменения."""
+    async def load():
+        result = await db.execute(select(Event).where(Event.series_id == series_id))
+        return {event.id: event_result(event, await create_start_link(bot, f'e{event.id}'))
+                for event in result.scalars()}
+    return await cached((series_id, version('series', series_id)), load, series_results)
+
+
+async def inline_events(inline_query: InlineQuery, db: AsyncSession, bot: Bot):
+    query = inline_query.query.strip()
+    if not query:
+        await inline_query.answer(
+            [], cache_time=INLINE_CACHE_TIME, is_personal=False,
+            button=InlineQueryResultsButton(text="Открыть программу в боте", start_parameter="inline"))
+        return
+
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+    try:
+        found = await find_events(db, query, offset, INLINE_RESULTS)
+        results = []
+        for event_id, series_id in found[:INLINE_RESULTS]:
+            series = await series_result_set(db, bot, series_id)
+            if event_id in series:
+                results.append(series[event_id])
+    except Exception as e:
+        print(f"Ошибка при обработке inline-запроса: {e}")
+        await inline_query.answer([], cache_time=0, is_personal=False)
+        return
+
+    await inline_query.answer(
+        results, cache_time=INLINE_CACHE_TIME, is_personal=False,
+        next_offset=str(offset + INLINE_RESULTS) if len(found) > INLINE_RESULTS else '')
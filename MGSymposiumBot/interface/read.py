@@ -1,144 +1,232 @@
 import os
+import re
+from typing import Optional, Tuple
+
 from dotenv import load_dotenv
-from aiogram import Dispatcher, types
-from aiogram.filters import Command
-from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
-from sqlalchemy.future import select
-from models import Event, EventSeries, get_db
-from utils import is_url_valid, format_date
+from sqlalchemy.ext.asyncio import AsyncSession
+from aiogram import Bot, Dispatcher, types
+from aiogram.filters import Command, CommandObject
+from aiogram.types import CallbackQuery
+from aiogram.utils.deep_linking import create_start_link
+from sqlalchemy import select
+from media import answer_photo_once, get_file_id
+from cache import cached, render_cache, store, version, writes
+from pagination import events_keyboard, register_event_picker, register_series_picker, series_picker
+from callbacks import EventCallback, RemindEventCallback, SeriesCallback, SeriesListCallback, callback_router
+from render import (RenderedMessage, all_series_row, edit_rendered, render_event, render_now,
+                    render_series, send_rendered)
+from repository import fetch_event_by_id, fetch_now_and_next, fetch_series_with_events
+from models import Event, EventSeries, Reminder
+from reminders import REMINDER_LEAD, ReminderScheduler, event_started
+from subscribers import record_subscriber
+from utils import admin_only, format_time_range, now_local
 
 load_dotenv()
 logo = os.getenv('MGSU_DEFAULT_LOGO')
 
+MESSAGE_LIMIT = 4000
+# s<id мероприятия> или e<id события>; re.ASCII - иначе \d принимает и цифры вроде «²» или «٣»
+DEEP_LINK = re.compile(r'([se])(\d+)', re.ASCII)
+ID = re.compile(r'\d+', re.ASCII)
+
+
+def parse_deep_link(payload: str) -> Optional[Tuple[str, int]]:
+    """Разбирает параметр /start: ('s', id мероприятия), ('e', id события) или None."""
+    match = DEEP_LINK.fullmatch(payload)
+    return (match[1], int(match[2])) if match else None
+
+
+async def render_start_keyboard(db):
+    return await cached(('series_list', version('series_list')),
+                        lambda: series_picker(db, 'start'), render_cache)
+
 
-async def fetch_event_series(db):
-    """Получает все серии мероприятий из базы данных."""
-    result = await db.execute(select(EventSeries))
-    return result.scalars().all()
-
-
-async def fetch_events_by_series_id(db, series_id):
-    """Получает все события на основе series_id."""
-    result = await db.execute(select(Event).filter(Event.series_id == series_id).order_by(Event.date))
-    return result.scalars().all()
-
-
-async def fetch_event_by_id(db, event_id):
-    """Получает одно событие по его ID."""
-    result = await db.execute(select(Event).filter(Event.id == event_id))
-    return result.scalars().first()
+async def render_series_view(db, series_id):
+    async def build():
+        events_series, page = await fetch_series_with_events(db, series_id)
+        keyboard = events_keyboard('events', series_id, page) if page.items else None
+        return render_series(events_series, keyboard)
+    return await cached(('series', series_id, version('series', series_id)), build, render_cache)
 
 
-async def fetch_event_series_by_id(db, series_id):
-    """Получает одну серию мероприятий по её ID."""
-    result = await db.execute(select(EventSeries).filter(EventSeries.id == series_id))
-    return result.scalars().first()
-
-
-async def cmd_start(message: types.Message):
-    async for db in get_db():
-        try:
-            event_series = await fetch_event_series(db)
-        except Exception as e:
-            await message.answer("Ошибка при получении списка мероприятий.")
-            print(f"Ошибка при получении списка серий мероприятий: {e}")
+async def render_event_view(db, event_id):
+    since = writes()
+    event = await fetch_event_by_id(db, event_id)
+    if event is None:
+        return None
+    # ключ строится после чтения события, поэтому карточка кладётся, только если кэш не сбрасывался
+    key = ('event', event_id, version('event', event_id), version('series', event.series_id))
+    rendered = render_cache.get(key)
+    if rendered is None:
+        rendered = render_event(event)
+        store(render_cache, key, rendered, since)
+    return rendered
+
+
+async def render_start_view(db) -> RenderedMessage:
+    keyboard = await render_start_keyboard(db)
+    if not keyboard:
+        return RenderedMessage(text="Нет запланированных мероприятий.")
+    photo = await get_file_id(db, 'default_logo', logo) if logo else None
+    return RenderedMessage(text="Список мероприятий: ", photo=photo, reply_markup=keyboard)
+
+
+async def send_series_view(message: types.Message, db: AsyncSession, series_id: int, edit: bool = False):
+    try:
+        rendered = await render_series_view(db, series_id)
+    except Exception as e:
+        await message.answer("Ошибка при получении событий.")
+        print(f"Ошибка при получении событий: {e}")
+        return
+
+    await (edit_rendered if edit else send_rendered)(message, rendered)
+
+
+async def send_event_view(message: types.Message, db: AsyncSession, event_id: int, edit: bool = False):
+    try:
+        rendered = await render_event_view(db, event_id)
+    except Exception as e:
+        await message.answer("Ошибка при получении деталей события.")
+        print(f"Ошибка при получении деталей события: {e}")
+        return
+
+    if rendered:
+        await (edit_rendered if edit else send_rendered)(message, rendered)
+    else:
+        await message.answer("Событие не найдено.")
+
+
+async def cmd_start(message: types.Message, db: AsyncSession, command: CommandObject):
+    try:
+        await record_subscriber(db, message.chat.id)
+    except Exception as e:
+        await db.rollback()
+        print(f"Ошибка при сохранении подписчика: {e}")
+
+    link = parse_deep_link(command.args or '')
+    if link is not None:
+        kind, target_id = link
+        await (send_series_view if kind == 's' else send_event_view)(message, db, target_id)
+        return
+
+    try:
+        keyboard = await render_start_keyboard(db)
+    except Exception as e:
+        await message.answer("Ошибка при получении списка мероприятий.")
+        print(f"Ошибка при получении списка серий мероприятий: {e}")
+        return
+
+    if keyboard:
+        if not await answer_photo_once(message, db, 'default_logo', logo,
+                                       caption="Список мероприятий: ", reply_markup=keyboard):
+            await message.answer("Список мероприятий: ", reply_markup=keyboard)
+    else:
+        await message.answer("Нет запланированных мероприятий.")
+
+
+async def show_series_list(callback: CallbackQuery, db: AsyncSession):
+    await callback.answer()
+    try:
+        rendered = await render_start_view(db)
+    except Exception as e:
+        await callback.message.answer("Ошибка при получении списка мероприятий.")
+        print(f"Ошибка при получении списка серий мероприятий: {e}")
+        return
+
+    await edit_rendered(callback.message, rendered)
+
+
+async def show_events(callback: CallbackQuery, callback_data: SeriesCallback, db: AsyncSession):
+    await callback.answer()
+    await send_series_view(callback.message, db, callback_data.id, edit=True)
+
+
+async def show_event_details(callback: CallbackQuery, callback_data: EventCallback, db: AsyncSession):
+    await callback.answer()
+    await send_event_view(callback.message, db, callback_data.id, edit=True)
+
+
+async def toggle_reminder(callback: CallbackQuery, callback_data: RemindEventCallback, db: AsyncSession,
+                          reminders: ReminderScheduler):
+    """Первое нажатие включает напоминание о событии, повторное - отменяет его."""
+    try:
+        result = await db.execute(select(Reminder).where(
+            Reminder.chat_id == callback.from_user.id, Reminder.event_id == callback_data.id))
+        reminder = result.scalar_one_or_none()
+        if reminder:
+            await db.delete(reminder)
+            await db.commit()
+            reminders.cancel(reminder.id)
+            await callback.answer("Напоминание отменено.")
             return
 
-        if event_series:
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(
-                    text=f"{series.name}: {format_date(series.start_date, series.end_date)}",
-                    callback_data=f"series_{series.id}")
-                 ] for series in sorted(event_series, key=lambda s: s.start_date)
-            ])
-            if is_url_valid(logo):
-                await message.answer_photo(photo=logo, caption="Список мероприятий: ", reply_markup=keyboard)
-            else:
-                await message.answer("Список мероприятий: ", reply_markup=keyboard)
-        else:
-            await message.answer("Нет запланированных мероприятий.")
-
-
-async def show_events(callback: CallbackQuery):
-    series_id = int(callback.data.split("_")[1])
-    async for db in get_db():
-        try:
-            events = await fetch_events_by_series_id(db, series_id)
-            events_series = await fetch_event_series_by_id(db, series_id)
-        except Exception as e:
-            await callback.message.answer("Ошибка при получении событий.")
-            print(f"Ошибка при получении событий: {e}")
+        event = await fetch_event_by_id(db, callback_data.id)
+        if event is None:
+            await callback.answer("Событие не найдено.")
             return
-
-        if events:
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(
-                    text=f"{event.event}: {format_date(event.date, event.date)}, {event.time}",
-                    callback_data=f"event_{event.id}")
-                 ] for event in events
-            ])
-            series_details = (
-                f"<b>{events_series.name}</b>"
-                f"\nДата начала: {events_series.start_date.strftime('%d.%m.%Y')}"
-                f"\nДата окончания: {events_series.end_date.strftime('%d.%m.%Y')}"
-            )
-            if events_series.description and events_series.description != "-":
-                series_details += f"\nОписание: {events_series.description}"
-
-            if events_series.image_url:
-                await callback.message.answer_photo(
-                    photo=events_series.image_url,
-                    caption=series_details,
-                    reply_markup=keyboard,
-                    parse_mode='HTML'
-                )
-            else:
-                await callback.message.answer(
-                    text=series_details,
-                    reply_markup=keyboard,
-                    parse_mode='HTML'
-                )
-        else:
-            await callback.message.answer("Нет событий в этом мероприятии.")
-
-
-async def show_event_details(callback: CallbackQuery):
-    event_id = int(callback.data.split("_")[1])
-    async for db in get_db():
-        try:
-            event = await fetch_event_by_id(db, event_id)
-        except Exception as e:
-            await callback.message.answer("Ошибка при получении деталей события.")
-            print(f"Ошибка при получении деталей события: {e}")
+        if event_started(event, now_local()):
+            await callback.answer("Событие уже началось.")
             return
-
-        if event:
-            details = (
-                f"<b>Мероприятие:</b> {event.event}\n"
-                f"<b>Дата:</b> {event.date.strftime('%d.%m.%Y')}\n"
-                f"<b>Время:</b> {event.time}\n"
-                f"<b>Место:</b> {event.room}\n"
-            )
-            if event.speakers and event.speakers != "-":
-                details += f"<b>Спикеры:</b> {event.speakers}\n"
-            if event.description and event.description != "-":
-                details += f"<b>Описание:</b> {event.description}\n"
-
-            if event.image_url:
-                await callback.message.answer_photo(
-                    photo=event.image_url,
-                    caption=details,
-                    parse_mode='HTML'
-                )
-            else:
-                await callback.message.answer(details, parse_mode='HTML')
-        else:
-            await callback.message.answer("Событие не найдено.")
+        await reminders.add(db, callback.from_user.id, event)
+    except Exception as e:
+        await db.rollback()
+        await callback.answer("Не удалось сохранить напоминание.")
+        print(f"Ошибка при сохранении напоминания: {e}")
+        return
+
+    minutes = int(REMINDER_LEAD.total_seconds() // 60)
+    await callback.answer(f"Напомню за {minutes} мин. до начала. Нажмите ещё раз, чтобы отменить.")
+
+
+@admin_only
+async def cmd_links(message: types.Message, db: AsyncSession, bot: Bot, command: CommandObject):
+    """Ссылки для QR-кодов: /links - на мероприятия, /links <id мероприятия> - на его события."""
+    if command.args and ID.fullmatch(command.args.strip()):
+        series_id = int(command.args)
+        result = await db.execute(
+            select(Event.id, Event.event, Event.date, Event.start_time, Event.end_time)
+            .where(Event.series_id == series_id)
+            .order_by(Event.date, Event.start_time, Event.id))
+        lines = [f"{name} ({date.strftime('%d.%m.%Y')} {format_time_range(start, end)}): "
+                 f"{await create_start_link(bot, f'e{event_id}')}"
+                 for event_id, name, date, start, end in result]
+    else:
+        result = await db.execute(
+            select(EventSeries.id, EventSeries.name).order_by(EventSeries.start_date, EventSeries.id))
+        lines = [f"{name} (id {series_id}): {await create_start_link(bot, f's{series_id}')}"
+                 for series_id, name in result]
+
+    if not lines:
+        await message.answer("Нет данных для ссылок.")
+        return
+
+    chunk = ""
+    for line in lines:
+        if len(chunk) + len(line) + 1 > MESSAGE_LIMIT:
+            await message.answer(chunk, disable_web_page_preview=True)
+            chunk = ""
+        chunk += line + "\n"
+    await message.answer(chunk, disable_web_page_preview=True)
+
+
+async def cmd_now(message: types.Message, db: AsyncSession):
+    try:
+        current, upcoming = await fetch_now_and_next(db, now_local())
+    except Exception as e:
+        await message.answer("Ошибка при получении текущих событий.")
+        print(f"Ошибка при получении текущих событий: {e}")
+        return
+
+    await send_rendered(message, render_now(current, upcoming))
 
 
 def register_read_cmd(dp: Dispatcher):
+    register_series_picker('start', SeriesCallback)
+    register_event_picker('events', EventCallback, footer=lambda series_id: all_series_row())
     dp.message.register(cmd_start, Command(commands=["start"]))
-    dp.callback_query.register(
-        show_events, lambda c: c.data.startswith("series_"))
-    dp.callback_query.register(
-        show_event_details, lambda c: c.data.startswith("event_"))
+    dp.message.register(cmd_now, Command(commands=["now"]))
+    dp.message.register(cmd_links, Command(commands=["links"]))
+    callback_router.register(SeriesListCallback, show_series_list)
+    callback_router.register(SeriesCallback, show_events)
+    callback_router.register(EventCallback, show_event_details)
+    callback_router.register(RemindEventCallback, toggle_reminder)
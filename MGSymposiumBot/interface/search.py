@@ -0,0 +1,96 @@
+from aiogram import Dispatcher, types
+from aiogram.filters import Command, CommandObject
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from callbacks import EventCallback, SearchPageCallback, callback_router
+from pagination import event_label
+from repository import PAGE_SIZE, Page
+from search import search_events
+from states import SearchEvents
+
+SEARCH_MAX_LENGTH = 200
+
+
+def register_search_cmd(dp: Dispatcher):
+    dp.message.register(cmd_search, Command(commands=["search"]))
+    dp.message.register(search_query, SearchEvents.waiting_for_query)
+    callback_router.register(SearchPageCallback, turn_search_page)
+
+
+def search_keyboard(page: Page, offset: int) -> InlineKeyboardMarkup:
+    rows = [
+        [InlineKeyboardButton(text=event_label(event), callback_data=EventCallback(id=event.id).pack())]
+        for event in page.items
+    ]
+    nav = []
+    if page.has_prev:
+        nav.append(InlineKeyboardButton(
+            text="◀️ Назад", callback_data=SearchPageCallback(offset=max(offset - PAGE_SIZE, 0)).pack()))
+    if page.has_next:
+        nav.append(InlineKeyboardButton(
+            text="Вперёд ▶️", callback_data=SearchPageCallback(offset=offset + PAGE_SIZE).pack()))
+    if nav:
+        rows.append(nav)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+async def send_results(message: types.Message, db: AsyncSession, query: str, offset: int = 0, edit: bool = False):
+    try:
+        page = await search_events(db, query, offset)
+    except Exception as e:
+        await message.answer("Ошибка при поиске событий.")
+        print(f"Ошибка при поиске событий: {e}")
+        return
+
+    if not page.items:
+        await message.answer(f"По запросу «{query}» ничего не найдено.")
+        return
+
+    text = f"Результаты поиска «{query}»:"
+    keyboard = search_keyboard(page, offset)
+    if edit:
+        await message.edit_text(text, reply_markup=keyboard)
+    else:
+        await message.answer(text, reply_markup=keyboard)
+
+
+async def run_search(message: types.Message, state: FSMContext, db: AsyncSession, query: str):
+    query = query.strip()
+    if len(query) > SEARCH_MAX_LENGTH:
+        await message.answer(f"Слишком длинный запрос, максимум {SEARCH_MAX_LENGTH} символов.")
+        return
+    # запрос не помещается в callback_data кнопок листания, поэтому хранится в данных диалога
+    await state.update_data(search_query=query)
+    await send_results(message, db, query)
+
+
+async def cmd_search(message: types.Message, state: FSMContext, db: AsyncSession, command: CommandObject):
+    if command.args and command.args.strip():
+        await state.clear()
+        await run_search(message, state, db, command.args)
+        return
+    await message.answer("Введите название события, имя спикера или слово из описания (или stop для отмены):")
+    await state.set_state(SearchEvents.waiting_for_query)
+
+
+async def search_query(message: types.Message, state: FSMContext, db: AsyncSession):
+    if not message.text:
+        await message.answer("Запрос должен быть текстом.")
+        return
+    await state.set_state(None)
+    if message.text.lower() == "stop":
+        await message.answer("Поиск отменён.")
+        return
+    await run_search(message, state, db, message.text)
+
+
+async def turn_search_page(callback: CallbackQuery, callback_data: SearchPageCallback, state: FSMContext,
+                           db: AsyncSession):
+    query = (await state.get_data()).get('search_query')
+    if not query:
+        await callback.answer("Результаты поиска устарели. Повторите /search.")
+        return
+    await callback.answer()
+    await send_results(callback.message, db, query, callback_data.offset, edit=True)
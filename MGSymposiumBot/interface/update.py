@@ -1,20 +1,24 @@
-from datetime import datetime
 from aiogram import Dispatcher, types
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram.types import CallbackQuery
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 
-from models import Event, EventSeries, get_db
-from utils import admin_only, format_date
+from models import Event, EventSeries
+from utils import admin_only, parse_date, parse_time_range
 from states import UpdateEvent, UpdateEventSeries
+from cache import invalidate_event, invalidate_series
+from reminders import ReminderScheduler
+from pagination import events_picker, register_event_picker, register_series_picker, series_picker
+from callbacks import UpdateEventCallback, UpdateEventSeriesCallback, UpdateSeriesCallback, callback_router
 
 
 def register_update_cmd(dp: Dispatcher):
+    register_series_picker('update', UpdateSeriesCallback)
+    register_series_picker('update_ev', UpdateEventSeriesCallback)
+    register_event_picker('update_ev', UpdateEventCallback)
     dp.message.register(cmd_update_event_series, Command(commands=["update"]))
-    dp.callback_query.register(
-        select_event_series_to_update, lambda c: c.data.startswith("update_event_series_"))
+    callback_router.register(UpdateSeriesCallback, select_event_series_to_update)
     dp.message.register(update_event_series_name,
                         UpdateEventSeries.waiting_for_name)
     dp.message.register(update_event_series_start_date,
@@ -27,10 +31,8 @@ def register_update_cmd(dp: Dispatcher):
                         UpdateEventSeries.waiting_for_photo_url)
 
     dp.message.register(cmd_update_event, Command(commands=["update_event"]))
-    dp.callback_query.register(select_event_series_for_update_event,
-                               lambda c: c.data.startswith("select_event_series_"))
-    dp.callback_query.register(
-        select_event_to_update, lambda c: c.data.startswith("update_selected_event_"))
+    callback_router.register(UpdateEventSeriesCallback, select_event_series_for_update_event)
+    callback_router.register(UpdateEventCallback, select_event_to_update)
     dp.message.register(update_event_name, UpdateEvent.waiting_for_event_name)
     dp.message.register(update_event_date, UpdateEvent.waiting_for_event_date)
     dp.message.register(update_event_time, UpdateEvent.waiting_for_event_time)
@@ -45,32 +47,23 @@ def register_update_cmd(dp: Dispatcher):
 
 
 @admin_only
-async def cmd_update_event_series(message: types.Message, state: FSMContext):
+async def cmd_update_event_series(message: types.Message, state: FSMContext, db: AsyncSession):
     if message.text.lower() == "stop":
         await state.clear()
         await message.answer("Редактирование мероприятия прервано.")
         return
 
-    db: AsyncSession = await get_db().__anext__()
-    result = await db.execute(select(EventSeries))
-    event_series = result.scalars().all()
+    keyboard = await series_picker(db, 'update')
 
-    if event_series:
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text=f"{series.name}: {format_date(series.start_date, series.end_date)}",
-                                  callback_data=f"update_event_series_{series.id}")]
-            for series in event_series
-        ])
+    if keyboard:
         await message.answer("Выберите мероприятие для редактирования:", reply_markup=keyboard)
     else:
         await message.answer("Нет мероприятий для редактирования.")
 
-    await db.close()
-
 
-async def select_event_series_to_update(callback: CallbackQuery, state: FSMContext):
-    series_id = int(callback.data.split("_")[3])
-    await state.update_data(series_id=series_id)
+async def select_event_series_to_update(callback: CallbackQuery, callback_data: UpdateSeriesCallback,
+                                        state: FSMContext):
+    await state.update_data(series_id=callback_data.id)
     await callback.message.answer("Введите новое название мероприятия:")
     await state.set_state(UpdateEventSeries.waiting_for_name)
 
@@ -93,7 +86,7 @@ async def update_event_series_start_date(message: types.Message, state: FSMConte
         await message.answer("Редактирование мероприятия прервано.")
         return
     try:
-        new_start_date = datetime.strptime(message.text, "%d.%m.%Y").date()
+        new_start_date = parse_date(message.text)
         await state.update_data(new_start_date=new_start_date)
         await message.answer("Введите новую дату окончания мероприятия (в формате ДД.ММ.ГГГГ):")
         await state.set_state(UpdateEventSeries.waiting_for_end_date)
@@ -107,7 +100,7 @@ async def update_event_series_end_date(message: types.Message, state: FSMContext
         await message.answer("Редактирование мероприятия прервано.")
         return
     try:
-        new_end_date = datetime.strptime(message.text, "%d.%m.%Y").date()
+        new_end_date = parse_date(message.text)
         data = await state.get_data()
         new_start_date = data.get('new_start_date')
         if new_end_date < new_start_date:
@@ -133,7 +126,7 @@ async def update_event_series_description(message: types.Message, state: FSMCont
     await state.set_state(UpdateEventSeries.waiting_for_photo_url)
 
 
-async def update_event_series_photo_url(message: types.Message, state: FSMContext):
+async def update_event_series_photo_url(message: types.Message, state: FSMContext, db: AsyncSession):
     if text := message.text:
         if text.lower() == "stop":
             await state.clear()
@@ -147,7 +140,6 @@ async def update_event_series_photo_url(message: types.Message, state: FSMContex
     new_end_date = data['new_end_date']
     new_description = data.get('new_description')
 
-    db: AsyncSession = await get_db().__anext__()
     event_series = await db.get(EventSeries, series_id)
 
     if event_series:
@@ -158,62 +150,44 @@ async def update_event_series_photo_url(message: types.Message, state: FSMContex
             event_series.description = new_description
         event_series.image_url = message.photo[-1].file_id if message.photo else None
         await db.commit()
+        invalidate_series(series_id)
 
         await message.answer(f"Мероприятие '{new_name}' успешно обновлено.")
     else:
         await message.answer("Мероприятие не найдено.")
 
-    await db.close()
     await state.clear()
 
 
 @admin_only
-async def cmd_update_event(message: types.Message, state: FSMContext):
+async def cmd_update_event(message: types.Message, state: FSMContext, db: AsyncSession):
     if message.text.lower() == "stop":
         await state.clear()
         await message.answer("Редактирование события прервано.")
         return
 
-    db: AsyncSession = await get_db().__anext__()
-    result = await db.execute(select(EventSeries))
-    event_series = result.scalars().all()
+    keyboard = await series_picker(db, 'update_ev')
 
-    if event_series:
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text=f"{series.name}: {format_date(series.start_date, series.end_date)}",
-                                  callback_data=f"select_event_series_{series.id}")]
-            for series in event_series
-        ])
+    if keyboard:
         await message.answer("Выберите мероприятие, в котором нужно обновить событие:", reply_markup=keyboard)
     else:
         await message.answer("Нет мероприятий для обновления событий.")
 
-    await db.close()
 
-
-async def select_event_series_for_update_event(callback: CallbackQuery, state: FSMContext):
-    series_id = int(callback.data.split("_")[3])
+async def select_event_series_for_update_event(callback: CallbackQuery, callback_data: UpdateEventSeriesCallback,
+                                               state: FSMContext, db: AsyncSession):
+    series_id = callback_data.id
     await state.update_data(series_id=series_id)
-    db: AsyncSession = await get_db().__anext__()
-    result = await db.execute(select(Event).filter(Event.series_id == series_id))
-    events = result.scalars().all()
-
-    if events:
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text=f"{event.event}: {format_date(event.date, event.date)}, {event.time}",
-                                  callback_data=f"update_selected_event_{event.id}")]
-            for event in events
-        ])
+    keyboard = await events_picker(db, 'update_ev', series_id)
+
+    if keyboard:
         await callback.message.answer("Выберите событие для обновления:", reply_markup=keyboard)
     else:
         await callback.message.answer("Нет событий для обновления.")
 
-    await db.close()
-
 
-async def select_event_to_update(callback: CallbackQuery, state: FSMContext):
-    event_id = int(callback.data.split("_")[3])
-    await state.update_data(event_id=event_id)
+async def select_event_to_update(callback: CallbackQuery, callback_data: UpdateEventCallback, state: FSMContext):
+    await state.update_data(event_id=callback_data.id)
     await callback.message.answer("Введите новое название события:")
     await state.set_state(UpdateEvent.waiting_for_event_name)
 
@@ -235,7 +209,7 @@ async def update_event_date(message: types.Message, state: FSMContext):
         await message.answer("Редактирование события прервано.")
         return
     try:
-        new_event_date = datetime.strptime(message.text, "%d.%m.%Y").date()
+        new_event_date = parse_date(message.text)
         await state.update_data(new_event_date=new_event_date)
         await message.answer("Введите новое время события (ЧЧ:ММ - ЧЧ:ММ):")
         await state.set_state(UpdateEvent.waiting_for_event_time)
@@ -249,17 +223,14 @@ async def update_event_time(message: types.Message, state: FSMContext):
         await message.answer("Редактирование события прервано.")
         return
 
-    time_input = message.text.strip()
     try:
-        start_time_str, end_time_str = time_input.split('-')
-        start_time = datetime.strptime(start_time_str.strip(), "%H:%M").time()
-        end_time = datetime.strptime(end_time_str.strip(), "%H:%M").time()
+        start_time, end_time = parse_time_range(message.text)
 
         if start_time >= end_time:
             await message.answer("Время начала не может быть позже или равно времени окончания. Попробуйте снова.")
             return
 
-        await state.update_data(new_event_time=f"{start_time.strftime('%H:%M')} - {end_time.strftime('%H:%M')}")
+        await state.update_data(new_start_time=start_time, new_end_time=end_time)
         await message.answer("Введите новое место проведения события:")
         await state.set_state(UpdateEvent.waiting_for_location)
 
@@ -303,7 +274,8 @@ async def update_event_speakers(message: types.Message, state: FSMContext):
     await state.set_state(UpdateEvent.waiting_for_photo_url)
 
 
-async def update_event_photo_url(message: types.Message, state: FSMContext):
+async def update_event_photo_url(message: types.Message, state: FSMContext, db: AsyncSession,
+                                 reminders: ReminderScheduler):
     if text := message.text:
         if text.lower() == "stop":
             await state.clear()
@@ -314,29 +286,31 @@ async def update_event_photo_url(message: types.Message, state: FSMContext):
     event_id = data['event_id']
     new_event_name = data['new_event_name']
     new_event_date = data['new_event_date']
-    new_event_time = data['new_event_time']
+    new_start_time = data['new_start_time']
+    new_end_time = data['new_end_time']
     new_location = data['new_location']
     new_speakers = data.get('new_speakers')
     new_description = data.get('new_description')
 
-    db: AsyncSession = await get_db().__anext__()
     event = await db.get(Event, event_id)
 
     if event:
         event.event = new_event_name
         event.date = new_event_date
-        event.time = new_event_time
+        event.start_time = new_start_time
+        event.end_time = new_end_time
         event.room = new_location
         if new_speakers:
             event.speakers = new_speakers
         if new_description:
             event.description = new_description
         event.image_url = message.photo[-1].file_id if message.photo else None
+        await reminders.reschedule_event(db, event)
         await db.commit()
+        invalidate_event(event_id, event.series_id)
 
         await message.answer(f"Событие '{new_event_name}' успешно обновлено.")
     else:
         await message.answer("Событие не найдено.")
 
-    await db.close()
     await state.clear()
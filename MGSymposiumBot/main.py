@@ -1,24 +1,62 @@
 import asyncio
+import contextlib
 import logging
 import os
+from aiohttp import web
 from aiogram import Bot, Dispatcher, types
 from aiogram.filters import Command
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.memory import DisabledEventIsolation, MemoryStorage
+from aiogram.webhook.aiohttp_server import setup_application
 
 from dotenv import load_dotenv
 
-from models import init_db
+from models import AsyncSessionLocal, engine, init_db
+from outbound import Outbox, SenderLock
+from reminders import ReminderScheduler
+from metrics import FSM_STATES, METRICS_ENABLED, METRICS_HOST, METRICS_PORT, setup_metrics
+from middlewares import (DbSessionMiddleware, HandlerContextMiddleware, TelegramApiMetricsMiddleware,
+                         ThrottlingMiddleware, UpdateMetricsMiddleware)
+from storage import SQLFSMContextMiddleware, SQLStorage
+from webhook import (WEBHOOK_HOST, WEBHOOK_PATH, WEBHOOK_PORT, WEBHOOK_SECRET, WEBHOOK_URL,
+                     WebhookIngress)
+from utils import refresh_url, close_http_session
 from interface.read import register_read_cmd
 from interface.create import register_create_cmd
 from interface.update import register_update_cmd
 from interface.delete import register_delete_cmd
+from interface.imports import register_import_cmd
+from interface.export import register_export_cmd
+from interface.broadcast import register_broadcast_cmd
+from interface.search import register_search_cmd
+from interface.inline import register_inline_cmd
+from pagination import register_pagination
+from callbacks import register_callbacks
 
 load_dotenv()
 
 bot = Bot(token=os.getenv("BOT_TOKEN"))
+bot.session.middleware(TelegramApiMetricsMiddleware())
 logo = os.getenv('MGSU_DEFAULT_LOGO')
-storage = MemoryStorage()
-dispatcher = Dispatcher(storage=storage)
+# FSM-middleware подключается в register_handlers после ограничения частоты обновлений
+if os.getenv('FSM_STORAGE', 'sql') == 'memory':
+    storage = MemoryStorage()
+    dispatcher = Dispatcher(storage=storage, disable_fsm=True)
+else:
+    storage = SQLStorage(
+        AsyncSessionLocal,
+        ttl=float(os.getenv('FSM_TTL', 86400)),
+        cache_ttl=float(os.getenv('FSM_CACHE_TTL', 0)),
+    )
+    dispatcher = Dispatcher(storage=storage, disable_fsm=True)
+    dispatcher.fsm = SQLFSMContextMiddleware(storage=storage, events_isolation=DisabledEventIsolation())
+outbox = Outbox(bot, AsyncSessionLocal, sender_lock=SenderLock(engine))
+dispatcher['outbox'] = outbox
+reminders = ReminderScheduler(AsyncSessionLocal, outbox)
+dispatcher['reminders'] = reminders
+
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+THROTTLE_RATE = float(os.getenv('THROTTLE_RATE', 2))
+THROTTLE_BURST = float(os.getenv('THROTTLE_BURST', 5))
 
 logging.basicConfig(level=logging.INFO)
 
@@ -30,12 +68,19 @@ async def cmd_help(message: types.Message):
             "Доступные команды:\n"
             "/help - Показать это сообщение\n"
             "/start - Показать список мероприятий\n"
+            "/now - Что идёт сейчас и что будет дальше\n"
+            "/search - Найти событие по названию, спикеру или описанию\n"
+            "/export - Скачать программу мероприятия (CSV или календарь)\n"
             "/create - Создать новое мероприятие\n"
             "/create_event - Создать событие внутри мероприятия\n"
             "/delete - Удалить мероприятие и все связанные с ним события \n"
             "/delete_event - Удалить событие\n"
             "/update - Редактировать существующее мероприятие\n"
             "/update_event - Редактировать существующее событие\n"
+            "/links - Ссылки на мероприятия для QR-кодов (/links <id> - на события мероприятия)\n"
+            "/broadcast - Отправить объявление всем подписчикам\n"
+            "/broadcast_status - Ход последних рассылок\n"
+            "/import - Загрузить программу мероприятия из файла CSV/XLSX\n"
             "/id - Показать твой ID (Нужно для администрирования бота)\n\n"
             "Чтобы прервать создание или редактирование мероприятия/события - введите слово stop"
         )
@@ -43,6 +88,9 @@ async def cmd_help(message: types.Message):
         help_text = (
             "Доступные команды:\n"
             "/start - Показать список мероприятий\n"
+            "/now - Что идёт сейчас и что будет дальше\n"
+            "/search - Найти событие по названию, спикеру или описанию\n"
+            "/export - Скачать программу мероприятия (CSV или календарь)\n"
             "/help - Показать это сообщение\n"
         )
     await message.answer(help_text)
@@ -54,17 +102,108 @@ async def cmd_id(message: types.Message):
     await message.answer(f"Ваш ID пользователя: {user_id}")
 
 
+def fsm_state_counts():
+    if isinstance(storage, SQLStorage):
+        return storage.count_states()
+    counts = {}
+    for record in storage.storage.values():
+        if record.state:
+            counts[(record.state,)] = counts.get((record.state,), 0) + 1
+    return counts
+
+
 def register_handlers():
+    dispatcher.update.outer_middleware(UpdateMetricsMiddleware())
+    if THROTTLE_RATE > 0:
+        dispatcher.update.outer_middleware(ThrottlingMiddleware(THROTTLE_RATE, THROTTLE_BURST))
+    # состояние читается из БД только для обновлений, прошедших ограничение частоты
+    dispatcher.update.outer_middleware(dispatcher.fsm)
+    dispatcher.update.middleware(DbSessionMiddleware(AsyncSessionLocal))
+    dispatcher.message.middleware(HandlerContextMiddleware())
+    dispatcher.callback_query.middleware(HandlerContextMiddleware())
+    dispatcher.inline_query.middleware(HandlerContextMiddleware())
     register_read_cmd(dispatcher)
     register_create_cmd(dispatcher)
     register_update_cmd(dispatcher)
     register_delete_cmd(dispatcher)
+    register_import_cmd(dispatcher)
+    register_export_cmd(dispatcher)
+    register_broadcast_cmd(dispatcher)
+    register_search_cmd(dispatcher)
+    register_inline_cmd(dispatcher)
+    register_pagination(dispatcher)
+    register_callbacks(dispatcher)
+
+
+async def run_webhook():
+    app = web.Application()
+    WebhookIngress(dispatcher, bot, secret_token=WEBHOOK_SECRET).setup(app)
+    setup_application(app, dispatcher, bot=bot)
+    if METRICS_ENABLED:
+        setup_metrics(app)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+    await bot.set_webhook(
+        f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+        secret_token=WEBHOOK_SECRET,
+        allowed_updates=dispatcher.resolve_used_update_types()
+    )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def run_polling():
+    runner = None
+    if METRICS_ENABLED:
+        app = web.Application()
+        setup_metrics(app)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, METRICS_HOST, METRICS_PORT).start()
+
+    await bot.delete_webhook()
+    try:
+        await dispatcher.start_polling(bot)
+    finally:
+        if runner is not None:
+            await runner.cleanup()
 
 
 async def main():
+    if BOT_MODE == 'webhook' and not WEBHOOK_SECRET:
+        raise SystemExit("Для режима webhook нужно задать WEBHOOK_SECRET")
     await init_db()
+    if logo:
+        await refresh_url(logo)
     register_handlers()
-    await dispatcher.start_polling(bot)
+    FSM_STATES.set_function(fsm_state_counts)
+    if isinstance(storage, SQLStorage):
+        cleanup = asyncio.create_task(storage.run_cleanup())
+    outbox_task = asyncio.create_task(outbox.run())
+    reminders_task = asyncio.create_task(reminders.run())
+    try:
+        if BOT_MODE == 'webhook':
+            await run_webhook()
+        else:
+            await run_polling()
+    finally:
+        # фоновые задачи отменяются по очереди, и каждая дожидается выхода из своей сессии БД:
+        # напоминания успевают откатить транзакцию, а outbox - сохранить прогресс отправки
+        tasks = [reminders_task, outbox_task]
+        if isinstance(storage, SQLStorage):
+            tasks.append(cleanup)
+        for task in tasks:
+            task.cancel()
+            try:
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+            except Exception as e:
+                print(f"Ошибка при остановке фоновой задачи: {e}")
+        await close_http_session()
 
 if __name__ == "__main__":
     asyncio.run(main())
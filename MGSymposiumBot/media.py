@@ -0,0 +1,64 @@
+from typing import Dict, Optional, Tuple
+
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import MediaFile
+from utils import is_url_valid
+
+_file_ids: Dict[str, Tuple[str, str]] = {}
+
+
+async def get_file_id(db: AsyncSession, key: str, source_url: str) -> Optional[str]:
+    """Возвращает сохранённый file_id для медиафайла, если он загружен из того же URL."""
+    cached = _file_ids.get(key)
+    if cached is None:
+        media = await db.get(MediaFile, key)
+        if media is None:
+            return None
+        cached = _file_ids[key] = (media.source_url, media.file_id)
+    url, file_id = cached
+    return file_id if url == source_url else None
+
+
+async def save_file_id(db: AsyncSession, key: str, source_url: str, file_id: str):
+    await db.merge(MediaFile(key=key, source_url=source_url, file_id=file_id))
+    await db.commit()
+    _file_ids[key] = (source_url, file_id)
+
+
+async def forget_file_id(db: AsyncSession, key: str):
+    _file_ids.pop(key, None)
+    media = await db.get(MediaFile, key)
+    if media is not None:
+        await db.delete(media)
+        await db.commit()
+
+
+async def answer_photo_once(message: types.Message, db: AsyncSession, key: str, source_url: str,
+                            **kwargs) -> bool:
+    """
+    Отправляет фотографию по сохранённому file_id. Загружает её по URL только
+    при первой отправке или если Telegram отклонил file_id.
+    Возвращает False, если фотографию отправить не удалось.
+    """
+    if not source_url:
+        return False
+
+    file_id = await get_file_id(db, key, source_url)
+    if file_id:
+        try:
+            await message.answer_photo(photo=file_id, **kwargs)
+            return True
+        except TelegramBadRequest as e:
+            print(f"Telegram отклонил file_id для {key}: {e}")
+            await forget_file_id(db, key)
+
+    if not is_url_valid(source_url):
+        return False
+
+    sent = await message.answer_photo(photo=source_url, **kwargs)
+    if sent.photo:
+        await save_file_id(db, key, source_url, sent.photo[-1].file_id)
+    return True
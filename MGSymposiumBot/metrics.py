@@ -0,0 +1,167 @@
+import inspect
+import os
+from bisect import bisect_left
+from threading import Lock
+from typing import Awaitable, Callable, Dict, List, Sequence, Tuple, Union
+
+from aiohttp import web
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_HOST = os.getenv('METRICS_HOST', '0.0.0.0')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 8000))
+METRICS_PATH = os.getenv('METRICS_PATH', '/metrics')
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_registry: List = []
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus с фиксированными границами корзин."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, List] = {}
+        self._lock = Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, *labels):
+        # Пул соединений SQLAlchemy может вызывать observe из другого потока
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Монотонно растущий счётчик."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = Lock()
+        _registry.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(self.labelnames, labels)} {value}" for labels, value in items)
+        return lines
+
+
+GaugeFunction = Callable[[], Union[Dict[Tuple, float], Awaitable[Dict[Tuple, float]]]]
+
+
+class Gauge:
+    """Текущее значение, которое вычисляется функцией в момент запроса метрик."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._function: GaugeFunction = dict
+        _registry.append(self)
+
+    def set_function(self, function: GaugeFunction):
+        """function возвращает словарь {кортеж значений меток: значение}."""
+        self._function = function
+
+    async def render(self) -> List[str]:
+        values = self._function()
+        if inspect.isawaitable(values):
+            values = await values
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        lines.extend(f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+                     for labels, value in values.items())
+        return lines
+
+
+async def render_metrics() -> str:
+    """Все зарегистрированные метрики в текстовом формате Prometheus."""
+    lines = []
+    for metric in _registry:
+        rendered = metric.render()
+        if inspect.isawaitable(rendered):
+            try:
+                rendered = await rendered
+            except Exception as e:
+                print(f"Ошибка при сборе метрики {metric.name}: {e}")
+                continue
+        lines.extend(rendered)
+    return "\n".join(lines) + "\n"
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(text=await render_metrics(), content_type='text/plain', charset='utf-8')
+
+
+def setup_metrics(app: web.Application, path: str = METRICS_PATH):
+    app.router.add_get(path, metrics_handler)
+
+
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    'db_pool_checkout_seconds', 'Время ожидания соединения из пула БД')
+DB_POOL_IN_USE = Gauge(
+    'db_pool_connections_in_use', 'Соединения БД, выданные из пула')
+UPDATES_TOTAL = Counter(
+    'bot_updates_total', 'Полученные обновления Telegram', labelnames=('type',))
+UPDATE_SECONDS = Histogram(
+    'bot_update_seconds', 'Полное время обработки обновления', labelnames=('type',))
+UPDATE_DB_SECONDS = Histogram(
+    'bot_update_db_seconds', 'Суммарное время SQL-запросов за одно обновление', labelnames=('type',))
+HANDLER_SECONDS = Histogram(
+    'bot_handler_seconds', 'Время работы обработчика', labelnames=('handler',))
+HANDLER_ERRORS_TOTAL = Counter(
+    'bot_handler_errors_total', 'Исключения в обработчиках', labelnames=('handler',))
+TELEGRAM_API_SECONDS = Histogram(
+    'telegram_api_seconds', 'Время запросов к Telegram Bot API', labelnames=('method',))
+TELEGRAM_API_ERRORS_TOTAL = Counter(
+    'telegram_api_errors_total', 'Ошибки запросов к Telegram Bot API', labelnames=('method',))
+THROTTLED_UPDATES_TOTAL = Counter(
+    'bot_throttled_updates_total', 'Обновления, отброшенные ограничением частоты',
+    labelnames=('type', 'reason'))
+OUTBOX_MESSAGES_TOTAL = Counter(
+    'bot_outbox_messages_total', 'Сообщения из очереди отправки по результату', labelnames=('result',))
+FSM_STATES = Gauge(
+    'bot_fsm_states', 'Пользователи в каждом состоянии диалога', labelnames=('state',))
@@ -0,0 +1,168 @@
+from collections import OrderedDict
+from time import monotonic, perf_counter
+from typing import Any, Awaitable, Callable, Dict, Set, Tuple
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramAPIError
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import CallbackQuery, TelegramObject, Update
+
+from metrics import (HANDLER_ERRORS_TOTAL, HANDLER_SECONDS, TELEGRAM_API_ERRORS_TOTAL, TELEGRAM_API_SECONDS,
+                     THROTTLED_UPDATES_TOTAL, UPDATE_DB_SECONDS, UPDATE_SECONDS, UPDATES_TOTAL)
+from sql_trace import current_handler, update_db_time
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """Открывает одну сессию БД на обновление и передаёт её обработчикам как db."""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with self.session_factory() as session:
+            data['db'] = session
+            return await handler(event, data)
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Считает обновления, полное время их обработки и время, потраченное на SQL."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        update_type = event.event_type
+        UPDATES_TOTAL.inc(update_type)
+        db_time = [0.0]
+        token = update_db_time.set(db_time)
+        started = perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            UPDATE_SECONDS.observe(perf_counter() - started, update_type)
+            UPDATE_DB_SECONDS.observe(db_time[0], update_type)
+            update_db_time.reset(token)
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Ограничивает частоту обновлений от одного пользователя (token bucket: rate в секунду, запас burst)
+    и объединяет одинаковые нажатия: пока нажатие обрабатывается, повторы той же кнопки
+    получают только callback.answer(). Лишние нажатия тоже получают только callback.answer().
+    Inline-запросы не ограничиваются: они приходят на каждое нажатие клавиши и отвечаются
+    по индексу в памяти (search.find_events), к БД обращаются только после изменений
+    в программе, чтобы пересобрать индекс и карточки мероприятия.
+    """
+
+    def __init__(self, rate: float, burst: float, max_users: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_users = max_users
+        self._buckets: OrderedDict[int, Tuple[float, float]] = OrderedDict()
+        self._in_flight: Set[Tuple] = set()
+
+    def _allow(self, user_id: int) -> bool:
+        now = monotonic()
+        tokens, updated = self._buckets.pop(user_id, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        allowed = tokens >= 1
+        self._buckets[user_id] = (tokens - 1 if allowed else tokens, now)
+        if len(self._buckets) > self.max_users:
+            self._buckets.popitem(last=False)
+        return allowed
+
+    @staticmethod
+    async def _dismiss(callback: CallbackQuery):
+        try:
+            await callback.answer()
+        except TelegramAPIError:
+            pass
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get('event_from_user')
+        if user is None or event.inline_query is not None:
+            return await handler(event, data)
+
+        callback = event.callback_query
+        key = None
+        if callback is not None:
+            message_id = callback.message.message_id if callback.message else callback.inline_message_id
+            key = (user.id, message_id, callback.data)
+            if key in self._in_flight:
+                THROTTLED_UPDATES_TOTAL.inc(event.event_type, 'duplicate')
+                await self._dismiss(callback)
+                return None
+
+        if not self._allow(user.id):
+            THROTTLED_UPDATES_TOTAL.inc(event.event_type, 'rate')
+            if callback is not None:
+                await self._dismiss(callback)
+            return None
+
+        if key is None:
+            return await handler(event, data)
+        self._in_flight.add(key)
+        try:
+            return await handler(event, data)
+        finally:
+            self._in_flight.discard(key)
+
+
+class HandlerContextMiddleware(BaseMiddleware):
+    """
+    Запоминает имя выбранного обработчика, чтобы приписать ему выполненные SQL-запросы,
+    и замеряет время его работы. Для нажатий на кнопки берётся обработчик, выбранный CallbackRouter.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get('route') or data.get('handler')
+        name = handler_object.callback.__name__ if handler_object else '-'
+        token = current_handler.set(name)
+        started = perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS_TOTAL.inc(name)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(perf_counter() - started, name)
+            current_handler.reset(token)
+
+
+class TelegramApiMetricsMiddleware(BaseRequestMiddleware):
+    """Замеряет исходящие запросы к Telegram Bot API."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = type(method).__name__
+        started = perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception:
+            TELEGRAM_API_ERRORS_TOTAL.inc(name)
+            raise
+        finally:
+            TELEGRAM_API_SECONDS.observe(perf_counter() - started, name)
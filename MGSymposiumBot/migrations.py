@@ -0,0 +1,114 @@
+from sqlalchemy import Time, bindparam, inspect, text
+
+from utils import SEARCH_CONFIG, parse_time_range
+
+
+def migrate_event_times(sync_conn):
+    """Переносит строковое поле events.time в структурированные start_time и end_time."""
+    columns = {column['name'] for column in inspect(sync_conn).get_columns('events')}
+    if 'time' not in columns:
+        return
+
+    if 'start_time' not in columns:
+        sync_conn.execute(text("ALTER TABLE events ADD COLUMN start_time TIME"))
+    if 'end_time' not in columns:
+        sync_conn.execute(text("ALTER TABLE events ADD COLUMN end_time TIME"))
+
+    rows = sync_conn.execute(text("SELECT id, time FROM events")).all()
+    updates = []
+    for event_id, time_text in rows:
+        try:
+            start_time, end_time = parse_time_range(time_text)
+        except ValueError:
+            print(f"Не удалось разобрать время события {event_id}: '{time_text}', установлено 00:00")
+            start_time, end_time = parse_time_range("00:00 - 00:00")
+        updates.append({'id': event_id, 'start_time': start_time, 'end_time': end_time})
+    if updates:
+        sync_conn.execute(
+            text("UPDATE events SET start_time = :start_time, end_time = :end_time WHERE id = :id")
+            .bindparams(bindparam('start_time', type_=Time), bindparam('end_time', type_=Time)),
+            updates
+        )
+
+    sync_conn.execute(text("DROP INDEX IF EXISTS ix_events_series_id_date_time_id"))
+    if sync_conn.dialect.name == 'postgresql':
+        sync_conn.execute(text("ALTER TABLE events ALTER COLUMN start_time SET NOT NULL"))
+        sync_conn.execute(text("ALTER TABLE events ALTER COLUMN end_time SET NOT NULL"))
+    sync_conn.execute(text("ALTER TABLE events DROP COLUMN time"))
+
+
+def add_event_search_vector(sync_conn):
+    """
+    В PostgreSQL добавляет в events вычисляемый столбец search_vector для /search и GIN-индексы
+    по нему и по названиям мероприятий. Столбец пересчитывается самой БД при каждой вставке
+    и изменении события.
+    """
+    if sync_conn.dialect.name != 'postgresql':
+        return
+    columns = {column['name'] for column in inspect(sync_conn).get_columns('events')}
+    if 'search_vector' not in columns:
+        sync_conn.execute(text(
+            "ALTER TABLE events ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(event, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(speakers, '')), 'B') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'C')"
+            ") STORED"
+        ))
+    sync_conn.execute(text("CREATE INDEX IF NOT EXISTS ix_events_search_vector ON events USING GIN (search_vector)"))
+    sync_conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_event_series_name_search ON event_series "
+        f"USING GIN (to_tsvector('{SEARCH_CONFIG}', name))"
+    ))
+
+
+def add_outbox_claims(sync_conn):
+    """Добавляет в outbox столбец claimed_until: до этого момента строка захвачена одним отправителем."""
+    columns = {column['name'] for column in inspect(sync_conn).get_columns('outbox')}
+    if 'claimed_until' in columns:
+        return
+    column_type = 'TIMESTAMP WITH TIME ZONE' if sync_conn.dialect.name == 'postgresql' else 'DATETIME'
+    sync_conn.execute(text(f"ALTER TABLE outbox ADD COLUMN claimed_until {column_type}"))
+
+
+def make_outbox_text_nullable(sync_conn):
+    """
+    Текст объявления хранится один раз в broadcasts, а строки outbox ссылаются на него
+    по broadcast_id, поэтому outbox.text может быть пустым. SQLite не умеет снимать NOT NULL,
+    там таблица пересоздаётся.
+    """
+    columns = {column['name']: column for column in inspect(sync_conn).get_columns('outbox')}
+    if columns['text']['nullable']:
+        return
+    if sync_conn.dialect.name == 'postgresql':
+        sync_conn.execute(text("ALTER TABLE outbox ALTER COLUMN text DROP NOT NULL"))
+        return
+    sync_conn.execute(text("ALTER TABLE outbox RENAME TO outbox_old"))
+    # индекс по broadcast_id переехал вместе с таблицей, новый создаст create_missing_indexes
+    sync_conn.execute(text("DROP INDEX IF EXISTS ix_outbox_broadcast_id"))
+    sync_conn.execute(text(
+        "CREATE TABLE outbox (id INTEGER NOT NULL PRIMARY KEY, chat_id BIGINT NOT NULL, text TEXT, "
+        "parse_mode VARCHAR, broadcast_id INTEGER REFERENCES broadcasts (id), claimed_until DATETIME)"
+    ))
+    sync_conn.execute(text(
+        "INSERT INTO outbox (id, chat_id, text, parse_mode, broadcast_id, claimed_until) "
+        "SELECT id, chat_id, text, parse_mode, broadcast_id, claimed_until FROM outbox_old"
+    ))
+    sync_conn.execute(text("DROP TABLE outbox_old"))
+
+
+def add_outbox_expiry(sync_conn):
+    """Добавляет в outbox столбец expires_at: срок, после которого сообщение уже не отправляется."""
+    columns = {column['name'] for column in inspect(sync_conn).get_columns('outbox')}
+    if 'expires_at' in columns:
+        return
+    column_type = 'TIMESTAMP WITH TIME ZONE' if sync_conn.dialect.name == 'postgresql' else 'DATETIME'
+    sync_conn.execute(text(f"ALTER TABLE outbox ADD COLUMN expires_at {column_type}"))
+
+
+def run_migrations(sync_conn):
+    """Приводит существующую схему к текущим моделям. Каждая миграция идемпотентна."""
+    migrate_event_times(sync_conn)
+    add_event_search_vector(sync_conn)
+    add_outbox_claims(sync_conn)
+    make_outbox_text_nullable(sync_conn)
+    add_outbox_expiry(sync_conn)
@@ -1,13 +1,26 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from sqlalchemy import (BigInteger, Boolean, Column, Integer, String, Text, Date, DateTime, Time, ForeignKey,
+                        Index, false)
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
+from time import perf_counter
 from dotenv import load_dotenv
 
+from metrics import DB_POOL_CHECKOUT_SECONDS, DB_POOL_IN_USE
+from migrations import run_migrations
+from sql_trace import instrument_engine
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
 
 Base = declarative_base()
 
@@ -23,6 +36,10 @@ class EventSeries(Base):
     image_url = Column(String, nullable=True)
     events = relationship("Event", back_populates="series")
 
+    __table_args__ = (
+        Index('ix_event_series_start_date_id', 'start_date', 'id'),
+    )
+
 
 class Event(Base):
     __tablename__ = 'events'
@@ -30,7 +47,8 @@ class Event(Base):
     id = Column(Integer, primary_key=True, index=True)
     series_id = Column(Integer, ForeignKey('event_series.id'), nullable=False)
     date = Column(Date, nullable=False)
-    time = Column(String, nullable=False)
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
     event = Column(String, nullable=False)
     room = Column(String, nullable=False)
     speakers = Column(String)
@@ -38,8 +56,103 @@ class Event(Base):
     image_url = Column(String, nullable=True)
     series = relationship("EventSeries", back_populates="events")
 
+    __table_args__ = (
+        Index('ix_events_series_id_date_start_time_id', 'series_id', 'date', 'start_time', 'id'),
+        Index('ix_events_date_start_time', 'date', 'start_time'),
+    )
+
+
+class MediaFile(Base):
+    __tablename__ = 'media_files'
+
+    key = Column(String, primary_key=True)
+    source_url = Column(String, nullable=False)
+    file_id = Column(String, nullable=False)
+
+
+class FSMRecord(Base):
+    __tablename__ = 'fsm_states'
+
+    key = Column(String, primary_key=True)
+    state = Column(String, nullable=True)
+    data = Column(Text, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class Subscriber(Base):
+    __tablename__ = 'subscribers'
+
+    chat_id = Column(BigInteger, primary_key=True)
+    blocked = Column(Boolean, nullable=False, default=False, server_default=false())
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class Broadcast(Base):
+    __tablename__ = 'broadcasts'
+
+    id = Column(Integer, primary_key=True)
+    text = Column(Text, nullable=False)
+    author_chat_id = Column(BigInteger, nullable=False)
+    status = Column(String, nullable=False, default='running')
+    total = Column(Integer, nullable=False, default=0)
+    sent = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class OutboxMessage(Base):
+    __tablename__ = 'outbox'
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False)
+    text = Column(Text, nullable=True)  # у сообщений рассылки текст берётся из broadcasts
+    parse_mode = Column(String, nullable=True)
+    broadcast_id = Column(Integer, ForeignKey('broadcasts.id'), nullable=True, index=True)
+    claimed_until = Column(DateTime(timezone=True), nullable=True)
+    # срочные сообщения (напоминания) отправляются раньше остальных, а после этого момента - не отправляются
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index('ix_outbox_expires_at_id', 'expires_at', 'id'),
+    )
+
+
+class Reminder(Base):
+    __tablename__ = 'reminders'
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False)
+    event_id = Column(Integer, ForeignKey('events.id'), nullable=False, index=True)
+    remind_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index('ix_reminders_chat_id_event_id', 'chat_id', 'event_id', unique=True),
+    )
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул соединений, замеряющий время ожидания свободного соединения."""
+
+    def _do_get(self):
+        started = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(perf_counter() - started)
+
+
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=SQL_ECHO,
+    poolclass=InstrumentedPool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
+instrument_engine(engine)
+DB_POOL_IN_USE.set_function(lambda: {(): engine.pool.checkedout()})
 
 
 AsyncSessionLocal = sessionmaker(
@@ -47,14 +160,16 @@ AsyncSessionLocal = sessionmaker(
 )
 
 
+def create_missing_indexes(sync_conn):
+    """create_all не добавляет индексы в уже существующие таблицы, создаём их отдельно."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=sync_conn, checkfirst=True)
+
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(run_migrations)
+        await conn.run_sync(create_missing_indexes)
 
-
-async def get_db():
-    async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
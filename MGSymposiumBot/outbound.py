@@ -0,0 +1,350 @@
+import asyncio
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import (TelegramBadRequest, TelegramForbiddenError, TelegramNetworkError,
+                                TelegramRetryAfter, TelegramServerError)
+from dotenv import load_dotenv
+from sqlalchemy import delete, or_, select, text, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from metrics import OUTBOX_MESSAGES_TOTAL
+from models import Broadcast, OutboxMessage
+from subscribers import mark_blocked
+
+load_dotenv()
+
+OUTBOX_RATE = float(os.getenv('OUTBOX_RATE', 25))
+OUTBOX_CHAT_INTERVAL = float(os.getenv('OUTBOX_CHAT_INTERVAL', 1))
+OUTBOX_CONCURRENCY = int(os.getenv('OUTBOX_CONCURRENCY', 10))
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 500))
+OUTBOX_FLUSH_INTERVAL = 1.0
+OUTBOX_IDLE_RESCAN = 60
+OUTBOX_LEASE = timedelta(seconds=float(os.getenv('OUTBOX_LEASE', 600)))
+OUTBOX_LOCK_KEY = 0x4d47535542  # ключ advisory-блокировки отправителя в PostgreSQL
+MAX_ATTEMPTS = 5
+
+
+class RateLimiter:
+    """Равномерно распределяет отправки: не больше rate в секунду на весь бот."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next = 0.0
+
+    async def acquire(self):
+        now = monotonic()
+        slot = max(self._next, now)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def pause(self, seconds: float):
+        """После RetryAfter от Telegram все отправки откладываются на указанное время."""
+        self._next = max(self._next, monotonic() + seconds)
+
+
+class ChatLimiter:
+    """Не даёт отправлять в один чат чаще, чем раз в interval секунд."""
+
+    def __init__(self, interval: float, max_chats: int = 100000):
+        self.interval = interval
+        self.max_chats = max_chats
+        self._next: Dict[int, float] = {}
+
+    async def acquire(self, chat_id: int):
+        now = monotonic()
+        if len(self._next) > self.max_chats:
+            self._next = {chat: slot for chat, slot in self._next.items() if slot > now}
+        slot = max(self._next.get(chat_id, 0.0), now)
+        self._next[chat_id] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class OutgoingMessage(NamedTuple):
+    id: int
+    chat_id: int
+    text: str
+    parse_mode: Optional[str]
+    broadcast_id: Optional[int]
+    expires_at: Optional[datetime]
+
+    def expired(self, now: datetime) -> bool:
+        if self.expires_at is None:
+            return False
+        # SQLite возвращает datetime без часового пояса, в БД время хранится в UTC
+        expires_at = self.expires_at if self.expires_at.tzinfo else self.expires_at.replace(tzinfo=timezone.utc)
+        return expires_at <= now
+
+
+class SenderLock:
+    """
+    Выбирает один отправляющий процесс среди нескольких копий бота на общей базе PostgreSQL.
+    Ограничение скорости RateLimiter действует внутри процесса, поэтому отправлять должен только
+    владелец advisory-блокировки. Блокировка держится на отдельном соединении и снимается самой
+    БД при его разрыве, после чего её забирает другой процесс.
+    """
+
+    def __init__(self, engine: AsyncEngine, key: int = OUTBOX_LOCK_KEY):
+        self.engine = engine
+        self.key = key
+        self._conn: Optional[AsyncConnection] = None
+
+    async def hold(self) -> bool:
+        """Возвращает True, если блокировка у этого процесса; при необходимости пытается её взять."""
+        if self.engine.dialect.name != 'postgresql':
+            return True
+        try:
+            if self._conn is not None:
+                await self._conn.execute(text("SELECT 1"))
+                return True
+            conn = await self.engine.connect()
+            await conn.execution_options(isolation_level='AUTOCOMMIT')
+            if await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {'key': self.key}):
+                self._conn = conn
+                return True
+            await conn.close()
+        except Exception as e:
+            print(f"Ошибка при захвате блокировки отправителя: {e}")
+            await self.release()
+        return False
+
+    async def release(self):
+        """
+        Снимает блокировку. close() только вернул бы соединение в пул вместе с блокировкой,
+        поэтому она снимается явно, а если это не удалось - соединение закрывается совсем.
+        """
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': self.key})
+            await conn.close()
+        except Exception:
+            await conn.invalidate()
+
+
+class Outbox:
+    """
+    Постоянная очередь исходящих сообщений (таблица outbox).
+    Сообщения захватываются пачками (claimed_until) и отправляются несколькими воркерами с общим
+    и поштучным по чатам ограничением скорости. Захваченные строки не достаются другим процессам,
+    пока не истечёт аренда OUTBOX_LEASE, поэтому копии бота не отправляют одно сообщение дважды.
+    Отправленные строки удаляются пачками, после перезапуска доставка продолжается
+    с неотправленных сообщений. Сообщения со сроком expires_at (напоминания) захватываются раньше
+    остальных, по сроку, а не отправленные к сроку удаляются без отправки.
+    """
+
+    def __init__(self, bot: Bot, session_factory, rate: float = OUTBOX_RATE,
+                 chat_interval: float = OUTBOX_CHAT_INTERVAL, concurrency: int = OUTBOX_CONCURRENCY,
+                 batch_size: int = OUTBOX_BATCH_SIZE, sender_lock: Optional[SenderLock] = None):
+        self.bot = bot
+        self.session_factory = session_factory
+        self.sender_lock = sender_lock
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.limiter = RateLimiter(rate)
+        self.chat_limiter = ChatLimiter(chat_interval)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=batch_size)
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._done: List[Tuple[int, int, int, str]] = []
+        self._pending = 0
+        self._unsent: Set[int] = set()
+        self._broadcast_texts: Dict[int, str] = {}
+
+    def wake(self):
+        """Сообщает, что в outbox появились новые сообщения."""
+        self._wake.set()
+
+    async def _claim(self):
+        """
+        Захватывает пачку свободных строк одним UPDATE ... RETURNING. В PostgreSQL строки выбираются
+        с FOR UPDATE SKIP LOCKED, поэтому параллельные отправители получают разные пачки.
+        Сначала берутся сообщения со сроком, по индексу ix_outbox_expires_at_id, затем остальные.
+        """
+        now = datetime.now(timezone.utc)
+        claimable = (
+            select(OutboxMessage.id)
+            .where(or_(OutboxMessage.claimed_until.is_(None), OutboxMessage.claimed_until < now))
+            .order_by(OutboxMessage.expires_at.asc().nulls_last(), OutboxMessage.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        async with self.session_factory() as session:
+            result = await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_(claimable))
+                .values(claimed_until=now + OUTBOX_LEASE)
+                .returning(OutboxMessage.id, OutboxMessage.chat_id, OutboxMessage.text,
+                           OutboxMessage.parse_mode, OutboxMessage.broadcast_id, OutboxMessage.expires_at)
+                .execution_options(synchronize_session=False))
+            rows = sorted(result.all(), key=lambda row: (row.expires_at is None, row.expires_at, row.id))
+            missing = {row.broadcast_id for row in rows
+                       if row.text is None and row.broadcast_id not in self._broadcast_texts}
+            if missing:
+                texts = await session.execute(
+                    select(Broadcast.id, Broadcast.text).where(Broadcast.id.in_(missing)))
+                self._broadcast_texts.update(texts.all())
+            await session.commit()
+        return [OutgoingMessage(row.id, row.chat_id,
+                                row.text if row.text is not None else self._broadcast_texts[row.broadcast_id],
+                                row.parse_mode, row.broadcast_id, row.expires_at)
+                for row in rows]
+
+    async def _release(self, ids: List[int]):
+        """Возвращает неотправленные строки в очередь, не дожидаясь окончания аренды."""
+        async with self.session_factory() as session:
+            for offset in range(0, len(ids), self.batch_size):
+                await session.execute(update(OutboxMessage).where(
+                    OutboxMessage.id.in_(ids[offset:offset + self.batch_size])).values(claimed_until=None))
+            await session.commit()
+
+    async def _is_sender(self) -> bool:
+        return self.sender_lock is None or await self.sender_lock.hold()
+
+    async def _deliver(self, row) -> str:
+        for attempt in range(MAX_ATTEMPTS):
+            await self.chat_limiter.acquire(row.chat_id)
+            await self.limiter.acquire()
+            self._unsent.discard(row.id)
+            if row.expired(datetime.now(timezone.utc)):
+                # напоминание о начавшемся событии уже бесполезно
+                return 'expired'
+            try:
+                await self.bot.send_message(row.chat_id, row.text, parse_mode=row.parse_mode)
+                return 'sent'
+            except TelegramRetryAfter as e:
+                self.limiter.pause(e.retry_after)
+            except TelegramForbiddenError:
+                return 'blocked'
+            except TelegramBadRequest as e:
+                print(f"Не удалось отправить сообщение в чат {row.chat_id}: {e}")
+                return 'failed'
+            except (TelegramNetworkError, TelegramServerError) as e:
+                print(f"Ошибка сети при отправке в чат {row.chat_id}: {e}")
+                await asyncio.sleep(2 ** attempt)
+        return 'failed'
+
+    def _record(self, row, result: str):
+        OUTBOX_MESSAGES_TOTAL.inc(result)
+        self._done.append((row.id, row.chat_id, row.broadcast_id, result))
+        self._pending -= 1
+
+    async def _worker(self):
+        while True:
+            row = await self._queue.get()
+            result = 'failed'
+            try:
+                result = await self._deliver(row)
+            except asyncio.CancelledError:
+                # остановленная до запроса к Telegram строка остаётся в _unsent и будет освобождена,
+                # а после начала запроса сообщение могло дойти, и повторно оно не отправляется
+                if row.id not in self._unsent:
+                    self._record(row, result)
+                raise
+            except Exception as e:
+                print(f"Ошибка при отправке сообщения {row.id}: {e}")
+            self._record(row, result)
+
+    async def flush(self):
+        """Удаляет обработанные сообщения из outbox и обновляет прогресс рассылок."""
+        async with self._flush_lock:
+            if not self._done:
+                return
+            done, self._done = self._done, []
+            try:
+                finished = await self._save_progress(done)
+            except Exception:
+                self._done = done + self._done
+                raise
+
+        for broadcast in finished:
+            try:
+                await self.bot.send_message(
+                    broadcast.author_chat_id,
+                    f"Рассылка №{broadcast.id} завершена: доставлено {broadcast.sent}, "
+                    f"не доставлено {broadcast.failed}.")
+            except Exception as e:
+                print(f"Не удалось сообщить о завершении рассылки {broadcast.id}: {e}")
+
+    async def _save_progress(self, done) -> List[Broadcast]:
+        progress = defaultdict(lambda: [0, 0])
+        for _, _, broadcast_id, result in done:
+            if broadcast_id is not None:
+                progress[broadcast_id][0 if result == 'sent' else 1] += 1
+
+        async with self.session_factory() as session:
+            ids = [message_id for message_id, _, _, _ in done]
+            for offset in range(0, len(ids), self.batch_size):
+                await session.execute(delete(OutboxMessage).where(
+                    OutboxMessage.id.in_(ids[offset:offset + self.batch_size])))
+            await mark_blocked(session, [chat_id for _, chat_id, _, result in done if result == 'blocked'])
+            for broadcast_id, (sent, failed) in progress.items():
+                await session.execute(update(Broadcast).where(Broadcast.id == broadcast_id).values(
+                    sent=Broadcast.sent + sent, failed=Broadcast.failed + failed))
+            finished = (await session.execute(select(Broadcast).where(
+                Broadcast.id.in_(list(progress)), Broadcast.status == 'running',
+                Broadcast.sent + Broadcast.failed >= Broadcast.total))).scalars().all()
+            for broadcast in finished:
+                broadcast.status = 'done'
+                self._broadcast_texts.pop(broadcast.id, None)
+            await session.commit()
+        return finished
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(OUTBOX_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Ошибка при сохранении прогресса отправки: {e}")
+
+    async def run(self):
+        """
+        Основной цикл: захватывает неотправленные сообщения, затем ждёт новых. Если отправителем
+        выбран другой процесс, этот только периодически проверяет, не освободилась ли блокировка.
+        """
+        tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        tasks.append(asyncio.create_task(self._flush_loop()))
+        try:
+            while True:
+                self._wake.clear()
+                rows = []
+                if await self._is_sender():
+                    try:
+                        rows = await self._claim()
+                    except Exception as e:
+                        print(f"Ошибка при чтении очереди отправки: {e}")
+                if rows:
+                    self._pending += len(rows)
+                    self._unsent.update(row.id for row in rows)
+                    for row in rows:
+                        await self._queue.put(row)
+                    continue
+                if self._pending == 0:
+                    try:
+                        await self.flush()
+                    except Exception as e:
+                        print(f"Ошибка при сохранении прогресса отправки: {e}")
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=OUTBOX_IDLE_RESCAN)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # строки, которые ещё не начали отправлять, сразу отдаются другим отправителям
+            try:
+                if self._unsent:
+                    await self._release(sorted(self._unsent))
+                await self.flush()
+            finally:
+                if self.sender_lock is not None:
+                    await self.sender_lock.release()
@@ -0,0 +1,159 @@
+from datetime import date, time
+from typing import Callable, Dict, Optional, Tuple, Type
+
+from aiogram import Dispatcher
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from callbacks import PageCallback, callback_router
+from repository import Page, event_cursor, fetch_series_page, fetch_series_with_events, series_cursor
+from utils import format_date, format_time_range
+
+_series_pickers: Dict[str, Tuple[Type[CallbackData], Callable]] = {}
+_event_pickers: Dict[str, Tuple[Type[CallbackData], Callable, Optional[Callable]]] = {}
+
+
+def series_label(series) -> str:
+    return f"{series.name}: {format_date(series.start_date, series.end_date)}"
+
+
+def event_label(event) -> str:
+    return (f"{event.event}: {format_date(event.date, event.date)}, "
+            f"{format_time_range(event.start_time, event.end_time)}")
+
+
+def register_series_picker(ctx: str, item: Type[CallbackData], label: Callable = series_label):
+    """
+    Регистрирует постраничный выбор мероприятия: ctx попадает в callback_data листания,
+    кнопка мероприятия получает callback_data item(id=...).
+    """
+    _series_pickers[ctx] = (item, label)
+
+
+def register_event_picker(ctx: str, item: Type[CallbackData], label: Callable = event_label,
+                          footer: Optional[Callable] = None):
+    """
+    Регистрирует постраничный выбор события внутри мероприятия.
+    footer(series_id) возвращает дополнительные ряды кнопок под списком, они сохраняются при листании.
+    """
+    _event_pickers[ctx] = (item, label, footer)
+
+
+def _encode_value(value) -> str:
+    if isinstance(value, date):
+        return str(value.toordinal())
+    if isinstance(value, time):
+        return value.strftime("%H%M")
+    return str(value)
+
+
+def encode_cursor(values: Tuple) -> str:
+    return ",".join(_encode_value(v) for v in values)
+
+
+def _decode_int(value: str) -> int:
+    # int() принимает пробелы, знаки и подчёркивания, в курсоре допустимы только цифры
+    if not value.isdigit():
+        raise ValueError(f"Некорректное значение курсора: {value!r}")
+    return int(value)
+
+
+def _decode_date(value: str) -> date:
+    day = _decode_int(value)
+    if not 1 <= day <= date.max.toordinal():
+        raise ValueError(f"Некорректная дата в курсоре: {value!r}")
+    return date.fromordinal(day)
+
+
+def _decode_time(value: str) -> time:
+    if len(value) != 4:
+        raise ValueError(f"Некорректное время в курсоре: {value!r}")
+    return time(_decode_int(value[:2]), _decode_int(value[2:]))
+
+
+def decode_series_cursor(raw: str) -> Tuple:
+    """Разбирает курсор мероприятия; на подделанный или испорченный курсор поднимает ValueError."""
+    day, item_id = raw.split(",")
+    return _decode_date(day), _decode_int(item_id)
+
+
+def decode_event_cursor(raw: str) -> Tuple:
+    """Разбирает курсор события; на подделанный или испорченный курсор поднимает ValueError."""
+    day, start_time, item_id = raw.split(",")
+    return _decode_date(day), _decode_time(start_time), _decode_int(item_id)
+
+
+def _nav_row(ctx: str, series_id: int, page: Page, cursor: Callable):
+    row = []
+    if page.has_prev:
+        row.append(InlineKeyboardButton(
+            text="◀️ Назад",
+            callback_data=PageCallback(ctx=ctx, direction="p", series_id=series_id,
+                                       cursor=encode_cursor(cursor(page.items[0]))).pack()))
+    if page.has_next:
+        row.append(InlineKeyboardButton(
+            text="Вперёд ▶️",
+            callback_data=PageCallback(ctx=ctx, direction="n", series_id=series_id,
+                                       cursor=encode_cursor(cursor(page.items[-1]))).pack()))
+    return [row] if row else []
+
+
+def series_keyboard(ctx: str, page: Page) -> InlineKeyboardMarkup:
+    item, label = _series_pickers[ctx]
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=label(series), callback_data=item(id=series.id).pack())]
+        for series in page.items
+    ] + _nav_row(ctx, 0, page, series_cursor))
+
+
+def events_keyboard(ctx: str, series_id: int, page: Page) -> InlineKeyboardMarkup:
+    item, label, footer = _event_pickers[ctx]
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=label(event), callback_data=item(id=event.id).pack())]
+        for event in page.items
+    ] + _nav_row(ctx, series_id, page, event_cursor) + (footer(series_id) if footer else []))
+
+
+async def series_picker(db, ctx: str) -> Optional[InlineKeyboardMarkup]:
+    """Клавиатура с первой страницей мероприятий или None, если мероприятий нет."""
+    page = await fetch_series_page(db)
+    return series_keyboard(ctx, page) if page.items else None
+
+
+async def events_picker(db, ctx: str, series_id: int) -> Optional[InlineKeyboardMarkup]:
+    """Клавиатура с первой страницей событий мероприятия или None, если событий нет."""
+    _, page = await fetch_series_with_events(db, series_id)
+    return events_keyboard(ctx, series_id, page) if page.items else None
+
+
+async def turn_page(callback: CallbackQuery, callback_data: PageCallback, db: AsyncSession):
+    ctx, direction, series_id = callback_data.ctx, callback_data.direction, callback_data.series_id
+    raw_cursor = callback_data.cursor
+
+    try:
+        if ctx in _series_pickers:
+            cursor = decode_series_cursor(raw_cursor)
+            page = await (fetch_series_page(db, after=cursor) if direction == "n"
+                          else fetch_series_page(db, before=cursor))
+            keyboard = series_keyboard(ctx, page)
+        else:
+            cursor = decode_event_cursor(raw_cursor)
+            _, page = await (fetch_series_with_events(db, series_id, after=cursor) if direction == "n"
+                             else fetch_series_with_events(db, series_id, before=cursor))
+            keyboard = events_keyboard(ctx, series_id, page)
+    except Exception as e:
+        await callback.answer("Ошибка при получении списка.")
+        print(f"Ошибка при листании списка: {e}")
+        return
+
+    if not page.items:
+        await callback.answer("Список изменился, откройте его заново.")
+        return
+
+    await callback.message.edit_reply_markup(reply_markup=keyboard)
+    await callback.answer()
+
+
+def register_pagination(dp: Dispatcher):
+    callback_router.register(PageCallback, turn_page)
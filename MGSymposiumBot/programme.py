@@ -0,0 +1,211 @@
+"""Импорт программы мероприятия из CSV/XLSX и экспорт в CSV/iCalendar."""
+import csv
+from datetime import date, datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from utils import TIMEZONE, check_optional_field, format_time_range, parse_date, parse_time_range
+
+COLUMNS = {
+    'date': ('date', 'дата'),
+    'time': ('time', 'время'),
+    'event': ('event', 'название', 'событие'),
+    'room': ('room', 'место', 'аудитория'),
+    'speakers': ('speakers', 'спикеры'),
+    'description': ('description', 'описание'),
+}
+REQUIRED = ('date', 'time', 'event', 'room')
+DELIMITERS = ';,\t'
+IMPORT_MAX_ERRORS = 20
+CSV_HEADER = ('дата', 'время', 'название', 'место', 'спикеры', 'описание')
+
+
+def _csv_rows(path: str) -> Iterator[Sequence]:
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        first_line = f.readline()
+        delimiter = max(DELIMITERS, key=first_line.count)
+        f.seek(0)
+        yield from csv.reader(f, delimiter=delimiter)
+
+
+def _xlsx_rows(path: str) -> Iterator[Sequence]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Импорт XLSX недоступен: не установлен пакет openpyxl. Сохраните файл как CSV.")
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _map_header(header: Sequence) -> Dict[str, int]:
+    names = [str(name or '').strip().lower() for name in header]
+    mapping = {}
+    for field, aliases in COLUMNS.items():
+        for i, name in enumerate(names):
+            if name in aliases:
+                mapping[field] = i
+                break
+    missing = [COLUMNS[field][1] for field in REQUIRED if field not in mapping]
+    if missing:
+        raise ValueError(f"В заголовке файла нет столбцов: {', '.join(missing)}.")
+    return mapping
+
+
+def read_rows(path: str, file_name: str) -> Iterator[Tuple[int, Dict[str, object]]]:
+    """Построчно читает файл программы, возвращает номер строки и значения по полям события."""
+    rows = _xlsx_rows(path) if file_name.lower().endswith('.xlsx') else _csv_rows(path)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("Файл пуст.")
+    mapping = _map_header(header)
+
+    for number, values in enumerate(rows, start=2):
+        if all(value is None or str(value).strip() == '' for value in values):
+            continue
+        yield number, {field: values[i] if i < len(values) else None for field, i in mapping.items()}
+
+
+def _text(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return check_optional_field(value) if value else None
+
+
+def validate_row(row: Dict[str, object], series_id: int) -> dict:
+    """Проверяет строку по правилам ввода события и возвращает значения для вставки в events."""
+    value = row['date']
+    if isinstance(value, datetime):
+        event_date = value.date()
+    elif isinstance(value, date):
+        event_date = value
+    else:
+        try:
+            event_date = parse_date(str(value or ''))
+        except ValueError:
+            raise ValueError(f"неправильный формат даты '{value or ''}' (ДД.ММ.ГГГГ)")
+
+    try:
+        start_time, end_time = parse_time_range(str(row['time'] or ''))
+    except ValueError:
+        raise ValueError(f"неправильный формат времени '{row['time'] or ''}' (ЧЧ:ММ - ЧЧ:ММ)")
+    if start_time >= end_time:
+        raise ValueError("время начала не может быть позже или равно времени окончания")
+
+    event = _text(row['event'])
+    room = _text(row['room'])
+    if not event:
+        raise ValueError("не указано название события")
+    if not room:
+        raise ValueError("не указано место проведения")
+
+    return {
+        'series_id': series_id,
+        'date': event_date,
+        'start_time': start_time,
+        'end_time': end_time,
+        'event': event,
+        'room': room,
+        'speakers': _text(row.get('speakers')),
+        'description': _text(row.get('description')),
+    }
+
+
+def read_batches(path: str, file_name: str, series_id: int,
+                 batch_size: int) -> Iterator[Tuple[List[dict], List[str]]]:
+    """Читает и проверяет файл программы, отдаёт пачки строк для вставки в events и ошибки строк."""
+    batch, errors = [], []
+    for number, row in read_rows(path, file_name):
+        try:
+            batch.append(validate_row(row, series_id))
+        except ValueError as e:
+            errors.append(f"Строка {number}: {e}")
+        if len(batch) >= batch_size:
+            yield batch, errors
+            batch, errors = [], []
+    if batch or errors:
+        yield batch, errors
+
+
+def import_report(imported: int, errors: List[str], max_errors: int = IMPORT_MAX_ERRORS) -> str:
+    report = f"Загружено событий: {imported}."
+    if errors:
+        report += f"\nПропущено строк с ошибками: {len(errors)}\n" + "\n".join(errors[:max_errors])
+        if len(errors) > max_errors:
+            report += f"\n... и ещё {len(errors) - max_errors}"
+    return report
+
+
+def csv_row(event) -> list:
+    """Строка CSV в том же формате, который принимает импорт."""
+    return [
+        event.date.strftime("%d.%m.%Y"),
+        format_time_range(event.start_time, event.end_time),
+        event.event,
+        event.room,
+        event.speakers or '-',
+        event.description or '-',
+    ]
+
+
+def _ics_text(value: str) -> str:
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _ics_time(day: date, moment) -> str:
+    local = datetime.combine(day, moment, tzinfo=TIMEZONE)
+    return local.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _ics_lines(*lines: str) -> str:
+    """Склеивает строки iCalendar через CRLF, перенося строки длиннее 75 байт."""
+    folded = []
+    for line in lines:
+        chunk, size = '', 0
+        for char in line:
+            width = len(char.encode('utf-8'))
+            if size + width > 75:
+                folded.append(chunk)
+                chunk, size = ' ', 1
+            chunk += char
+            size += width
+        folded.append(chunk)
+    return ''.join(f"{line}\r\n" for line in folded)
+
+
+def ics_header(series) -> str:
+    return _ics_lines(
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//MGSymposiumBot//RU",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{_ics_text(series.name)}",
+    )
+
+
+def ics_event(event, stamp: str) -> str:
+    description = []
+    if event.speakers and event.speakers != "-":
+        description.append(f"Спикеры: {event.speakers}")
+    if event.description and event.description != "-":
+        description.append(event.description)
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:event-{event.id}@mgsymposiumbot",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{_ics_time(event.date, event.start_time)}",
+        f"DTEND:{_ics_time(event.date, event.end_time)}",
+        f"SUMMARY:{_ics_text(event.event)}",
+        f"LOCATION:{_ics_text(event.room)}",
+    ]
+    if description:
+        lines.append("DESCRIPTION:" + _ics_text("\n".join(description)))
+    lines.append("END:VEVENT")
+    return _ics_lines(*lines)
+
+
+ICS_FOOTER = _ics_lines("END:VCALENDAR")
@@ -0,0 +1,220 @@
+import asyncio
+import heapq
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Event, OutboxMessage, Reminder
+from outbound import OUTBOX_RATE, Outbox
+from utils import TIMEZONE, format_time_range
+
+load_dotenv()
+
+REMINDER_LEAD = timedelta(minutes=float(os.getenv('REMINDER_LEAD_MINUTES', 15)))
+REMINDER_BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', 500))
+
+
+def reminder_deadline(event) -> datetime:
+    """Момент напоминания о событии (в UTC): за REMINDER_LEAD до его начала."""
+    start = datetime.combine(event.date, event.start_time, tzinfo=TIMEZONE)
+    return (start - REMINDER_LEAD).astimezone(timezone.utc)
+
+
+def event_start(event) -> datetime:
+    """Начало события в UTC."""
+    return datetime.combine(event.date, event.start_time, tzinfo=TIMEZONE).astimezone(timezone.utc)
+
+
+def event_started(event, now: datetime) -> bool:
+    return event_start(event) <= now
+
+
+def _utc(moment: datetime) -> datetime:
+    # SQLite возвращает datetime без часового пояса, в БД время хранится в UTC
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def reminder_text(event) -> str:
+    # напоминание может уйти раньше срока или задержаться в очереди, поэтому время начала - точное
+    return (f"🔔 В {event.start_time.strftime('%H:%M')} начинается: {event.event}\n"
+            f"{event.date.strftime('%d.%m.%Y')} {format_time_range(event.start_time, event.end_time)}, "
+            f"{event.room}")
+
+
+class ReminderScheduler:
+    """
+    Планировщик напоминаний. Сроки всех напоминаний держатся в куче в памяти, при запуске
+    куча строится из таблицы reminders. Цикл спит до ближайшего срока, а наступившие
+    напоминания пачками переносит в outbox, который отправляет их с ограничением скорости rate
+    раньше рассылок. Тысячи напоминаний с одним сроком отправляются не мгновенно, поэтому
+    переносятся заранее: как только отправка уже перенесённых напоминаний и всех напоминаний
+    со сроком не позже данного займёт всё время до этого срока. Для этого помимо кучи хранится
+    число напоминаний на каждый срок. Напоминания, не отправленные до начала события,
+    outbox отбрасывает.
+    """
+
+    def __init__(self, session_factory, outbox: Outbox, batch_size: int = REMINDER_BATCH_SIZE,
+                 rate: float = OUTBOX_RATE):
+        self.session_factory = session_factory
+        self.outbox = outbox
+        self.batch_size = batch_size
+        self.rate = rate
+        self._heap: List[Tuple[float, int]] = []
+        self._deadlines: Dict[int, float] = {}
+        self._counts: Dict[float, int] = {}
+        self._drained_at = 0.0
+        self._wake = asyncio.Event()
+
+    def schedule(self, reminder_id: int, remind_at: datetime):
+        """Добавляет или переносит напоминание. Старая запись в куче пропускается при извлечении."""
+        deadline = _utc(remind_at).timestamp()
+        self.cancel(reminder_id)
+        self._deadlines[reminder_id] = deadline
+        self._counts[deadline] = self._counts.get(deadline, 0) + 1
+        heapq.heappush(self._heap, (deadline, reminder_id))
+        # новое напоминание может сдвинуть на более ранний момент перенос всех со сроком не раньше
+        self._wake.set()
+
+    def cancel(self, reminder_id: int):
+        deadline = self._deadlines.pop(reminder_id, None)
+        if deadline is not None:
+            self._counts[deadline] -= 1
+            if not self._counts[deadline]:
+                del self._counts[deadline]
+
+    async def add(self, db: AsyncSession, chat_id: int, event) -> Reminder:
+        reminder = Reminder(chat_id=chat_id, event_id=event.id,
+                            remind_at=max(reminder_deadline(event), datetime.now(timezone.utc)))
+        db.add(reminder)
+        await db.commit()
+        self.schedule(reminder.id, reminder.remind_at)
+        return reminder
+
+    async def reschedule_event(self, db: AsyncSession, event):
+        """Переносит напоминания о событии после изменения его даты или времени."""
+        remind_at = reminder_deadline(event)
+        await db.execute(update(Reminder).where(Reminder.event_id == event.id).values(remind_at=remind_at))
+        result = await db.execute(select(Reminder.id).where(Reminder.event_id == event.id))
+        for reminder_id in result.scalars():
+            self.schedule(reminder_id, remind_at)
+
+    async def load(self):
+        async with self.session_factory() as session:
+            result = await session.execute(select(Reminder.id, Reminder.remind_at))
+            rows = result.all()
+        self._deadlines = {reminder_id: _utc(remind_at).timestamp() for reminder_id, remind_at in rows}
+        self._counts = {}
+        for deadline in self._deadlines.values():
+            self._counts[deadline] = self._counts.get(deadline, 0) + 1
+        self._heap = [(deadline, reminder_id) for reminder_id, deadline in self._deadlines.items()]
+        heapq.heapify(self._heap)
+
+    def _backlog(self, now: float) -> float:
+        """Сколько секунд outbox ещё будет отправлять уже перенесённые напоминания."""
+        return max(self._drained_at - now, 0.0)
+
+    def _plan(self, now: float) -> Tuple[Optional[float], Optional[float]]:
+        """
+        Последний срок, напоминания до которого пора переносить, и момент следующей проверки.
+        Напоминания со сроком не позже deadline outbox отправит за queued / rate секунд после
+        уже перенесённых, значит начинать их перенос нужно не позже deadline - backlog - queued / rate.
+        """
+        backlog = self._backlog(now)
+        queued = 0
+        due_until, wake_at = None, None
+        for deadline in sorted(self._counts):
+            queued += self._counts[deadline]
+            start = deadline - backlog - queued / self.rate
+            if start <= now:
+                due_until = deadline
+            elif due_until is None and (wake_at is None or start < wake_at):
+                wake_at = start
+        return due_until, wake_at
+
+    def _pop_due(self, now: float) -> List[int]:
+        due_until, _ = self._plan(now)
+        due = []
+        while due_until is not None and self._heap and self._heap[0][0] <= due_until:
+            deadline, reminder_id = heapq.heappop(self._heap)
+            if self._deadlines.get(reminder_id) == deadline:
+                self.cancel(reminder_id)
+                due.append(reminder_id)
+        return due
+
+    async def _fire(self, reminder_ids: List[int], until: Optional[datetime] = None):
+        """
+        Переносит напоминания со сроком не позже until в outbox. Напоминание удаляется через
+        DELETE ... RETURNING, и сообщение ставится в outbox только для вернувшихся строк, в той же
+        транзакции. Каждая копия бота держит в куче все напоминания, но отправит каждое только та,
+        чей DELETE его удалил. Срок сообщения в outbox - начало события.
+        """
+        now = datetime.now(timezone.utc)
+        until = until or now
+        for offset in range(0, len(reminder_ids), self.batch_size):
+            chunk = reminder_ids[offset:offset + self.batch_size]
+            async with self.session_factory() as session:
+                result = await session.execute(
+                    select(Reminder.id, Event)
+                    .join(Event, Event.id == Reminder.event_id)
+                    .where(Reminder.id.in_(chunk)))
+                messages_of, fired, moved = {}, [], []
+                for reminder_id, event in result.all():
+                    remind_at = reminder_deadline(event)
+                    if remind_at > until + timedelta(seconds=1):
+                        # событие перенесли в другой копии бота, а куча этой ещё не знает
+                        moved.append((reminder_id, remind_at))
+                        continue
+                    if not event_started(event, now):
+                        messages_of[reminder_id] = (reminder_text(event), event_start(event))
+                    fired.append(reminder_id)
+
+                messages = []
+                if fired:
+                    deleted = await session.execute(
+                        delete(Reminder).where(Reminder.id.in_(fired))
+                        .returning(Reminder.id, Reminder.chat_id)
+                        .execution_options(synchronize_session=False))
+                    messages = [{'chat_id': chat_id, 'text': messages_of[reminder_id][0],
+                                 'expires_at': messages_of[reminder_id][1]}
+                                for reminder_id, chat_id in deleted.all() if reminder_id in messages_of]
+                if messages:
+                    await session.execute(insert(OutboxMessage), messages)
+                for reminder_id, remind_at in moved:
+                    await session.execute(
+                        update(Reminder).where(Reminder.id == reminder_id).values(remind_at=remind_at))
+                await session.commit()
+
+            for reminder_id, remind_at in moved:
+                self.schedule(reminder_id, remind_at)
+            if messages:
+                self.outbox.wake()
+
+    async def run(self):
+        """Основной цикл: спит до момента, когда пора переносить ближайшие напоминания, или до изменений."""
+        await self.load()
+        while True:
+            self._wake.clear()
+            now = datetime.now(timezone.utc).timestamp()
+            due = self._pop_due(now)
+            if due:
+                # outbox отправит эти напоминания вслед за уже перенесёнными
+                self._drained_at = now + self._backlog(now) + len(due) / self.rate
+                try:
+                    await self._fire(due, datetime.fromtimestamp(self._drained_at, timezone.utc))
+                except Exception as e:
+                    print(f"Ошибка при отправке напоминаний: {e}")
+                    for reminder_id in due:
+                        self.schedule(reminder_id, datetime.now(timezone.utc) + timedelta(seconds=30))
+                continue
+
+            now = datetime.now(timezone.utc).timestamp()
+            _, wake_at = self._plan(now)
+            timeout = wake_at - now if wake_at is not None else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,132 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
+
+from callbacks import EventCallback, RemindEventCallback, SeriesCallback, SeriesListCallback
+from utils import format_time_range
+
+
+@dataclass(frozen=True)
+class RenderedMessage:
+    """Готовое к отправке сообщение: текст, режим разметки, фото и клавиатура."""
+    text: str
+    parse_mode: Optional[str] = None
+    photo: Optional[str] = None
+    reply_markup: Optional[InlineKeyboardMarkup] = None
+
+
+def all_series_row() -> list:
+    return [[InlineKeyboardButton(text="⬅️ Все мероприятия", callback_data=SeriesListCallback().pack())]]
+
+
+async def send_rendered(message: types.Message, rendered: RenderedMessage):
+    if rendered.photo:
+        await message.answer_photo(
+            photo=rendered.photo,
+            caption=rendered.text,
+            reply_markup=rendered.reply_markup,
+            parse_mode=rendered.parse_mode
+        )
+    else:
+        await message.answer(
+            text=rendered.text,
+            reply_markup=rendered.reply_markup,
+            parse_mode=rendered.parse_mode
+        )
+
+
+async def edit_rendered(message: types.Message, rendered: RenderedMessage):
+    """
+    Показывает сообщение на месте текущего. Если вид сообщения (фото или текст) совпадает,
+    оно редактируется, иначе отправляется новое, а старое удаляется.
+    """
+    try:
+        if rendered.photo and message.photo:
+            await message.edit_media(
+                media=InputMediaPhoto(media=rendered.photo, caption=rendered.text,
+                                      parse_mode=rendered.parse_mode),
+                reply_markup=rendered.reply_markup
+            )
+            return
+        if not rendered.photo and not message.photo:
+            await message.edit_text(
+                text=rendered.text,
+                reply_markup=rendered.reply_markup,
+                parse_mode=rendered.parse_mode
+            )
+            return
+    except TelegramBadRequest as e:
+        if "message is not modified" in str(e):
+            return
+        print(f"Не удалось отредактировать сообщение: {e}")
+
+    await send_rendered(message, rendered)
+    try:
+        await message.delete()
+    except TelegramBadRequest:
+        pass
+
+
+def render_series(events_series, keyboard: Optional[InlineKeyboardMarkup]) -> RenderedMessage:
+    if keyboard is None:
+        return RenderedMessage(text="Нет событий в этом мероприятии.",
+                               reply_markup=InlineKeyboardMarkup(inline_keyboard=all_series_row()))
+
+    series_details = (
+        f"<b>{events_series.name}</b>"
+        f"\nДата начала: {events_series.start_date.strftime('%d.%m.%Y')}"
+        f"\nДата окончания: {events_series.end_date.strftime('%d.%m.%Y')}"
+    )
+    if events_series.description and events_series.description != "-":
+        series_details += f"\nОписание: {events_series.description}"
+
+    return RenderedMessage(
+        text=series_details,
+        parse_mode='HTML',
+        photo=events_series.image_url,
+        reply_markup=keyboard
+    )
+
+
+def render_event(event) -> RenderedMessage:
+    details = (
+        f"<b>Мероприятие:</b> {event.event}\n"
+        f"<b>Дата:</b> {event.date.strftime('%d.%m.%Y')}\n"
+        f"<b>Время:</b> {format_time_range(event.start_time, event.end_time)}\n"
+        f"<b>Место:</b> {event.room}\n"
+    )
+    if event.speakers and event.speakers != "-":
+        details += f"<b>Спикеры:</b> {event.speakers}\n"
+    if event.description and event.description != "-":
+        details += f"<b>Описание:</b> {event.description}\n"
+
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="🔔 Напомнить", callback_data=RemindEventCallback(id=event.id).pack())],
+        [InlineKeyboardButton(text="⬅️ К мероприятию", callback_data=SeriesCallback(id=event.series_id).pack())]
+    ])
+    return RenderedMessage(text=details, parse_mode='HTML', photo=event.image_url, reply_markup=keyboard)
+
+
+def render_now(current, upcoming) -> RenderedMessage:
+    if not current and not upcoming:
+        return RenderedMessage(text="Сегодня больше нет событий.")
+
+    sections = []
+    for title, events in (("Сейчас идут", current), ("Далее", upcoming)):
+        if events:
+            lines = "\n".join(
+                f"{format_time_range(event.start_time, event.end_time)} {event.event} ({event.room})"
+                for event in events
+            )
+            sections.append(f"<b>{title}:</b>\n{lines}")
+
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(
+            text=f"{event.start_time.strftime('%H:%M')} {event.event}",
+            callback_data=EventCallback(id=event.id).pack())
+         ] for event in (*current, *upcoming)
+    ])
+    return RenderedMessage(text="\n\n".join(sections), parse_mode='HTML', reply_markup=keyboard)
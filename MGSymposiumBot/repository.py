@@ -0,0 +1,132 @@
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, tuple_
+from sqlalchemy.future import select
+
+from models import Event, EventSeries
+from cache import cached
+
+load_dotenv()
+
+PAGE_SIZE = int(os.getenv('PAGE_SIZE', 8))
+
+
+@dataclass(frozen=True)
+class Page:
+    """Страница выборки и признаки наличия соседних страниц."""
+    items: Sequence
+    has_prev: bool
+    has_next: bool
+
+
+def series_cursor(series) -> Tuple:
+    return series.start_date, series.id
+
+
+def event_cursor(event) -> Tuple:
+    return event.date, event.start_time, event.id
+
+
+def _order(columns, before: Optional[Tuple]):
+    return [c.desc() for c in columns] if before is not None else list(columns)
+
+
+def _seek(columns, after: Optional[Tuple], before: Optional[Tuple]):
+    key = tuple_(*columns)
+    if before is not None:
+        return key < tuple_(*before)
+    if after is not None:
+        return key > tuple_(*after)
+    return None
+
+
+def _make_page(rows, after: Optional[Tuple], before: Optional[Tuple], limit: int) -> Page:
+    """Собирает страницу из limit + 1 строк, выбранных после (или до) курсора."""
+    rows = list(rows)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if before is not None:
+        rows.reverse()
+        return Page(items=tuple(rows), has_prev=has_more, has_next=True)
+    return Page(items=tuple(rows), has_prev=after is not None, has_next=has_more)
+
+
+def series_page_query(after: Optional[Tuple] = None, before: Optional[Tuple] = None,
+                      limit: int = PAGE_SIZE):
+    columns = (EventSeries.start_date, EventSeries.id)
+    query = select(EventSeries)
+    seek = _seek(columns, after, before)
+    if seek is not None:
+        query = query.where(seek)
+    return query.order_by(*_order(columns, before)).limit(limit + 1)
+
+
+def series_with_events_query(series_id: int, after: Optional[Tuple] = None,
+                             before: Optional[Tuple] = None, limit: int = PAGE_SIZE):
+    columns = (Event.date, Event.start_time, Event.id)
+    join_on = Event.series_id == EventSeries.id
+    seek = _seek(columns, after, before)
+    if seek is not None:
+        join_on = and_(join_on, seek)
+    return (
+        select(EventSeries, Event)
+        .outerjoin(Event, join_on)
+        .where(EventSeries.id == series_id)
+        .order_by(*_order(columns, before))
+        .limit(limit + 1)
+    )
+
+
+async def fetch_series_page(db, after: Optional[Tuple] = None, before: Optional[Tuple] = None,
+                            limit: int = PAGE_SIZE) -> Page:
+    """Получает страницу серий мероприятий, упорядоченных по дате начала."""
+    async def load():
+        result = await db.execute(series_page_query(after, before, limit))
+        return _make_page(result.scalars().all(), after, before, limit)
+    return await cached(('series_list', after, before, limit), load)
+
+
+async def fetch_series_with_events(db, series_id: int, after: Optional[Tuple] = None,
+                                   before: Optional[Tuple] = None,
+                                   limit: int = PAGE_SIZE) -> Tuple[Optional[EventSeries], Page]:
+    """
+    Получает серию мероприятий и страницу её событий, упорядоченных по дате и времени,
+    одним запросом.
+    """
+    async def load():
+        rows = (await db.execute(series_with_events_query(series_id, after, before, limit))).all()
+        series = rows[0][0] if rows else None
+        events = [event for _, event in rows if event is not None]
+        return series, _make_page(events, after, before, limit)
+    return await cached(('events', series_id, after, before, limit), load)
+
+
+async def fetch_event_by_id(db, event_id):
+    """Получает одно событие по его ID."""
+    async def load():
+        result = await db.execute(select(Event).filter(Event.id == event_id))
+        return result.scalars().first()
+    return await cached(('event', event_id), load)
+
+
+async def fetch_now_and_next(db, moment: datetime, limit: int = PAGE_SIZE) -> Tuple[Sequence, Sequence]:
+    """Получает события, идущие в данный момент, и ближайшие следующие за ними в тот же день."""
+    day, now = moment.date(), moment.time()
+    current = await db.execute(
+        select(Event)
+        .where(Event.date == day, Event.start_time <= now, Event.end_time > now)
+        .order_by(Event.start_time, Event.id)
+        .limit(limit)
+    )
+    upcoming = await db.execute(
+        select(Event)
+        .where(Event.date == day, Event.start_time > now)
+        .order_by(Event.start_time, Event.id)
+        .limit(limit)
+    )
+    return current.scalars().all(), upcoming.scalars().all()
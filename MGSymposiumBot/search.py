@@ -0,0 +1,222 @@
+"""Полнотекстовый поиск событий: tsvector в PostgreSQL, индекс в памяти для остальных БД."""
+import asyncio
+import heapq
+import os
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, literal_column, not_, select, true, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cache import version
+from models import Event, EventSeries
+from repository import PAGE_SIZE, Page
+from utils import SEARCH_CONFIG
+
+# веса полей те же, что у setweight A/B/C/D в ts_rank
+WEIGHTS = {'event': 1.0, 'speakers': 0.4, 'description': 0.2, 'series': 0.1}
+TOKEN = re.compile(r'\w+')
+INDEX_YIELD_PER = 1000
+SEARCH_CANDIDATES = int(os.getenv('SEARCH_CANDIDATES', 1000))
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return TOKEN.findall((text or '').lower().replace('ё', 'е'))
+
+
+def query_tokens(query: str) -> List[str]:
+    tokens = list(dict.fromkeys(tokenize(query)))
+    # однобуквенные слова (предлоги) совпадают почти со всем, без них поиск точнее и быстрее
+    return [token for token in tokens if len(token) > 1 or token.isdigit()] or tokens
+
+
+class _Snapshot:
+    """Неизменяемое состояние индекса: при перестроении заменяется целиком."""
+
+    def __init__(self, version: Optional[int] = None, postings: Optional[Dict[str, Dict[int, float]]] = None,
+                 series: Optional[Dict[int, int]] = None):
+        self.version = version
+        self.postings = postings or {}
+        self.terms = sorted(self.postings)
+        self.series = series or {}
+
+
+def _build_snapshot(rows, current: int) -> _Snapshot:
+    postings = defaultdict(dict)
+    series = {}
+    for event_id, series_id, *values in rows:
+        series[event_id] = series_id
+        for field, value in zip(WEIGHTS, values):
+            for term in tokenize(value):
+                weights = postings[term]
+                weights[event_id] = max(weights.get(event_id, 0.0), WEIGHTS[field])
+    return _Snapshot(current, dict(postings), series)
+
+
+class SearchIndex:
+    """
+    Обратный индекс событий в памяти: inline-режим на любой БД, где запрос приходит на каждое
+    нажатие клавиши и не должен обращаться к БД, и /search на БД без полнотекстового поиска (SQLite).
+    Строится при первом поиске. После изменения мероприятий или событий перестраивается в фоне
+    в отдельной сессии, разбор текстов идёт в отдельном потоке, а готовый индекс подменяет прежний
+    одним присваиванием. До этого поиск отвечает по прежнему индексу.
+    Слова запроса ищутся как префиксы слов индекса, все слова должны найтись.
+    """
+
+    def __init__(self):
+        self._snapshot = _Snapshot()
+        self._lock = asyncio.Lock()
+        self._rebuild: Optional[asyncio.Task] = None
+
+    async def ensure(self, db):
+        if self._snapshot.version == version('events_written'):
+            return
+        if self._snapshot.version is None:
+            # первый поиск ждёт построения: отвечать пока не по чему
+            async with self._lock:
+                if self._snapshot.version is None:
+                    await self._build(db.bind)
+            return
+        if self._rebuild is None or self._rebuild.done():
+            self._rebuild = asyncio.create_task(self._refresh(db.bind))
+
+    async def _refresh(self, bind):
+        try:
+            async with self._lock:
+                # события могли измениться во время построения - тогда ещё один проход
+                while self._snapshot.version != version('events_written'):
+                    await self._build(bind)
+        except Exception as e:
+            print(f"Ошибка при перестроении поискового индекса: {e}")
+
+    async def _build(self, bind):
+        current = version('events_written')
+        async with AsyncSession(bind) as session:
+            result = await session.stream(
+                select(Event.id, Event.series_id, Event.event, Event.speakers, Event.description, EventSeries.name)
+                .join(EventSeries, EventSeries.id == Event.series_id)
+                .execution_options(yield_per=INDEX_YIELD_PER))
+            rows = [tuple(row) async for row in result]
+        self._snapshot = await asyncio.to_thread(_build_snapshot, rows, current)
+
+    def series_of(self, event_id: int) -> Optional[int]:
+        return self._snapshot.series.get(event_id)
+
+    @staticmethod
+    def _match(snapshot: _Snapshot, token: str) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        i = bisect_left(snapshot.terms, token)
+        while i < len(snapshot.terms) and snapshot.terms[i].startswith(token):
+            for event_id, weight in snapshot.postings[snapshot.terms[i]].items():
+                if weight > scores.get(event_id, 0.0):
+                    scores[event_id] = weight
+            i += 1
+        return scores
+
+    def search(self, query: str, limit: int) -> List[int]:
+        """ID не более чем limit найденных событий, от наиболее к наименее подходящим."""
+        snapshot = self._snapshot
+        tokens = query_tokens(query)
+        if not tokens:
+            return []
+        # пересечение начинаем с самого редкого слова, чтобы промежуточные наборы были меньше
+        matches = sorted((self._match(snapshot, token) for token in tokens), key=len)
+        scores = matches[0]
+        for matched in matches[1:]:
+            scores = {event_id: score + matched[event_id]
+                      for event_id, score in scores.items() if event_id in matched}
+        return heapq.nsmallest(limit, scores, key=lambda event_id: (-scores[event_id], event_id))
+
+
+search_index = SearchIndex()
+
+
+def search_query(query: str, offset: int = 0, limit: int = PAGE_SIZE):
+    """
+    Запрос поиска для PostgreSQL. Найденные события собираются UNION ALL из двух ветвей, каждая идёт
+    по своему GIN-индексу. Первая - совпадения в events.search_vector, ранг считается по самому событию.
+    Вторая - совпадения только в названии мероприятия: ранг считается один раз на мероприятие, а его
+    события по порядку отдаёт индекс events.series_id, не более offset + limit + 1 на мероприятие.
+    Ранжируется не больше SEARCH_CANDIDATES совпадений на ветвь (во второй - не больше
+    SEARCH_CANDIDATES // (limit + 1) мероприятий): на общие слова («симпозиум») находятся почти все
+    события, и подсчёт ранга для всех занимал секунды. Сверх этого числа совпадения отбрасываются
+    в порядке чтения индекса, а не по рангу.
+    Целиком события читаются только для limit + 1 лучших.
+    """
+    # конфигурация подставляется константой, чтобы выражение совпало с выражением индекса
+    config = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+    tsquery = func.websearch_to_tsquery(config, query)
+    matches = literal_column('events.search_vector').op('@@')(tsquery)
+    series_vector = func.to_tsvector(config, EventSeries.name)
+
+    by_event = (
+        select(Event.id, func.ts_rank_cd(literal_column('events.search_vector'), tsquery).label('rank'),
+               Event.date, Event.start_time)
+        .where(matches)
+        .limit(SEARCH_CANDIDATES)
+        .subquery('by_event')
+    )
+    # число мероприятий не зависит от offset, иначе на разных страницах ранжировались бы разные события
+    matched_series = (
+        select(EventSeries.id, EventSeries.name)
+        .where(series_vector.op('@@')(tsquery))
+        .limit(max(1, SEARCH_CANDIDATES // (limit + 1)))
+        .subquery('matched_series')
+    )
+    series = select(
+        matched_series.c.id,
+        func.ts_rank_cd(func.setweight(func.to_tsvector(config, matched_series.c.name), literal_column("'D'")),
+                        tsquery).label('rank'),
+    ).subquery('series')
+    series_events = (
+        select(Event.id, Event.date, Event.start_time)
+        .where(Event.series_id == series.c.id, not_(matches))
+        .order_by(Event.date, Event.start_time, Event.id)
+        .limit(offset + limit + 1)
+        .lateral('series_events')
+    )
+    # ветви не пересекаются, поэтому UNION ALL без устранения дубликатов
+    ranked = union_all(
+        select(by_event),
+        select(series_events.c.id, series.c.rank, series_events.c.date, series_events.c.start_time)
+        .select_from(series.join(series_events, true())),
+    ).subquery('ranked')
+    order = (ranked.c.rank.desc(), ranked.c.date, ranked.c.start_time, ranked.c.id)
+    top = select(ranked.c.id, ranked.c.rank).order_by(*order).offset(offset).limit(limit + 1).subquery('top')
+    return (
+        select(Event)
+        .join(top, top.c.id == Event.id)
+        .order_by(top.c.rank.desc(), Event.date, Event.start_time, Event.id)
+    )
+
+
+async def _search_memory(db, query: str, offset: int, limit: int) -> List[Event]:
+    await search_index.ensure(db)
+    ids = search_index.search(query, offset + limit + 1)[offset:]
+    if not ids:
+        return []
+    result = await db.execute(select(Event).where(Event.id.in_(ids)))
+    events = {event.id: event for event in result.scalars()}
+    return [events[event_id] for event_id in ids if event_id in events]
+
+
+async def search_events(db, query: str, offset: int = 0, limit: int = PAGE_SIZE) -> Page:
+    """Страница найденных событий, упорядоченных по релевантности."""
+    if db.bind.dialect.name == 'postgresql':
+        events = (await db.execute(search_query(query, offset, limit))).scalars().all()
+    else:
+        events = await _search_memory(db, query, offset, limit)
+    return Page(events[:limit], has_prev=offset > 0, has_next=len(events) > limit)
+
+
+async def find_events(db, query: str, offset: int, limit: int) -> List[Tuple[int, int]]:
+    """
+    Пары (ID события, ID мероприятия) для inline-режима: не более limit + 1 найденных событий,
+    начиная с offset. Ищет только по индексу в памяти, на любой БД: запрос к БД на каждое нажатие
+    клавиши занимал бы соединение из пула на всё время полнотекстового поиска.
+    """
+    await search_index.ensure(db)
+    ids = search_index.search(query, offset + limit + 1)[offset:]
+    return [(event_id, search_index.series_of(event_id)) for event_id in ids]
@@ -0,0 +1,47 @@
+import logging
+import os
+import random
+from contextvars import ContextVar
+from time import perf_counter
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+from metrics import Histogram
+
+load_dotenv()
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 100))
+SQL_SAMPLE_RATE = float(os.getenv('SQL_SAMPLE_RATE', 0.01))
+
+current_handler: ContextVar[str] = ContextVar('current_handler', default='-')
+update_db_time: ContextVar[list] = ContextVar('update_db_time', default=None)
+
+SQL_QUERY_SECONDS = Histogram(
+    'sql_query_seconds', 'Время выполнения SQL-запросов', labelnames=('handler',))
+
+logger = logging.getLogger('sql')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = perf_counter() - context._query_started
+    handler = current_handler.get()
+    SQL_QUERY_SECONDS.observe(elapsed, handler)
+    db_time = update_db_time.get()
+    if db_time is not None:
+        db_time[0] += elapsed
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning("Медленный запрос %.1f мс [%s]: %s %r", elapsed * 1000, handler, statement, parameters)
+    elif SQL_SAMPLE_RATE and random.random() < SQL_SAMPLE_RATE:
+        logger.info("Запрос %.1f мс [%s]: %s", elapsed * 1000, handler, statement)
+
+
+def instrument_engine(engine):
+    """Замеряет каждый запрос движка: медленные логирует целиком, остальные - выборочно."""
+    event.listen(engine.sync_engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine.sync_engine, 'after_cursor_execute', _after_cursor_execute)
@@ -36,3 +36,16 @@ class UpdateEvent(StatesGroup):
     waiting_for_speakers = State()
     waiting_for_description = State()
     waiting_for_photo_url = State()
+
+
+class ImportEvents(StatesGroup):
+    waiting_for_series = State()
+    waiting_for_file = State()
+
+
+class BroadcastMessage(StatesGroup):
+    waiting_for_text = State()
+
+
+class SearchEvents(StatesGroup):
+    waiting_for_query = State()
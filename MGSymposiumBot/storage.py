@@ -0,0 +1,225 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, time, timedelta, timezone
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from aiogram.fsm.middleware import FSMContextMiddleware
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from aiogram.types import TelegramObject, Update
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import FSMRecord
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, date):
+        return {'__date__': value.isoformat()}
+    if isinstance(value, time):
+        return {'__time__': value.isoformat()}
+    raise TypeError(f"Значение типа {type(value).__name__} нельзя сохранить в FSM")
+
+
+def _decode(obj: Dict[str, Any]):
+    if '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    if '__date__' in obj:
+        return date.fromisoformat(obj['__date__'])
+    if '__time__' in obj:
+        return time.fromisoformat(obj['__time__'])
+    return obj
+
+
+def dumps(data: Dict[str, Any]) -> str:
+    return json.dumps(data, default=_encode, ensure_ascii=False)
+
+
+def loads(raw: str) -> Dict[str, Any]:
+    return json.loads(raw, object_hook=_decode)
+
+
+class SQLStorage(BaseStorage):
+    """
+    Хранилище FSM в таблице fsm_states.
+
+    Внутри обновления (update_scope) прочитанные записи переиспользуются, а изменения копятся
+    и записываются одним запросом при завершении обновления: несколько update_data за один шаг
+    диалога дают одну запись в базу, и следующее обновление в любом процессе видит новое состояние.
+    Диалоги, не менявшиеся дольше ttl, считаются брошенными и удаляются.
+    cache_ttl > 0 включает кэш прочитанных записей между обновлениями - только для бота,
+    работающего в одном процессе.
+    """
+
+    def __init__(self, session_factory, ttl: float = 86400, cache_ttl: float = 0,
+                 key_builder: Optional[KeyBuilder] = None):
+        self.session_factory = session_factory
+        self.ttl = timedelta(seconds=ttl)
+        self.cache_ttl = cache_ttl
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        self._records: Dict[str, Tuple[Optional[str], Dict[str, Any], float]] = {}
+        self._scope: ContextVar[Optional[Dict[str, list]]] = ContextVar('fsm_update_scope', default=None)
+
+    async def _load(self, key: str) -> Tuple[Optional[str], Dict[str, Any]]:
+        cutoff = datetime.now(timezone.utc) - self.ttl
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(FSMRecord.state, FSMRecord.data)
+                .where(FSMRecord.key == key, FSMRecord.updated_at > cutoff)
+            )
+            row = result.first()
+        return (row.state, loads(row.data)) if row else (None, {})
+
+    async def _get(self, key: StorageKey) -> Tuple[str, Optional[str], Dict[str, Any]]:
+        raw_key = self.key_builder.build(key)
+        scope = self._scope.get()
+        if scope is not None and raw_key in scope:
+            state, data, _ = scope[raw_key]
+            return raw_key, state, data
+
+        record = self._records.get(raw_key)
+        if record is not None and monotonic() - record[2] < self.cache_ttl:
+            state, data = record[0], record[1]
+        else:
+            state, data = await self._load(raw_key)
+            self._remember(raw_key, state, data)
+        if scope is not None:
+            scope[raw_key] = [state, data, False]
+        return raw_key, state, data
+
+    def _remember(self, raw_key: str, state: Optional[str], data: Dict[str, Any]):
+        if self.cache_ttl > 0:
+            self._records[raw_key] = (state, data, monotonic())
+
+    async def _put(self, raw_key: str, state: Optional[str], data: Dict[str, Any]):
+        scope = self._scope.get()
+        if scope is not None:
+            scope[raw_key] = [state, data, True]
+        else:
+            await self._write({raw_key: (state, data)})
+
+    @asynccontextmanager
+    async def update_scope(self):
+        """Обработка одного обновления: изменения состояний записываются при выходе."""
+        scope: Dict[str, list] = {}
+        token = self._scope.set(scope)
+        try:
+            yield
+        finally:
+            self._scope.reset(token)
+            changed = {raw_key: (state, data) for raw_key, (state, data, dirty) in scope.items() if dirty}
+            if changed:
+                await self._write(changed)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        raw_key, _, data = await self._get(key)
+        await self._put(raw_key, state.state if isinstance(state, State) else state, data)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        _, state, _ = await self._get(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        raw_key, state, _ = await self._get(key)
+        await self._put(raw_key, state, data.copy())
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, _, data = await self._get(key)
+        return data.copy()
+
+    def _upsert(self, dialect_name: str, rows):
+        insert = pg_insert if dialect_name == 'postgresql' else sqlite_insert
+        statement = insert(FSMRecord).values(rows)
+        return statement.on_conflict_do_update(
+            index_elements=[FSMRecord.key],
+            set_={
+                'state': statement.excluded.state,
+                'data': statement.excluded.data,
+                'updated_at': statement.excluded.updated_at,
+            }
+        )
+
+    async def _write(self, changed: Dict[str, Tuple[Optional[str], Dict[str, Any]]]):
+        now = datetime.now(timezone.utc)
+        rows, cleared = [], []
+        for raw_key, (state, data) in changed.items():
+            if state is None and not data:
+                cleared.append(raw_key)
+            else:
+                rows.append({'key': raw_key, 'state': state, 'data': dumps(data), 'updated_at': now})
+
+        async with self.session_factory() as session:
+            if rows:
+                await session.execute(self._upsert(session.bind.dialect.name, rows))
+            if cleared:
+                await session.execute(delete(FSMRecord).where(FSMRecord.key.in_(cleared)))
+            await session.commit()
+        for raw_key, (state, data) in changed.items():
+            self._remember(raw_key, state, data)
+
+    async def count_states(self) -> Dict[Tuple, float]:
+        """Количество активных диалогов в каждом состоянии."""
+        cutoff = datetime.now(timezone.utc) - self.ttl
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(FSMRecord.state, func.count())
+                .where(FSMRecord.state.is_not(None), FSMRecord.updated_at > cutoff)
+                .group_by(FSMRecord.state)
+            )
+            return {(state,): count for state, count in result.all()}
+
+    async def delete_expired(self):
+        """Удаляет брошенные диалоги."""
+        cutoff = datetime.now(timezone.utc) - self.ttl
+        async with self.session_factory() as session:
+            await session.execute(delete(FSMRecord).where(FSMRecord.updated_at <= cutoff))
+            await session.commit()
+        now = monotonic()
+        for raw_key in [k for k, record in self._records.items() if now - record[2] >= self.cache_ttl]:
+            del self._records[raw_key]
+
+    async def run_cleanup(self, interval: float = 600):
+        while True:
+            try:
+                await self.delete_expired()
+            except Exception as e:
+                print(f"Ошибка при очистке состояний FSM: {e}")
+            await asyncio.sleep(interval)
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLFSMContextMiddleware(FSMContextMiddleware):
+    """
+    FSM-контекст для SQLStorage: каждое обновление обрабатывается в update_scope хранилища.
+    Состояние читается заранее только для сообщений - лишь у их обработчиков есть фильтры
+    по состоянию. Нажатия на кнопки и inline-запросы получают FSMContext, а в базу обращаются,
+    только если обработчик сам запросит состояние или данные диалога.
+    """
+
+    storage: SQLStorage
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with self.storage.update_scope():
+            if event.message is not None:
+                return await super().__call__(handler, event, data)
+
+            context = self.resolve_event_context(data['bot'], data)
+            data['fsm_storage'] = self.storage
+            if context:
+                async with self.events_isolation.lock(key=context.key):
+                    data.update({'state': context, 'raw_state': None})
+                    return await handler(event, data)
+            return await handler(event, data)
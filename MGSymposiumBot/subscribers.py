@@ -0,0 +1,37 @@
+from datetime import datetime, timezone
+from typing import Iterable, Set
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Subscriber
+
+_known: Set[int] = set()
+
+
+async def record_subscriber(db: AsyncSession, chat_id: int):
+    """Запоминает чат как получателя рассылок. Повторные /start из того же процесса не пишут в БД."""
+    if chat_id in _known:
+        return
+    insert = pg_insert if db.bind.dialect.name == 'postgresql' else sqlite_insert
+    statement = insert(Subscriber).values(chat_id=chat_id, blocked=False, created_at=datetime.now(timezone.utc))
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[Subscriber.chat_id], set_={'blocked': False}))
+    await db.commit()
+    _known.add(chat_id)
+
+
+async def mark_blocked(db: AsyncSession, chat_ids: Iterable[int]):
+    """Отмечает чаты, которые заблокировали бота: рассылки им больше не ставятся в очередь."""
+    chat_ids = list(chat_ids)
+    if not chat_ids:
+        return
+    await db.execute(update(Subscriber).where(Subscriber.chat_id.in_(chat_ids)).values(blocked=True))
+    _known.difference_update(chat_ids)
+
+
+async def count_subscribers(db: AsyncSession) -> int:
+    result = await db.execute(select(func.count()).select_from(Subscriber).where(Subscriber.blocked.is_(False)))
+    return result.scalar()
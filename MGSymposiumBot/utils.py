@@ -1,31 +1,100 @@
-import requests
+import asyncio
 import os
 
 from functools import wraps
+from time import monotonic
+from typing import Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import aiohttp
 from aiogram.types import Message
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import date, datetime, time
 
 load_dotenv()
 
 
 ADMIN_ID = os.getenv('OWNER_ID')
+TIMEZONE = ZoneInfo(os.getenv('TIMEZONE', 'Europe/Moscow'))
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', 'russian')
+if not SEARCH_CONFIG.isidentifier():
+    raise ValueError(f"Неправильное имя конфигурации поиска SEARCH_CONFIG: '{SEARCH_CONFIG}'")
 
+URL_CHECK_TTL = float(os.getenv('URL_CHECK_TTL', 300))
+URL_CHECK_NEGATIVE_TTL = float(os.getenv('URL_CHECK_NEGATIVE_TTL', 30))
+URL_CHECK_TIMEOUT = float(os.getenv('URL_CHECK_TIMEOUT', 5))
 
-def is_url_valid(url: str) -> bool:
+_http_session: Optional[aiohttp.ClientSession] = None
+_url_cache: Dict[str, Tuple[bool, float]] = {}
+_url_refresh_tasks: Dict[str, asyncio.Task] = {}
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Возвращает общую HTTP-сессию для внешних запросов."""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=URL_CHECK_TIMEOUT))
+    return _http_session
+
+
+async def close_http_session():
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
+
+async def check_url(url: str) -> bool:
+    """Проверяет доступность URL, не скачивая содержимое целиком."""
+    session = get_http_session()
     try:
-        response = requests.get(url)
-        if response.status_code == 200:
+        async with session.head(url, allow_redirects=True) as response:
+            status = response.status
+        if status not in (200, 206):
+            # Не все CDN поддерживают HEAD, пробуем запросить один байт
+            async with session.get(url, headers={'Range': 'bytes=0-0'}) as response:
+                status = response.status
+        if status in (200, 206):
             print(f"URL {url} доступен")
             return True
-        else:
-            print(f"URL {url} недоступен, статус код: {response.status_code}")
-            return False
-    except requests.exceptions.RequestException as e:
+        print(f"URL {url} недоступен, статус код: {status}")
+        return False
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
         print(f"URL {url} недоступен. Ошибка: {e}")
         return False
 
 
+async def refresh_url(url: str) -> bool:
+    """Проверяет URL и сохраняет результат в кэше (недоступные URL хранятся меньше)."""
+    valid = await check_url(url)
+    ttl = URL_CHECK_TTL if valid else URL_CHECK_NEGATIVE_TTL
+    _url_cache[url] = (valid, monotonic() + ttl)
+    return valid
+
+
+def _schedule_url_refresh(url: str):
+    task = _url_refresh_tasks.get(url)
+    if task is not None and not task.done():
+        return
+    task = asyncio.get_running_loop().create_task(refresh_url(url))
+    task.add_done_callback(lambda _: _url_refresh_tasks.pop(url, None))
+    _url_refresh_tasks[url] = task
+
+
+def is_url_valid(url: str) -> bool:
+    """
+    Возвращает результат проверки URL из кэша, не дожидаясь сети.
+    Просроченная или отсутствующая запись обновляется в фоне.
+    """
+    if not url:
+        return False
+    cached = _url_cache.get(url)
+    if cached is None or cached[1] <= monotonic():
+        _schedule_url_refresh(url)
+    return cached[0] if cached else False
+
+
 def admin_only(func):
     @wraps(func)
     async def wrapper(message: Message, *args, **kwargs):
@@ -61,3 +130,25 @@ def format_date(start_date: datetime, end_date: datetime):
 
 def check_optional_field(field: str) -> str:
     return None if field.strip() == "-" else field
+
+
+def parse_date(text: str) -> date:
+    """Разбирает дату в формате ДД.ММ.ГГГГ, при ошибке бросает ValueError."""
+    return datetime.strptime(text.strip(), "%d.%m.%Y").date()
+
+
+def parse_time_range(text: str) -> Tuple[time, time]:
+    """Разбирает интервал времени в формате ЧЧ:ММ - ЧЧ:ММ, при ошибке бросает ValueError."""
+    start_str, end_str = text.strip().split('-')
+    start_time = datetime.strptime(start_str.strip(), "%H:%M").time()
+    end_time = datetime.strptime(end_str.strip(), "%H:%M").time()
+    return start_time, end_time
+
+
+def format_time_range(start_time: time, end_time: time) -> str:
+    return f"{start_time.strftime('%H:%M')} - {end_time.strftime('%H:%M')}"
+
+
+def now_local() -> datetime:
+    """Текущее время в часовом поясе мероприятий."""
+    return datetime.now(TIMEZONE)
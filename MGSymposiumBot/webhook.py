@@ -0,0 +1,81 @@
+import asyncio
+import hmac
+import os
+from typing import List
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from dotenv import load_dotenv
+
+load_dotenv()
+
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8000))
+WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', 1000))
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', 32))
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class WebhookIngress:
+    """
+    Принимает обновления по HTTP и передаёт их обработчикам через ограниченную очередь.
+    Если очередь заполнена, отвечает 503 - Telegram повторит доставку позже.
+    Запросы без правильного секретного токена отклоняются, поэтому без токена приём не запускается.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, secret_token: str,
+                 queue_size: int = WEBHOOK_QUEUE_SIZE, workers: int = WEBHOOK_WORKERS):
+        if not secret_token:
+            raise ValueError("Для режима webhook нужно задать WEBHOOK_SECRET")
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.secret_token = secret_token.encode()
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._tasks: List[asyncio.Task] = []
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, '').encode(), self.secret_token):
+            return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(await request.json(), context={'bot': self.bot})
+        except ValueError:
+            return web.Response(status=400)
+
+        try:
+            self.queue.put_nowait(update)
+        except asyncio.QueueFull:
+            return web.Response(status=503)
+        return web.Response()
+
+    async def _work(self):
+        while True:
+            update = await self.queue.get()
+            try:
+                await self.dispatcher.feed_update(self.bot, update)
+            except Exception as e:
+                print(f"Ошибка при обработке обновления {update.update_id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _start(self, app: web.Application):
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def _stop(self, app: web.Application):
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=10)
+        except asyncio.TimeoutError:
+            print(f"Не обработано обновлений при остановке: {self.queue.qsize()}")
+        for task in self._tasks:
+            task.cancel()
+
+    def setup(self, app: web.Application, path: str = WEBHOOK_PATH):
+        app.router.add_post(path, self.handle)
+        app.on_startup.append(self._start)
+        app.on_shutdown.append(self._stop)
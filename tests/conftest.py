@@ -0,0 +1,39 @@
+import asyncio
+import os
+import sys
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+# модули бота импортируются по плоским именам из каталога MGSymposiumBot, база для тестов - SQLite в памяти
+os.environ['DATABASE_URL'] = 'sqlite+aiosqlite:///:memory:'
+os.environ.setdefault('BOT_TOKEN', '123456:TEST')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'MGSymposiumBot'))
+
+from models import Base  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def run_db():
+    """
+    Выполняет check(session_factory) на новой базе SQLite: создаёт таблицы, заполняет их строками
+    rows ({модель: [словари]}, в порядке ключей) и закрывает соединения после проверки.
+    По умолчанию база в памяти; url нужен, если проверка открывает параллельные транзакции.
+    """
+    def run(check, rows=None, url='sqlite+aiosqlite://'):
+        async def main():
+            engine = create_async_engine(url)
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                for model, values in (rows or {}).items():
+                    if values:
+                        await conn.execute(insert(model), values)
+            factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+            try:
+                return await check(factory)
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+    return run
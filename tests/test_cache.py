@@ -0,0 +1,78 @@
+import asyncio
+from types import SimpleNamespace
+
+import cache
+from cache import LRUCache, cached, invalidate_event
+from interface import read
+
+
+def test_cached_loads_once():
+    lru = LRUCache(10)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return 'value'
+
+    async def run():
+        return [await cached(('event', 1), load, lru) for _ in range(3)]
+
+    assert asyncio.run(run()) == ['value'] * 3
+    assert len(loads) == 1
+
+
+def test_value_read_before_invalidation_not_stored():
+    lru = LRUCache(10)
+    room = ['101']
+
+    async def run():
+        loaded = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_load():
+            value = room[0]
+            loaded.set()
+            await release.wait()
+            return value
+
+        reader = asyncio.create_task(cached(('event', 1), slow_load, lru))
+        await loaded.wait()
+        # изменение сохранено и кэш сброшен, пока чтение ещё не вернулось
+        room[0] = '202'
+        invalidate_event(1, 1)
+        release.set()
+        stale = await reader
+
+        async def load():
+            return room[0]
+        return stale, await cached(('event', 1), load, lru)
+
+    assert asyncio.run(run()) == ('101', '202')
+
+
+def test_event_card_read_before_invalidation_not_stored(monkeypatch):
+    monkeypatch.setattr(cache, 'render_cache', LRUCache(10))
+    monkeypatch.setattr(read, 'render_cache', cache.render_cache)
+    rooms = ['101']
+    rendered = []
+
+    async def fetch(db, event_id):
+        event = SimpleNamespace(id=event_id, series_id=1, room=rooms[0])
+        if rooms[0] == '101':
+            # событие прочитано, а изменение и сброс кэша случились до построения карточки
+            rooms[0] = '202'
+            invalidate_event(event_id, 1)
+        return event
+
+    def render(event):
+        rendered.append(event.room)
+        return event.room
+
+    monkeypatch.setattr(read, 'fetch_event_by_id', fetch)
+    monkeypatch.setattr(read, 'render_event', render)
+
+    async def run():
+        return [await read.render_event_view(None, 7) for _ in range(3)]
+
+    assert asyncio.run(run()) == ['101', '202', '202']
+    assert rendered == ['101', '202']
@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert, select, update
+
+from models import Broadcast, OutboxMessage
+from outbound import Outbox
+
+
+@pytest.fixture
+def with_outbox(run_db):
+    def run(check, rows=10, batch_size=4):
+        async def outboxes(factory):
+            # два экземпляра на одной базе изображают две копии бота
+            first = Outbox(None, factory, batch_size=batch_size)
+            second = Outbox(None, factory, batch_size=batch_size)
+            return await check(first, second, factory)
+        return run_db(outboxes, {OutboxMessage: [{'chat_id': i, 'text': f'{i}'} for i in range(rows)]})
+    return run
+
+
+def ids(rows):
+    return [row.id for row in rows]
+
+
+def test_claims_do_not_overlap(with_outbox):
+    async def check(first, second, factory):
+        return [ids(await outbox._claim()) for outbox in (first, second, first, second)]
+
+    assert with_outbox(check) == [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10], []]
+
+
+def test_expired_claim_is_taken_again(with_outbox):
+    async def check(first, second, factory):
+        await first._claim()
+        async with factory() as session:
+            await session.execute(update(OutboxMessage).where(OutboxMessage.id == 2).values(
+                claimed_until=datetime.now(timezone.utc) - timedelta(seconds=1)))
+            await session.commit()
+        return ids(await second._claim())
+
+    assert with_outbox(check, rows=4) == [2]
+
+
+def test_released_rows_are_claimed_again(with_outbox):
+    async def check(first, second, factory):
+        claimed = ids(await first._claim())
+        await first._release(claimed[2:])
+        async with factory() as session:
+            free = (await session.execute(
+                select(OutboxMessage.id).where(OutboxMessage.claimed_until.is_(None)))).scalars().all()
+        return free, ids(await second._claim())
+
+    assert with_outbox(check, rows=4) == ([3, 4], [3, 4])
+
+
+def test_broadcast_text_taken_from_broadcasts(with_outbox):
+    async def check(first, second, factory):
+        async with factory() as session:
+            session.add(Broadcast(id=7, text='Объявление', author_chat_id=1, status='running', total=2,
+                                  sent=0, failed=0, created_at=datetime.now(timezone.utc)))
+            await session.flush()
+            await session.execute(insert(OutboxMessage), [{'chat_id': 100 + i, 'broadcast_id': 7} for i in range(2)])
+            await session.commit()
+        return [(row.chat_id, row.text, row.broadcast_id) for row in await first._claim()]
+
+    assert with_outbox(check, rows=1) == [(0, '0', None), (100, 'Объявление', 7), (101, 'Объявление', 7)]
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.sent.append(chat_id)
+
+
+def test_stopped_sender_releases_unsent_rows(with_outbox):
+    async def check(first, second, factory):
+        bot = FakeBot()
+        outbox = Outbox(bot, factory, rate=10, chat_interval=0, concurrency=2, batch_size=4)
+        task = asyncio.create_task(outbox.run())
+        await asyncio.sleep(0.25)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        async with factory() as session:
+            left = (await session.execute(select(OutboxMessage.chat_id, OutboxMessage.claimed_until))).all()
+        return bot.sent, left
+
+    sent, left = with_outbox(check, rows=10)
+    # ожидавшие своей очереди строки не удалены как недоставленные, а освобождены для другого отправителя
+    assert 0 < len(sent) < 10
+    assert sorted([chat_id for chat_id, _ in left] + sent) == list(range(10))
+    assert all(claimed_until is None for _, claimed_until in left)
+
+
+def test_urgent_messages_claimed_first(with_outbox):
+    async def check(first, second, factory):
+        soon = datetime.now(timezone.utc) + timedelta(minutes=10)
+        async with factory() as session:
+            await session.execute(insert(OutboxMessage), [
+                {'chat_id': 100, 'text': 'позже', 'expires_at': soon + timedelta(minutes=5)},
+                {'chat_id': 101, 'text': 'раньше', 'expires_at': soon},
+            ])
+            await session.commit()
+        return [row.chat_id for row in await first._claim()]
+
+    # напоминания добавлены после рассылки, но уходят первыми и по сроку
+    assert with_outbox(check, rows=3) == [101, 100, 0, 1]
+
+
+def test_expired_message_dropped_unsent(with_outbox):
+    async def check(first, second, factory):
+        now = datetime.now(timezone.utc)
+        async with factory() as session:
+            await session.execute(insert(OutboxMessage), [
+                {'chat_id': 100, 'text': 'опоздало', 'expires_at': now - timedelta(seconds=1)},
+                {'chat_id': 101, 'text': 'вовремя', 'expires_at': now + timedelta(minutes=5)},
+            ])
+            await session.commit()
+        bot = FakeBot()
+        outbox = Outbox(bot, factory, rate=100, chat_interval=0)
+        results = [await outbox._deliver(row) for row in await outbox._claim()]
+        return results, bot.sent
+
+    assert with_outbox(check, rows=1) == (['expired', 'sent', 'sent'], [101, 0])
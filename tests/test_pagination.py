@@ -0,0 +1,155 @@
+from datetime import date, time
+
+import pytest
+
+from models import Event, EventSeries
+from pagination import decode_event_cursor, decode_series_cursor, encode_cursor
+from repository import _make_page, event_cursor, series_cursor, series_page_query, series_with_events_query
+
+
+class Row:
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+
+def test_series_cursor_round_trip():
+    series = Row(id=17, start_date=date(2025, 3, 14))
+    raw = encode_cursor(series_cursor(series))
+    assert raw == f"{date(2025, 3, 14).toordinal()},17"
+    assert decode_series_cursor(raw) == (date(2025, 3, 14), 17)
+
+
+@pytest.mark.parametrize('start', [time(0, 0), time(9, 5), time(23, 59)])
+def test_event_cursor_round_trip(start):
+    event = Row(id=4, date=date(2025, 12, 31), start_time=start)
+    raw = encode_cursor(event_cursor(event))
+    assert decode_event_cursor(raw) == (date(2025, 12, 31), start, 4)
+
+
+def test_cursor_fits_callback_data():
+    event = Row(id=2 ** 31 - 1, date=date(9999, 12, 31), start_time=time(23, 59))
+    # вместе с префиксом PageCallback курсор должен укладываться в 64 байта callback_data
+    assert len(encode_cursor(event_cursor(event)).encode()) <= 32
+
+
+@pytest.mark.parametrize('raw', [
+    '', '739000', '739000,1,2', 'abc,1', '739000,x', '739000,-1', '739000, 1', '739000,1_0',
+    '0,1', '99999999999,1',
+])
+def test_series_cursor_rejects_tampered(raw):
+    with pytest.raises(ValueError):
+        decode_series_cursor(raw)
+
+
+@pytest.mark.parametrize('raw', [
+    '739000,1', '739000,0930', '739000,930,1', '739000,09300,1', '739000,2500,1', '739000,0960,1',
+    '739000,+930,1', '739000,0930,', '739000,0930,1,2', '-1,0930,1',
+])
+def test_event_cursor_rejects_tampered(raw):
+    with pytest.raises(ValueError):
+        decode_event_cursor(raw)
+
+
+def test_make_page_first_page_with_extra_row():
+    page = _make_page([1, 2, 3, 4], after=None, before=None, limit=3)
+    assert page.items == (1, 2, 3)
+    assert not page.has_prev
+    assert page.has_next
+
+
+def test_make_page_last_page_without_extra_row():
+    page = _make_page([4, 5], after=(3,), before=None, limit=3)
+    assert page.items == (4, 5)
+    assert page.has_prev
+    assert not page.has_next
+
+
+def test_make_page_exactly_limit_rows_is_last():
+    page = _make_page([4, 5, 6], after=(3,), before=None, limit=3)
+    assert page.items == (4, 5, 6)
+    assert not page.has_next
+
+
+def test_make_page_backwards_reverses_rows():
+    # при листании назад строки выбраны в обратном порядке
+    page = _make_page([6, 5, 4, 3], after=None, before=(7,), limit=3)
+    assert page.items == (4, 5, 6)
+    assert page.has_prev
+    assert page.has_next
+
+
+def test_make_page_backwards_reaches_start():
+    page = _make_page([2, 1], after=None, before=(3,), limit=3)
+    assert page.items == (1, 2)
+    assert not page.has_prev
+    assert page.has_next
+
+
+def test_make_page_empty():
+    page = _make_page([], after=(9,), before=None, limit=3)
+    assert page.items == ()
+    assert not page.has_next
+
+
+def query_pages(run_db, rows, make_query, cursor, limit):
+    """Проходит выборку вперёд до конца и обратно, возвращает id элементов каждой страницы."""
+    async def run(factory):
+        async with factory() as db:
+            async def fetch(after=None, before=None):
+                result = (await db.execute(make_query(after, before, limit))).all()
+                return _make_page([row[-1] for row in result if row[-1] is not None], after, before, limit)
+
+            forward = [await fetch()]
+            while forward[-1].has_next:
+                forward.append(await fetch(after=cursor(forward[-1].items[-1])))
+            backward = [forward[-1]]
+            while backward[-1].has_prev:
+                backward.append(await fetch(before=cursor(backward[-1].items[0])))
+        return forward, backward
+    return run_db(run, rows)
+
+
+def ids(pages):
+    return [[item.id for item in page.items] for page in pages]
+
+
+def series_rows(count):
+    return {EventSeries: [
+        {'id': i, 'name': f'Серия {i}', 'start_date': date(2025, 1, 1 + i // 2), 'end_date': date(2025, 2, 1)}
+        for i in range(1, count + 1)
+    ]}
+
+
+@pytest.mark.parametrize('count, expected', [
+    (6, [[1, 2, 3], [4, 5, 6]]),
+    (7, [[1, 2, 3], [4, 5, 6], [7]]),
+    (2, [[1, 2]]),
+])
+def test_series_pages_forward_and_back(run_db, count, expected):
+    forward, backward = query_pages(
+        run_db, series_rows(count),
+        lambda after, before, limit: series_page_query(after, before, limit),
+        lambda series: decode_series_cursor(encode_cursor(series_cursor(series))),
+        limit=3)
+    assert ids(forward) == expected
+    assert not forward[0].has_prev
+    assert not forward[-1].has_next
+    assert ids(backward) == expected[::-1]
+
+
+def event_rows(count):
+    return {**series_rows(1), Event: [
+        {'id': i, 'series_id': 1, 'date': date(2025, 1, 1), 'start_time': time(10 + i // 3, 0),
+         'end_time': time(20, 0), 'event': f'Событие {i}', 'room': '101'}
+        for i in range(1, count + 1)
+    ]}
+
+
+def test_event_pages_forward_and_back(run_db):
+    forward, backward = query_pages(
+        run_db, event_rows(5),
+        lambda after, before, limit: series_with_events_query(1, after, before, limit),
+        lambda event: decode_event_cursor(encode_cursor(event_cursor(event))),
+        limit=2)
+    assert ids(forward) == [[1, 2], [3, 4], [5]]
+    assert ids(backward) == [[5], [3, 4], [1, 2]]
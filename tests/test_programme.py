@@ -0,0 +1,119 @@
+from datetime import date, time
+
+import pytest
+
+from programme import import_report, read_batches, read_rows, validate_row
+
+
+def write_csv(tmp_path, text, name='programme.csv'):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8-sig')
+    return str(path)
+
+
+def row(**values):
+    base = {'date': '01.02.2025', 'time': '10:00 - 11:30', 'event': 'Доклад', 'room': 'ауд. 101',
+            'speakers': 'Иванов И.И.', 'description': ''}
+    base.update(values)
+    return base
+
+
+def test_validate_row_good():
+    values = validate_row(row(), series_id=3)
+    assert values == {
+        'series_id': 3,
+        'date': date(2025, 2, 1),
+        'start_time': time(10, 0),
+        'end_time': time(11, 30),
+        'event': 'Доклад',
+        'room': 'ауд. 101',
+        'speakers': 'Иванов И.И.',
+        'description': None,
+    }
+
+
+def test_validate_row_accepts_spreadsheet_dates():
+    assert validate_row(row(date=date(2025, 2, 1)), 1)['date'] == date(2025, 2, 1)
+
+
+@pytest.mark.parametrize('value', ['2025-02-01', '32.01.2025', '', None])
+def test_validate_row_bad_date(value):
+    with pytest.raises(ValueError, match="неправильный формат даты"):
+        validate_row(row(date=value), 1)
+
+
+@pytest.mark.parametrize('value', ['10:00', '10-11', '25:00 - 26:00', None])
+def test_validate_row_bad_time(value):
+    with pytest.raises(ValueError, match="неправильный формат времени"):
+        validate_row(row(time=value), 1)
+
+
+def test_validate_row_start_after_end():
+    with pytest.raises(ValueError, match="время начала"):
+        validate_row(row(time='12:00 - 11:00'), 1)
+
+
+@pytest.mark.parametrize('field, message', [('event', 'название'), ('room', 'место')])
+def test_validate_row_missing_required_value(field, message):
+    with pytest.raises(ValueError, match=message):
+        validate_row(row(**{field: '  '}), 1)
+
+
+@pytest.mark.parametrize('delimiter', [';', ',', '\t'])
+def test_read_rows_sniffs_delimiter(tmp_path, delimiter):
+    lines = [['дата', 'время', 'название', 'место'], ['01.02.2025', '10:00 - 11:00', 'Доклад', '101']]
+    path = write_csv(tmp_path, '\n'.join(delimiter.join(line) for line in lines) + '\n')
+    assert list(read_rows(path, 'programme.csv')) == [
+        (2, {'date': '01.02.2025', 'time': '10:00 - 11:00', 'event': 'Доклад', 'room': '101'}),
+    ]
+
+
+def test_read_rows_english_header_and_blank_lines(tmp_path):
+    path = write_csv(tmp_path, "Date,Time,Event,Room,Speakers\n\n,,,,\n01.02.2025,10:00 - 11:00,Talk,A\n")
+    assert list(read_rows(path, 'programme.csv')) == [
+        (4, {'date': '01.02.2025', 'time': '10:00 - 11:00', 'event': 'Talk', 'room': 'A', 'speakers': None}),
+    ]
+
+
+def test_read_rows_missing_columns(tmp_path):
+    path = write_csv(tmp_path, "дата;название\n01.02.2025;Доклад\n")
+    with pytest.raises(ValueError, match="нет столбцов: время, место"):
+        list(read_rows(path, 'programme.csv'))
+
+
+def test_read_rows_empty_file(tmp_path):
+    path = write_csv(tmp_path, "")
+    with pytest.raises(ValueError, match="Файл пуст"):
+        list(read_rows(path, 'programme.csv'))
+
+
+def test_read_batches_splits_rows_and_collects_errors(tmp_path):
+    path = write_csv(tmp_path, "\n".join([
+        "дата;время;название;место",
+        "01.02.2025;10:00 - 11:00;Первый;101",
+        "01.02.2025;10:00;Без времени;101",
+        "01.02.2025;11:00 - 12:00;Второй;101",
+        "01.02.2025;12:00 - 13:00;Третий;101",
+    ]) + "\n")
+    batches = list(read_batches(path, 'programme.csv', series_id=1, batch_size=2))
+    assert [[values['event'] for values in batch] for batch, _ in batches] == [['Первый', 'Второй'], ['Третий']]
+    assert [errors for _, errors in batches] == [
+        ["Строка 3: неправильный формат времени '10:00' (ЧЧ:ММ - ЧЧ:ММ)"], [],
+    ]
+
+
+def test_import_report_without_errors():
+    assert import_report(5, []) == "Загружено событий: 5."
+
+
+def test_import_report_truncates_errors():
+    errors = [f"Строка {number}: ошибка" for number in range(2, 7)]
+    report = import_report(1, errors, max_errors=3)
+    assert report.splitlines() == [
+        "Загружено событий: 1.",
+        "Пропущено строк с ошибками: 5",
+        "Строка 2: ошибка",
+        "Строка 3: ошибка",
+        "Строка 4: ошибка",
+        "... и ещё 2",
+    ]
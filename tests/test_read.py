@@ -0,0 +1,13 @@
+from interface.read import ID, parse_deep_link
+
+
+def test_parse_deep_link():
+    assert parse_deep_link('s12') == ('s', 12)
+    assert parse_deep_link('e7') == ('e', 7)
+    for payload in ('', 's', 'x12', 's12a', 's²', 'e٣', ' s1'):
+        assert parse_deep_link(payload) is None
+
+
+def test_links_id_ascii_only():
+    assert ID.fullmatch('42')
+    assert not ID.fullmatch('4²')
@@ -0,0 +1,95 @@
+import asyncio
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import func, select
+
+from models import Event, EventSeries, OutboxMessage, Reminder
+from reminders import ReminderScheduler
+from utils import TIMEZONE
+
+
+class FakeOutbox:
+    def __init__(self):
+        self.woken = 0
+
+    def wake(self):
+        self.woken += 1
+
+
+def test_due_reminder_fired_once_by_several_schedulers(run_db, tmp_path):
+    start = datetime.now(TIMEZONE) + timedelta(minutes=5)
+    rows = {
+        EventSeries: [{'id': 1, 'name': 'Серия', 'start_date': date(2025, 1, 1), 'end_date': date(2025, 1, 2)}],
+        Event: [{'id': 1, 'series_id': 1, 'date': start.date(), 'start_time': time(start.hour, start.minute),
+                 'end_time': time(23, 59), 'event': 'Доклад', 'room': '101'}],
+        Reminder: [
+            {'chat_id': chat_id, 'event_id': 1, 'remind_at': datetime.now(timezone.utc) - timedelta(minutes=1)}
+            for chat_id in range(10)
+        ],
+    }
+
+    async def run(factory):
+        # каждая копия бота загружает все напоминания в свою кучу
+        schedulers = [ReminderScheduler(factory, FakeOutbox(), batch_size=3) for _ in range(3)]
+        for scheduler in schedulers:
+            await scheduler.load()
+        now = datetime.now(timezone.utc).timestamp()
+        await asyncio.gather(*(scheduler._fire(scheduler._pop_due(now)) for scheduler in schedulers))
+
+        async with factory() as session:
+            sent = (await session.execute(select(OutboxMessage.chat_id, OutboxMessage.expires_at))).all()
+            left = (await session.execute(select(func.count()).select_from(Reminder))).scalar()
+        return sorted(chat_id for chat_id, _ in sent), {expires_at for _, expires_at in sent}, left
+
+    # параллельные транзакции нескольких планировщиков - в файле, а не в памяти
+    chats, expires, left = run_db(run, rows, url=f"sqlite+aiosqlite:///{tmp_path / 'bot.db'}")
+    assert chats == list(range(10))
+    # после начала события outbox напоминание уже не отправит; SQLite возвращает время без пояса
+    event_start = datetime.combine(start.date(), time(start.hour, start.minute), tzinfo=TIMEZONE)
+    assert expires == {event_start.astimezone(timezone.utc).replace(tzinfo=None)}
+    assert left == 0
+
+
+def scheduler_with(deadlines, rate=25):
+    scheduler = ReminderScheduler(None, FakeOutbox(), rate=rate)
+    for reminder_id, deadline in enumerate(deadlines):
+        scheduler.schedule(reminder_id, datetime.fromtimestamp(deadline, timezone.utc))
+    return scheduler
+
+
+def test_single_reminder_fired_at_deadline():
+    scheduler = scheduler_with([1000.0])
+    assert scheduler._pop_due(999.0) == []
+    assert scheduler._pop_due(1000.0) == [0]
+
+
+def test_clustered_reminders_fired_ahead_of_deadline():
+    # 100 напоминаний при 25 сообщениях в секунду отправляются 4 секунды - начинать нужно за 4 секунды
+    scheduler = scheduler_with([1000.0] * 100)
+    assert scheduler._plan(990.0) == (None, 996.0)
+    assert scheduler._pop_due(995.9) == []
+    assert sorted(scheduler._pop_due(996.0)) == list(range(100))
+
+
+def test_later_cluster_pulls_earlier_reminders_forward():
+    # перед большой группой в 1010 отправляются и напоминания с более ранним сроком
+    scheduler = scheduler_with([1000.0] * 10 + [1010.0] * 490)
+    assert scheduler._plan(980.0) == (None, 990.0)
+    assert len(scheduler._pop_due(990.0)) == 500
+
+
+def test_backlog_of_fired_reminders_moves_next_ones_earlier():
+    scheduler = scheduler_with([1000.0] * 50)
+    scheduler._drained_at = 988.0
+    # 8 секунд уже перенесённых напоминаний и 2 секунды этих
+    assert scheduler._plan(980.0) == (None, 990.0)
+
+
+def test_cancelled_and_moved_reminders_not_counted():
+    scheduler = scheduler_with([1000.0] * 100)
+    for reminder_id in range(50):
+        scheduler.cancel(reminder_id)
+    scheduler.schedule(50, datetime.fromtimestamp(2000.0, timezone.utc))
+    assert scheduler._plan(990.0) == (None, 1000.0 - 49 / 25)
+    assert sorted(scheduler._pop_due(998.1)) == list(range(51, 100))
+    assert scheduler._counts == {2000.0: 1}
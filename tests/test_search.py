@@ -0,0 +1,160 @@
+import asyncio
+from datetime import date, time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql
+
+import search
+from cache import invalidate_event
+from models import Event, EventSeries
+from search import SearchIndex, find_events, search_events, search_query, tokenize
+
+EVENTS = [
+    # id, название, спикеры, описание
+    (1, 'Подземное строительство', 'Смирнов А.Б.', 'Тоннели и шахты'),
+    (2, 'Геомеханика массивов', 'Фёдоров В.Г.', 'Устойчивость выработок'),
+    (3, 'Круглый стол', 'Иванов И.И., Семёнов С.С.', 'Строительство метро'),
+    (4, 'ЦИФРОВОЙ РУДНИК', 'Ёлкин Е.Е.', None),
+    (5, 'Доклад', None, 'Про подземное строительство в городе'),
+]
+
+
+def rows(events=EVENTS):
+    return {
+        EventSeries: [{'id': 1, 'name': 'Горная неделя', 'start_date': date(2025, 1, 1), 'end_date': date(2025, 1, 3)}],
+        Event: [
+            {'id': event_id, 'series_id': 1, 'date': date(2025, 1, 1), 'start_time': time(10, 0),
+             'end_time': time(11, 0), 'event': title, 'room': '101', 'speakers': speakers,
+             'description': description}
+            for event_id, title, speakers, description in events
+        ],
+    }
+
+
+def in_session(check):
+    async def run(factory):
+        async with factory() as db:
+            return await check(db)
+    return run
+
+
+@pytest.fixture(scope='module')
+def index(run_db):
+    index = SearchIndex()
+    run_db(in_session(index.ensure), rows())
+    return index
+
+
+def test_tokenize_folds_case_and_yo():
+    assert tokenize('Фёдоров, ЁЛКИН и Co.') == ['федоров', 'елкин', 'и', 'co']
+    assert tokenize(None) == []
+
+
+@pytest.mark.parametrize('query', ['', '   ', '!!!', '—'])
+def test_empty_query(index, query):
+    assert index.search(query, 10) == []
+
+
+def test_nothing_found(index):
+    assert index.search('бурение', 10) == []
+    # все слова запроса должны найтись
+    assert index.search('смирнов бурение', 10) == []
+
+
+def test_single_letter_word_ignored_next_to_longer_words(index):
+    assert index.search('в смирнов', 10) == index.search('смирнов', 10) == [1]
+
+
+def test_single_letter_query_matches_prefix(index):
+    assert index.search('ш', 10) == [1]
+    # «г» совпадает и с названием мероприятия, но события с «г» в своих полях выше
+    assert index.search('г', 10) == [2, 5, 1, 3, 4]
+    assert index.search('7', 10) == []
+
+
+@pytest.mark.parametrize('query', ['ЦИФРОВОЙ', 'цифровой', 'Цифр', 'ёлкин', 'ЕЛКИН', 'Федоров', 'ФЁДОРОВ'])
+def test_cyrillic_case_and_yo_folding(index, query):
+    assert len(index.search(query, 10)) == 1
+
+
+def test_title_ranked_above_description(index):
+    # совпадение в названии весит больше, чем в описании, при равенстве - по id
+    assert index.search('строительство', 10) == [1, 3, 5]
+    assert index.search('подземное строительство', 10) == [1, 5]
+
+
+def test_series_name_matches_all_its_events(index):
+    assert index.search('горная неделя', 10) == [1, 2, 3, 4, 5]
+    assert index.series_of(3) == 1
+    assert index.series_of(99) is None
+
+
+def test_limit(index):
+    assert index.search('горная', 2) == [1, 2]
+    assert index.search('горная', 0) == []
+
+
+def test_search_events_pages(monkeypatch, run_db):
+    monkeypatch.setattr(search, 'search_index', SearchIndex())
+    events = [(i, f'Секция {i}', None, None) for i in range(1, 8)]
+
+    async def check(db):
+        return [await search_events(db, 'секция', offset, limit=3) for offset in (0, 3, 6, 9)]
+
+    pages = run_db(in_session(check), rows(events))
+    assert [[event.id for event in page.items] for page in pages] == [[1, 2, 3], [4, 5, 6], [7], []]
+    assert [(page.has_prev, page.has_next) for page in pages] == [
+        (False, True), (True, True), (True, False), (True, False)]
+
+
+def test_search_query_is_union_of_index_branches():
+    compiled = search_query('смирнов', offset=8, limit=8).compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+    assert 'UNION' in sql
+    assert ' OR ' not in sql
+    assert 'events.search_vector @@' in sql
+    assert "to_tsvector('russian'::regconfig, event_series.name) @@" in sql
+    # события с совпадением в своём тексте не соединяются с event_series, события мероприятия
+    # берутся по индексу series_id не больше, чем нужно до конца страницы
+    assert 'JOIN event_series' not in sql
+    assert 'JOIN LATERAL' in sql
+    assert sorted(value for name, value in compiled.params.items() if name.startswith('param_')) == [
+        8, 9, 17, 111, search.SEARCH_CANDIDATES]
+
+
+def test_rebuild_runs_in_background_and_swaps(monkeypatch, run_db):
+    index = SearchIndex()
+    monkeypatch.setattr(search, 'search_index', index)
+
+    async def check(db):
+        before = await find_events(db, 'бурение', 0, 10)
+        await db.execute(insert(Event), [{'id': 6, 'series_id': 1, 'date': date(2025, 1, 2),
+                                          'start_time': time(10, 0), 'end_time': time(11, 0),
+                                          'event': 'Бурение скважин', 'room': '102'}])
+        await db.commit()
+        invalidate_event(6, 1)
+        # пока индекс перестраивается, поиск отвечает по прежнему
+        during = await find_events(db, 'бурение', 0, 10)
+        rebuild = index._rebuild
+        await rebuild
+        after = await find_events(db, 'бурение', 0, 10)
+        return before, during, rebuild is not None, after, index._rebuild is rebuild
+
+    assert run_db(in_session(check), rows()) == ([], [], True, [(6, 1)], True)
+
+
+class NoQueries:
+    """Сессия PostgreSQL, в которой любой запрос - ошибка."""
+    bind = SimpleNamespace(dialect=SimpleNamespace(name='postgresql'))
+
+    async def execute(self, *args, **kwargs):
+        raise AssertionError("inline-поиск не должен обращаться к БД")
+
+
+def test_find_events_answers_from_memory_on_postgresql(monkeypatch, run_db):
+    index = SearchIndex()
+    monkeypatch.setattr(search, 'search_index', index)
+    run_db(in_session(index.ensure), rows())
+    assert asyncio.run(find_events(NoQueries(), 'подз строит', 0, 10)) == [(1, 1), (5, 1)]
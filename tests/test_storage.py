@@ -0,0 +1,98 @@
+from datetime import date, datetime, time, timedelta, timezone
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import DefaultKeyBuilder, StorageKey
+from sqlalchemy import event, func, select
+
+from models import FSMRecord
+from storage import SQLStorage
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+
+def count_writes(factory):
+    """Считает запросы, изменяющие fsm_states."""
+    writes = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if 'fsm_states' in statement and not statement.lstrip().upper().startswith('SELECT'):
+            writes.append(statement)
+    event.listen(factory.kw['bind'].sync_engine, 'before_cursor_execute', before_execute)
+    return writes
+
+
+async def count_rows(factory):
+    async with factory() as session:
+        return (await session.execute(select(func.count()).select_from(FSMRecord))).scalar()
+
+
+def test_update_written_once_when_scope_ends(run_db):
+    async def check(factory):
+        storage = SQLStorage(factory)
+        writes = count_writes(factory)
+        async with storage.update_scope():
+            await storage.set_state(KEY, 'Form:name')
+            await storage.update_data(KEY, {'name': 'Иван'})
+            await storage.update_data(KEY, {'room': '101'})
+            during = len(writes)
+        # другая копия бота читает записанное из базы
+        other = SQLStorage(factory)
+        return during, len(writes), await other.get_state(KEY), await other.get_data(KEY)
+
+    assert run_db(check) == (0, 1, 'Form:name', {'name': 'Иван', 'room': '101'})
+
+
+def test_write_outside_scope_is_immediate(run_db):
+    async def check(factory):
+        storage = SQLStorage(factory)
+        writes = count_writes(factory)
+        await storage.set_state(KEY, 'Form:name')
+        await storage.set_data(KEY, {'name': 'Иван'})
+        return len(writes), await SQLStorage(factory).get_state(KEY)
+
+    assert run_db(check) == (2, 'Form:name')
+
+
+def test_clear_deletes_row(run_db):
+    async def check(factory):
+        storage = SQLStorage(factory)
+        await storage.set_state(KEY, 'Form:name')
+        before = await count_rows(factory)
+        async with storage.update_scope():
+            await FSMContext(storage, KEY).clear()
+        return before, await count_rows(factory), await SQLStorage(factory).get_state(KEY)
+
+    assert run_db(check) == (1, 0, None)
+
+
+def test_rows_older_than_ttl_ignored(run_db):
+    now = datetime.now(timezone.utc)
+    rows = {FSMRecord: [
+        {'key': DefaultKeyBuilder().build(KEY), 'state': 'Form:name', 'data': '{"name": "Иван"}',
+         'updated_at': now - timedelta(hours=2)},
+        {'key': DefaultKeyBuilder().build(StorageKey(bot_id=1, chat_id=11, user_id=11)), 'state': 'Form:name', 'data': '{}', 'updated_at': now},
+    ]}
+
+    async def check(factory):
+        storage = SQLStorage(factory, ttl=3600)
+        state, data = await storage.get_state(KEY), await storage.get_data(KEY)
+        counts = await storage.count_states()
+        await storage.delete_expired()
+        return state, data, counts, await count_rows(factory)
+
+    assert run_db(check, rows) == (None, {}, {('Form:name',): 1}, 1)
+
+
+def test_dates_round_trip(run_db):
+    data = {
+        'day': date(2025, 3, 14),
+        'start': time(9, 30),
+        'created': datetime(2025, 3, 14, 9, 30, tzinfo=timezone.utc),
+        'nested': {'days': [date(2025, 3, 15)]},
+    }
+
+    async def check(factory):
+        await SQLStorage(factory).set_data(KEY, data)
+        return await SQLStorage(factory).get_data(KEY)
+
+    assert run_db(check) == data
@@ -0,0 +1,143 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import middlewares
+from middlewares import ThrottlingMiddleware
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(middlewares, 'monotonic', clock)
+    return clock
+
+
+class Callback:
+    def __init__(self, data='ev:1', message_id=10):
+        self.data = data
+        self.message = SimpleNamespace(message_id=message_id)
+        self.inline_message_id = None
+        self.answered = 0
+
+    async def answer(self):
+        self.answered += 1
+
+
+def message_update():
+    return SimpleNamespace(event_type='message', inline_query=None, callback_query=None)
+
+
+def callback_update(callback):
+    return SimpleNamespace(event_type='callback_query', inline_query=None, callback_query=callback)
+
+
+def user_data(user_id=1):
+    return {'event_from_user': SimpleNamespace(id=user_id)}
+
+
+def feed(middleware, updates, user_id=1):
+    """Пропускает обновления через middleware по очереди, возвращает число дошедших до обработчика."""
+    handled = []
+
+    async def handler(event, data):
+        handled.append(event)
+
+    async def run():
+        for update in updates:
+            await middleware(handler, update, user_data(user_id))
+    asyncio.run(run())
+    return len(handled)
+
+
+def test_burst_allowed(clock):
+    middleware = ThrottlingMiddleware(rate=2, burst=5)
+    assert feed(middleware, [message_update() for _ in range(5)]) == 5
+
+
+def test_excess_dropped(clock):
+    middleware = ThrottlingMiddleware(rate=2, burst=5)
+    callbacks = [Callback(data=f'ev:{i}') for i in range(8)]
+    assert feed(middleware, [callback_update(c) for c in callbacks]) == 5
+    # отброшенные нажатия всё равно получают ответ, чтобы у клиента не висели «часики»
+    assert [c.answered for c in callbacks] == [0] * 5 + [1] * 3
+
+
+def test_refill_after_interval(clock):
+    middleware = ThrottlingMiddleware(rate=2, burst=5)
+    assert feed(middleware, [message_update() for _ in range(6)]) == 5
+
+    clock.now += 0.4
+    assert feed(middleware, [message_update()]) == 0
+    clock.now += 0.1
+    assert feed(middleware, [message_update(), message_update()]) == 1
+
+    clock.now += 60
+    assert feed(middleware, [message_update() for _ in range(6)]) == 5
+
+
+def test_users_throttled_separately(clock):
+    middleware = ThrottlingMiddleware(rate=2, burst=2)
+    assert feed(middleware, [message_update() for _ in range(3)], user_id=1) == 2
+    assert feed(middleware, [message_update() for _ in range(3)], user_id=2) == 2
+
+
+def test_buckets_bounded(clock):
+    middleware = ThrottlingMiddleware(rate=2, burst=1, max_users=3)
+    for user_id in range(10):
+        feed(middleware, [message_update()], user_id=user_id)
+    assert list(middleware._buckets) == [7, 8, 9]
+
+
+def test_inline_queries_not_throttled(clock):
+    middleware = ThrottlingMiddleware(rate=2, burst=1)
+    updates = [SimpleNamespace(event_type='inline_query', inline_query=object(), callback_query=None)
+               for _ in range(10)]
+    assert feed(middleware, updates) == 10
+
+
+def test_identical_callback_coalesced(clock):
+    middleware = ThrottlingMiddleware(rate=2, burst=5)
+    first, repeat, other = Callback(), Callback(), Callback(data='ev:2')
+    release = asyncio.Event()
+    handled = []
+
+    async def handler(event, data):
+        handled.append(event.callback_query)
+        if event.callback_query is first:
+            await release.wait()
+
+    async def run():
+        slow = asyncio.create_task(middleware(handler, callback_update(first), user_data()))
+        await asyncio.sleep(0)
+        # пока первое нажатие обрабатывается, повтор той же кнопки только получает ответ
+        await middleware(handler, callback_update(repeat), user_data())
+        await middleware(handler, callback_update(other), user_data())
+        release.set()
+        await slow
+        # после завершения обработки та же кнопка снова доходит до обработчика
+        await middleware(handler, callback_update(Callback()), user_data())
+
+    asyncio.run(run())
+    assert handled[:2] == [first, other]
+    assert len(handled) == 3
+    assert repeat.answered == 1
+    assert middleware._in_flight == set()
+
+
+def test_throttling_before_fsm_middleware():
+    import main
+    main.register_handlers()
+    order = list(main.dispatcher.update.outer_middleware)
+    # отброшенное обновление не должно стоить чтения состояния FSM из БД
+    assert order.index(main.dispatcher.fsm) > max(
+        i for i, middleware in enumerate(order) if isinstance(middleware, ThrottlingMiddleware))